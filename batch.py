@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+# batch.py - Offline batch mode
+
+"""
+Runs a file of product links through the same pipeline as the bot
+(clean_url -> get_product -> format_output) without Telegram.
+Input is JSONL, CSV or plain text (one link per line), from a file or stdin.
+Results are written as JSONL in completion order while the batch runs, and
+a throughput / error summary is printed to stderr at the end.
+
+Usage: python batch.py links.jsonl [--format auto|jsonl|csv|text] [--concurrency 8]
+                       [--output results.jsonl] [--pin 110001] [--timeout 20] [--verbose]
+"""
+
+import os
+import re
+import sys
+import csv
+import json
+import time
+import asyncio
+import logging
+import argparse
+
+import main as bot
+import http_client
+import workers
+from config import PERFORMANCE
+
+logger = logging.getLogger(__name__)
+
+URL_RE = re.compile(r'https?://[^\s"\'<>,]+')
+
+# ========================
+# INPUT READERS
+# ========================
+
+def _urls_in(value):
+    """Every link found in a JSON value (strings, lists and nested objects)."""
+    if isinstance(value, str):
+        return URL_RE.findall(value)
+    if isinstance(value, dict):
+        value = list(value.values())
+    if isinstance(value, list):
+        return [url for item in value for url in _urls_in(item)]
+    return []
+
+def read_jsonl(lines):
+    """Links from JSONL rows: the 'url' field if present, else any link in the row."""
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            logger.warning(f"Skipping invalid JSON on line {number}")
+            continue
+        if isinstance(row, dict) and isinstance(row.get('url'), str):
+            yield row['url'].strip()
+        else:
+            yield from _urls_in(row)
+
+def read_csv(lines):
+    """Links from CSV rows: the 'url' column if there is a header, else any link in the row."""
+    reader = csv.reader(lines)
+    url_column = None
+    for number, row in enumerate(reader, 1):
+        if number == 1:
+            header = [cell.strip().lower() for cell in row]
+            if 'url' in header:
+                url_column = header.index('url')
+                continue
+        if url_column is not None:
+            if url_column < len(row) and row[url_column].strip():
+                yield row[url_column].strip()
+        else:
+            for cell in row:
+                yield from URL_RE.findall(cell)
+
+def read_text(lines):
+    """Links from free text, any number per line."""
+    for line in lines:
+        yield from URL_RE.findall(line)
+
+READERS = {'jsonl': read_jsonl, 'csv': read_csv, 'text': read_text}
+
+def detect_format(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension in ('.jsonl', '.ndjson', '.json'):
+        return 'jsonl'
+    if extension == '.csv':
+        return 'csv'
+    return 'text'
+
+# ========================
+# PIPELINE
+# ========================
+
+async def process_one(url, pin_code):
+    """Run one link through the bot pipeline; returns the JSONL record."""
+    record = {'input': url}
+    clean_url_str = await bot.clean_url(url)
+    record['url'] = clean_url_str
+    if not bot.is_supported(clean_url_str):
+        record['status'] = 'unsupported'
+        return record
+    platform = bot.get_platform(clean_url_str)
+    record['platform'] = platform
+    record['product'] = bot.identity.product_key(clean_url_str)
+    data = await bot.get_product(clean_url_str, platform)
+    if not data:
+        record['status'] = 'failed'
+        return record
+    record.update(
+        status='ok',
+        title=data['title'],
+        price=data['price'],
+        image_url=data['image_url'],
+        text=bot.format_output(data, pin_code)
+    )
+    return record
+
+async def worker(queue, out, pin_code, timeout, totals):
+    while True:
+        url = await queue.get()
+        if url is None:
+            return
+        started = time.perf_counter()
+        try:
+            record = await asyncio.wait_for(process_one(url, pin_code), timeout=timeout)
+        except asyncio.TimeoutError:
+            record = {'input': url, 'status': 'timeout'}
+        except Exception as e:
+            logger.error(f"Failed to process URL {url}: {e}")
+            record = {'input': url, 'status': 'error', 'error': str(e)}
+        elapsed = time.perf_counter() - started
+        record['elapsed_ms'] = round(elapsed * 1000, 1)
+        totals['latencies'].append(elapsed)
+        totals['status'][record['status']] = totals['status'].get(record['status'], 0) + 1
+        out.write(json.dumps(record, ensure_ascii=False) + "\n")
+        out.flush()
+
+async def run_batch(urls, out, concurrency, pin_code, timeout):
+    """Feed `urls` to `concurrency` workers through a bounded queue; returns totals."""
+    totals = {'status': {}, 'latencies': []}
+    queue = asyncio.Queue(maxsize=concurrency * 2)
+    tasks = [asyncio.create_task(worker(queue, out, pin_code, timeout, totals)) for _ in range(concurrency)]
+    try:
+        for url in urls:
+            await queue.put(url)
+        for _ in tasks:
+            await queue.put(None)
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await http_client.close_client()
+    return totals
+
+def summarize(totals, elapsed):
+    latencies = sorted(totals['latencies'])
+    count = len(latencies)
+    ok = totals['status'].get('ok', 0)
+
+    def percentile(p):
+        return latencies[min(count - 1, int(count * p))] * 1000 if count else 0.0
+
+    return {
+        'total': count,
+        'status': totals['status'],
+        'error_rate': (count - ok) / count if count else 0.0,
+        'elapsed_s': round(elapsed, 2),
+        'urls_per_s': round(count / elapsed, 2) if elapsed else 0.0,
+        'p50_ms': round(percentile(0.50), 1),
+        'p95_ms': round(percentile(0.95), 1)
+    }
+
+# ========================
+# MAIN
+# ========================
+
+def main():
+    parser = argparse.ArgumentParser(description="Process a file of product links without Telegram.")
+    parser.add_argument('input', nargs='?', default='-', help="Input file, or - for stdin (default)")
+    parser.add_argument('--format', choices=['auto'] + list(READERS), default='auto')
+    parser.add_argument('--concurrency', type=int, default=PERFORMANCE['max_workers'])
+    parser.add_argument('--output', default='-', help="JSONL output file, or - for stdout (default)")
+    parser.add_argument('--pin', default=bot.PIN_DEFAULT, help="Pin code used for Meesho output")
+    parser.add_argument('--timeout', type=float, default=PERFORMANCE['url_timeout'], help="Seconds allowed per link")
+    parser.add_argument('--verbose', action='store_true', help="Log every pipeline step to stderr")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.INFO if args.verbose else logging.WARNING)
+    fmt = args.format if args.format != 'auto' else detect_format(args.input)
+    source = sys.stdin if args.input == '-' else open(args.input, newline='', encoding='utf-8')
+    out = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+
+    workers.start()
+    started = time.perf_counter()
+    try:
+        totals = asyncio.run(run_batch(READERS[fmt](source), out, max(1, args.concurrency), args.pin, args.timeout))
+    finally:
+        workers.shutdown()
+        bot.shortlink_cache.close()
+        bot.http_cache.close()
+        if source is not sys.stdin:
+            source.close()
+        if out is not sys.stdout:
+            out.close()
+
+    summary = summarize(totals, time.perf_counter() - started)
+    counts = ", ".join(f"{status}: {n}" for status, n in sorted(summary['status'].items())) or "none"
+    print(
+        f"Processed {summary['total']} links in {summary['elapsed_s']}s "
+        f"({summary['urls_per_s']} links/s) | {counts} | error rate {summary['error_rate']:.1%} | "
+        f"p50 {summary['p50_ms']} ms, p95 {summary['p95_ms']} ms",
+        file=sys.stderr
+    )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# benchmarks/bench_clean_title.py - Micro-benchmark for clean_title
+
+"""
+Compares main.clean_title (precompiled engine) against the previous
+per-call implementation, kept here verbatim as the reference, on a corpus
+of realistic titles/URLs. Fails if any output differs.
+
+Usage: python benchmarks/bench_clean_title.py [--repeat 2000] [--json]
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import itertools
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from main import clean_title
+
+TITLES = [
+    "boAt Rockerz 450 Bluetooth On Ear Headphones with Mic, Upto 15 Hours Playback (Luscious Black)",
+    "Roadster Men Navy Blue Checked Casual Shirt",
+    "Aakarsha Fabulous Women Kurtis",
+    "NETPLAY Crew-Neck T-shirt with Short Sleeves",
+    "Prestige PKGSS 1.7 Litre Electric Kettle",
+    "Apple iPhone 15 (Black, 128 GB)",
+    "Dove Intense Repair Shampoo 650ml Pack of 2",
+    "Campus Kids Sports Shoes Running Sneakers",
+    "HRX by Hrithik Roshan Women's Solid Track Pants Bottomwear",
+    "Fortune Sunlite Refined Sunflower Oil 1 ltr Pouch",
+    "Lenovo IdeaPad Slim 3 Intel Core i5 12th Gen Laptop",
+    "Libas Ladies Ethnic Wear Cotton Printed Anarkali Kurta Set 3 pcs",
+    "Caprese Handbag \\u00e9l\\u00e9gant Tote for Girls",
+    "",
+]
+URLS = [
+    "https://www.amazon.in/dp/B0B5B6PQCT",
+    "https://www.myntra.com/shirts/roadster/roadster-men-navy-blue-checked-casual-shirt/1364628/buy",
+    "https://www.meesho.com/aakarsha-fabulous-women-kurtis/p/2x3y4z",
+    "https://www.flipkart.com/campus-kids-shoes/p/itm123?pid=SHOE123",
+]
+
+# Previous implementation, unchanged, used as the correctness and speed baseline
+def legacy_clean_title(title, platform, url):
+    if not title:
+        return "Product"
+    title = title.encode('ascii', 'ignore').decode('unicode_escape').strip()
+    title = re.sub(r'\\[uU][0-9a-fA-F]{4}', '', title)
+    title = re.sub(r'[^\w\s\-\'\.]', ' ', title)
+    title = re.sub(r'\s+', ' ', title).strip()
+    words = title.split()
+    if not words:
+        return "Product"
+    brand = words[0].title()
+    rest_title = ' '.join(words[1:8])
+    is_clothing_keywords = [
+        'shirt', 't-shirt', 'jeans', 'trousers', 'shorts', 'kurti', 'saree', 'dress',
+        'top', 'skirt', 'jacket', 'blazer', 'coat', 'suit', 'sweater', 'sweatshirt',
+        'ethnic', 'western', 'lingerie', 'nightwear', 'innerwear', 'footwear', 'shoe',
+        'sandal', 'flip flop', 'heel', 'flat', 'boot', 'sneaker'
+    ]
+    is_clothing = any(kw in url.lower() or kw in title.lower() for kw in is_clothing_keywords)
+    myntra_clothing_categories = [
+        'Topwear', 'Bottomwear', 'Innerwear', 'Footwear', 'Indian & Fusion Wear',
+        'Western Wear', 'Lingerie', 'Nightwear', 'Loungewear', 'Ethnic Wear',
+        'Casual Shoes', 'Sports Shoes', 'Formal Shoes', 'Flats', 'Heels', 'Boots',
+        'Sandals', 'Flip Flops'
+    ]
+    is_clothing = is_clothing or any(cat.lower() in title.lower() for cat in myntra_clothing_categories)
+    gender = ""
+    if is_clothing:
+        if re.search(r'\b(women|ladies|female|girl|women\'s)\b', title, re.IGNORECASE):
+            gender = "Women"
+        elif re.search(r'\b(men|gentlemen|male|boy|men\'s)\b', title, re.IGNORECASE):
+            gender = "Men"
+        elif re.search(r'\b(kids|children|baby|kid\'s)\b', title, re.IGNORECASE):
+            gender = "Kids"
+        else:
+            if 'women' in url.lower() or 'girl' in url.lower():
+                gender = "Women"
+            elif 'men' in url.lower() or 'boy' in url.lower():
+                gender = "Men"
+            elif 'kids' in url.lower() or 'child' in url.lower():
+                gender = "Kids"
+            else:
+                gender = "Unisex"
+    quantity = ""
+    qty_match = re.search(r'\b(\d+)\s*(?:piece|pcs|ml|gm|kg|ltr|pack|set)s?\b', title, re.IGNORECASE)
+    if qty_match:
+        unit = qty_match.group(0).split()[-1]
+        quantity = f"{qty_match.group(1)} {unit.title()}"
+    if is_clothing:
+        parts = [part for part in [brand, gender, quantity, rest_title] if part]
+        return " ".join(parts)
+    parts = [part for part in [brand, quantity, rest_title] if part]
+    return " ".join(parts)
+
+def bench(func, cases, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for title, url in cases:
+            func(title, 'generic', url)
+    return (time.perf_counter() - started) / (repeat * len(cases))
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark clean_title.")
+    parser.add_argument('--repeat', type=int, default=2000)
+    parser.add_argument('--json', action='store_true', help="Emit results as JSON")
+    args = parser.parse_args()
+
+    cases = list(itertools.product(TITLES, URLS))
+    mismatches = [(t, u) for t, u in cases if clean_title(t, 'generic', u) != legacy_clean_title(t, 'generic', u)]
+    if mismatches:
+        for title, url in mismatches:
+            print(f"MISMATCH: {title!r} {url!r}\n  new: {clean_title(title, 'generic', url)!r}\n  old: {legacy_clean_title(title, 'generic', url)!r}")
+        sys.exit(1)
+
+    legacy = bench(legacy_clean_title, cases, args.repeat)
+    engine = bench(clean_title, cases, args.repeat)
+    result = {
+        'cases': len(cases),
+        'legacy_us': round(legacy * 1e6, 2),
+        'engine_us': round(engine * 1e6, 2),
+        'speedup': round(legacy / engine, 2)
+    }
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print(f"{len(cases)} cases, outputs identical")
+        print(f"legacy: {result['legacy_us']} us/title | engine: {result['engine_us']} us/title | {result['speedup']}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# benchmarks/bench_parsers.py - Compare HTML parser backends
+
+"""
+Times each platform's registry extractor on saved product pages for every
+installed backend (selectolax, lxml, BeautifulSoup fallback), plus the
+tree-free structured data scan, and reports which fields each one found.
+Pages are padded with filler markup to realistic sizes, since live Amazon
+and Flipkart pages run from hundreds of KB to several MB.
+
+Usage: python benchmarks/bench_parsers.py [--pages DIR] [--pad-kb 500] [--runs 20] [--json]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import extractors
+
+FILLER = '<div class="nav-item"><a href="/s?k=deal&amp;ref=nav">Deals</a><span class="a-color-secondary">Shop now</span></div>\n'
+
+def load_pages(directory, pad_kb):
+    """Read <platform>.html files, padding each with `pad_kb` KB of filler markup."""
+    pages = {}
+    filler = FILLER * (pad_kb * 1024 // len(FILLER) + 1) if pad_kb else ""
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith('.html'):
+            continue
+        with open(os.path.join(directory, name), 'rb') as f:
+            html = f.read().decode('utf-8')
+        pages[name[:-5]] = html.replace('<!-- padding -->', filler).encode('utf-8')
+    return pages
+
+def time_call(func, runs):
+    """Return (median seconds per call, last result)."""
+    timings = []
+    result = None
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    return timings[len(timings) // 2], result
+
+def run(pages, runs):
+    results = []
+    for platform, content in pages.items():
+        # Tree-free structured data scan (JSON-LD, embedded state, meta tags)
+        seconds, (primary, meta) = time_call(lambda c=content, p=platform: extractors.structured_fields(c, p), runs)
+        fields = dict(meta, **primary)
+        results.append({
+            'platform': platform,
+            'backend': 'structured',
+            'size_kb': round(len(content) / 1024, 1),
+            'median_ms': round(seconds * 1000, 3),
+            'hit': all(fields.get(f) for f in extractors.REQUIRED_FIELDS),
+            'fields': fields
+        })
+        for name in extractors.BACKENDS:
+            seconds, fields = time_call(lambda c=content, p=platform, b=name: extractors.extract_fields(c, p, b), runs)
+            results.append({
+                'platform': platform,
+                'backend': name,
+                'size_kb': round(len(content) / 1024, 1),
+                'median_ms': round(seconds * 1000, 3),
+                'hit': all(fields.get(f) for f in extractors.REQUIRED_FIELDS),
+                'fields': fields
+            })
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark HTML parser backends.")
+    parser.add_argument('--pages', default=os.path.join(os.path.dirname(__file__), 'pages'))
+    parser.add_argument('--pad-kb', type=int, default=500, help="Filler markup added to each page")
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--json', action='store_true', help="Emit results as JSON")
+    args = parser.parse_args()
+
+    results = run(load_pages(args.pages, args.pad_kb), args.runs)
+    if args.json:
+        print(json.dumps(results, indent=2, ensure_ascii=False))
+        return
+
+    print(f"{'platform':<10} {'backend':<14} {'size KB':>8} {'median ms':>10} {'speedup':>8}  hit")
+    baseline = {r['platform']: r['median_ms'] for r in results if r['backend'] == 'beautifulsoup'}
+    for r in results:
+        speedup = baseline[r['platform']] / r['median_ms'] if r['median_ms'] else 0
+        print(f"{r['platform']:<10} {r['backend']:<14} {r['size_kb']:>8} {r['median_ms']:>10} {speedup:>7.1f}x  {'yes' if r['hit'] else 'miss'}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+# benchmarks/bench_pipeline.py - Offline end-to-end benchmark
+
+"""
+Measures the bot's hot path against the recorded fixtures served by the
+local stub server (no live marketplace traffic). Each stage reports
+p50/p95/p99 latency and throughput:
+  expand_short_url (cold and cached), clean_url, scrape_product (per
+  platform), clean_title, parse_price, extract_text_from_image (skipped
+  when Tesseract is not installed) and handle_message (cold, with only
+  the HTTP response cache warm, and cached, plus the OCR photo path when
+  Tesseract is available).
+Results can be written as JSON and compared against a saved baseline.
+
+Usage: python benchmarks/bench_pipeline.py [--runs 30] [--pad-kb 500] [--delay-ms 0]
+                                           [--json] [--output FILE] [--compare BASELINE] [--threshold 0.25]
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+import platform as host_platform
+from types import SimpleNamespace
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, BENCH_DIR)
+
+import pytesseract
+
+import main as bot
+import http_client
+import workers
+import sender
+import extractors
+from cache import ShortLinkCache, FileIdCache, HttpCache
+import stub_server
+
+PLATFORMS = list(stub_server.PRODUCT_URLS)
+
+# ========================
+# MEASUREMENT
+# ========================
+
+def summarize(name, timings, wall, **extra):
+    """Latency percentiles (nearest rank) and throughput for one stage."""
+    timings = sorted(timings)
+    count = len(timings)
+
+    def percentile(p):
+        return round(timings[min(count - 1, int(count * p))] * 1000, 3)
+
+    return dict({
+        'name': name,
+        'runs': count,
+        'p50_ms': percentile(0.50),
+        'p95_ms': percentile(0.95),
+        'p99_ms': percentile(0.99),
+        'mean_ms': round(sum(timings) / count * 1000, 3),
+        'ops_per_s': round(count / wall, 1) if wall else 0.0
+    }, **extra)
+
+def measure(name, func, inputs, runs, setup=None, **extra):
+    """Time `func(item)` over `runs` calls, cycling through `inputs`."""
+    timings = []
+    wall = 0.0
+    for i in range(runs):
+        item = inputs[i % len(inputs)]
+        if setup:
+            setup()
+        started = time.perf_counter()
+        func(item)
+        elapsed = time.perf_counter() - started
+        timings.append(elapsed)
+        wall += elapsed
+    return summarize(name, timings, wall, **extra)
+
+async def measure_async(name, func, inputs, runs, setup=None, **extra):
+    """Async counterpart of measure(); `setup` runs outside the timed region."""
+    timings = []
+    wall = 0.0
+    for i in range(runs):
+        item = inputs[i % len(inputs)]
+        if setup:
+            setup()
+        started = time.perf_counter()
+        await func(item)
+        elapsed = time.perf_counter() - started
+        timings.append(elapsed)
+        wall += elapsed
+    return summarize(name, timings, wall, **extra)
+
+# ========================
+# FAKE TELEGRAM OBJECTS
+# ========================
+
+class FakeMessage:
+    """Just enough of telegram.Message for handle_message; records replies."""
+
+    def __init__(self, text=None, photo_bytes=None):
+        self.text = text
+        self.caption = None
+        self.chat_id = 100000001
+        self.chat = SimpleNamespace(id=self.chat_id, type='private')
+        self.photo = [SimpleNamespace(
+            file_id='bench-photo', file_unique_id=f"bench-{hash(photo_bytes)}", file_size=len(photo_bytes)
+        )] if photo_bytes else []
+        self.replies = []
+        self.calls = 0
+
+    async def reply_text(self, text, **kwargs):
+        self.calls += 1
+        self.replies.append(('text', text))
+
+    async def reply_photo(self, photo, caption=None, **kwargs):
+        self.calls += 1
+        self.replies.append(('photo', caption))
+        # Uploads get a fresh file_id back, like the Bot API's PhotoSize list
+        file_id = photo if isinstance(photo, str) else f"bench-file-{id(photo)}"
+        return SimpleNamespace(photo=[SimpleNamespace(file_id=file_id)])
+
+    async def reply_media_group(self, media, **kwargs):
+        self.calls += 1
+        sent = []
+        for item in media:
+            self.replies.append(('photo', item.caption))
+            file_id = item.media if isinstance(item.media, str) else f"bench-file-{id(item)}"
+            sent.append(SimpleNamespace(photo=[SimpleNamespace(file_id=file_id)]))
+        return tuple(sent)
+
+def fake_context(photo_bytes=None):
+    async def download_as_bytearray():
+        return bytearray(photo_bytes or b"")
+
+    async def get_file(file_id):
+        return SimpleNamespace(file_id=file_id, download_as_bytearray=download_as_bytearray)
+
+    return SimpleNamespace(bot=SimpleNamespace(get_file=get_file), args=[])
+
+def tesseract_available():
+    try:
+        pytesseract.get_tesseract_version()
+        return True
+    except Exception:
+        return False
+
+# ========================
+# STAGES
+# ========================
+
+def reset_caches(keep_http=False):
+    bot.product_cache.clear()
+    bot.shortlink_cache.clear()
+    bot.file_id_cache.clear()
+    bot.ocr_cache.clear()
+    if not keep_http:
+        bot.http_cache.clear()
+
+async def run_stages(runs, pages, screenshots, has_ocr):
+    results = []
+    short_urls = list(stub_server.SHORT_URLS.values())
+    affiliate_urls = [f"{url}{'&' if '?' in url else '?'}tag=deals-21&ref_=bench&utm_source=telegram" for url in stub_server.PRODUCT_URLS.values()]
+
+    results.append(await measure_async('expand_short_url', bot.expand_short_url, short_urls, runs, setup=bot.shortlink_cache.clear, cache='cold'))
+    results.append(await measure_async('expand_short_url', bot.expand_short_url, short_urls, runs * 10, cache='warm'))
+    results.append(await measure_async('clean_url', bot.clean_url, affiliate_urls, runs * 10))
+
+    for platform in PLATFORMS:
+        url = stub_server.PRODUCT_URLS[platform]
+        result = await measure_async('scrape_product', lambda u, p=platform: bot.scrape_product(u, p), [url], runs, platform=platform)
+        data = await bot.scrape_product(url, platform)
+        result['hit'] = bool(data and data['price'] != "Price unavailable" and data['image_url'])
+        results.append(result)
+
+    raw = [extractors.extract(pages[p], p) for p in PLATFORMS]
+    titles = [(title, p, stub_server.PRODUCT_URLS[p]) for (title, _, _), p in zip(raw, PLATFORMS)]
+    results.append(measure('clean_title', lambda item: bot.clean_title(*item), titles, runs * 1000))
+    prices = [price for _, price, _ in raw] + ["₹1,299.00", "Rs. 499", "", "MRP ₹2,999"]
+    results.append(measure('parse_price', bot.parse_price, prices, runs * 1000))
+
+    shots = [screenshots[p] for p in PLATFORMS if p in screenshots]
+    if has_ocr and shots:
+        results.append(measure('extract_text_from_image', bot.extract_text_from_image, shots, max(5, runs // 3)))
+    else:
+        results.append({'name': 'extract_text_from_image', 'skipped': "tesseract not installed"})
+
+    text = "Deals today:\n" + "\n".join(short_urls) + "\npin 560001"
+
+    async def handle(item):
+        update = SimpleNamespace(message=FakeMessage(**item), effective_user=None, effective_chat=None)
+        await bot.handle_message(update, fake_context(item.get('photo_bytes')))
+        replies = update.message.replies
+        handle.photos = sum(1 for kind, _ in replies if kind == 'photo')
+        handle.replies = len(replies)
+        handle.calls = update.message.calls
+
+    # revalidate: everything cold except stored HTTP bodies, so images come back as 304s
+    for cache, setup in (('cold', reset_caches), ('revalidate', lambda: reset_caches(keep_http=True)), ('warm', None)):
+        result = await measure_async('handle_message', handle, [{'text': text}], runs, setup=setup, cache=cache, urls=len(short_urls))
+        result.update(replies=handle.replies, photos=handle.photos, api_calls=handle.calls)
+        results.append(result)
+    if has_ocr and shots:
+        result = await measure_async('handle_message', handle, [{'photo_bytes': s} for s in shots], max(5, runs // 3), setup=reset_caches, cache='cold', input='photo')
+        result.update(replies=handle.replies, photos=handle.photos, api_calls=handle.calls)
+        results.append(result)
+    else:
+        results.append({'name': 'handle_message', 'input': 'photo', 'skipped': "tesseract not installed"})
+    return results
+
+async def run(args, pages, screenshots, has_ocr):
+    try:
+        return await run_stages(args.runs, pages, screenshots, has_ocr)
+    finally:
+        await http_client.close_client()
+
+# ========================
+# REPORTING
+# ========================
+
+def result_key(result):
+    return "|".join(str(result.get(k, '')) for k in ('name', 'platform', 'cache', 'input'))
+
+def compare(results, baseline, threshold):
+    """Print p50/p95 deltas against a baseline; returns the regressed stage keys."""
+    previous = {result_key(r): r for r in baseline['results']}
+    regressions = []
+    print(f"\n{'stage':<44} {'p50 ms':>10} {'Δ':>8} {'p95 ms':>10} {'Δ':>8}")
+    for r in results:
+        old = previous.get(result_key(r))
+        if 'skipped' in r or not old or 'skipped' in old:
+            continue
+        d50 = (r['p50_ms'] - old['p50_ms']) / old['p50_ms'] if old['p50_ms'] else 0.0
+        d95 = (r['p95_ms'] - old['p95_ms']) / old['p95_ms'] if old['p95_ms'] else 0.0
+        flag = "  REGRESSION" if d95 > threshold else ""
+        if flag:
+            regressions.append(result_key(r))
+        print(f"{result_key(r):<44} {r['p50_ms']:>10} {d50:>+8.0%} {r['p95_ms']:>10} {d95:>+8.0%}{flag}")
+    return regressions
+
+def print_table(results):
+    print(f"{'stage':<44} {'runs':>6} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'ops/s':>10}")
+    for r in results:
+        if 'skipped' in r:
+            print(f"{result_key(r):<44} skipped ({r['skipped']})")
+            continue
+        print(f"{result_key(r):<44} {r['runs']:>6} {r['p50_ms']:>10} {r['p95_ms']:>10} {r['p99_ms']:>10} {r['ops_per_s']:>10}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark of the bot pipeline against local fixtures.")
+    parser.add_argument('--runs', type=int, default=30, help="Iterations per network stage (micro stages run more)")
+    parser.add_argument('--pad-kb', type=int, default=500, help="Filler markup added to each page")
+    parser.add_argument('--delay-ms', type=float, default=0, help="Simulated network latency per response")
+    parser.add_argument('--json', action='store_true', help="Emit results as JSON")
+    parser.add_argument('--output', help="Also write the JSON results to this file")
+    parser.add_argument('--compare', help="Baseline JSON file to compare against")
+    parser.add_argument('--threshold', type=float, default=0.25, help="p95 slowdown that counts as a regression")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    has_ocr = tesseract_available()
+    pages = stub_server.load_pages(stub_server.PAGES_DIR, args.pad_kb)
+    _, screenshots = stub_server.load_images()
+
+    # Fork the CPU workers before the stub server starts its thread
+    workers.start()
+    server, proxy_url = stub_server.start(pad_kb=args.pad_kb, delay_ms=args.delay_ms)
+    for name in ('http_proxy', 'HTTP_PROXY'):
+        os.environ[name] = proxy_url
+    for name in ('no_proxy', 'NO_PROXY'):
+        os.environ.pop(name, None)
+    # Keep benchmark entries out of the bot's persistent SQLite stores
+    bot.shortlink_cache.close()
+    bot.shortlink_cache = ShortLinkCache(':memory:', 1000, 600)
+    bot.file_id_cache.close()
+    bot.file_id_cache = FileIdCache(':memory:', 1000, 3600)
+    bot.http_cache.close()
+    bot.http_cache = HttpCache(':memory:', 256 * 1024 * 1024, 16 * 1024 * 1024)
+    http_client.use_cache(bot.http_cache)
+    # The stub needs no politeness delays; pacing would only measure the limiter
+    http_client.RATE_LIMIT.update(rate=1e6, burst=1e6, host_overrides={})
+    # Fake replies cost nothing; Telegram's 1 msg/s per chat would dominate every stage
+    bot.send_queue = sender.SendQueue(1e6, 1e6, 1e6, 1e6, 1e6, 1e6)
+
+    try:
+        results = asyncio.run(run(args, pages, screenshots, has_ocr))
+    finally:
+        server.shutdown()
+        workers.shutdown()
+
+    report = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': host_platform.python_version(),
+            'machine': host_platform.machine(),
+            'cpus': os.cpu_count(),
+            'parser_backends': list(extractors.BACKENDS),
+            'http2': http_client.HTTP2_AVAILABLE,
+            'accept_encoding': http_client.accept_encoding(),
+            'streaming': bot.STREAMING['enabled'],
+            'tesseract': has_ocr,
+            'ocr_engine': 'tesserocr' if bot.ocr.TESSEROCR_AVAILABLE else 'pytesseract',
+            'runs': args.runs,
+            'pad_kb': args.pad_kb,
+            'delay_ms': args.delay_ms,
+            'stub_hits': stub_server.StubHandler.hits
+        },
+        'results': results
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+    else:
+        print_table(results)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} stage(s) regressed by more than {args.threshold:.0%} at p95")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# benchmarks/post_updates.py - Fake Telegram update poster
+
+"""
+POSTs synthetic Telegram message updates to the bot's webhook endpoint,
+the way Telegram's servers would, and reports status codes and delivery
+latency. Use it to exercise webhook mode locally: leave WEBHOOK['url']
+empty so nothing is registered with Telegram, start the bot, then run
+this script. Replies to the fake chat fail at the Bot API, which is
+expected; the point is the intake, queueing and draining path.
+
+Usage: python benchmarks/post_updates.py [--url http://127.0.0.1:8443/telegram] [--count 50]
+                                         [--concurrency 10] [--secret TOKEN] [--text "..."]
+"""
+
+import sys
+import time
+import asyncio
+import argparse
+
+import httpx
+
+DEFAULT_TEXT = "Deal https://www.amazon.in/dp/B0BENCH450?tag=deals-21"
+
+def fake_update(update_id, text, chat_id=100000001):
+    """Minimal private-chat message update in Bot API JSON form."""
+    now = int(time.time())
+    return {
+        'update_id': update_id,
+        'message': {
+            'message_id': update_id,
+            'date': now,
+            'chat': {'id': chat_id, 'type': 'private', 'first_name': "Bench"},
+            'from': {'id': chat_id, 'is_bot': False, 'first_name': "Bench"},
+            'text': text
+        }
+    }
+
+async def post_all(url, count, concurrency, secret, text):
+    headers = {'X-Telegram-Bot-Api-Secret-Token': secret} if secret else {}
+    slots = asyncio.Semaphore(concurrency)
+    statuses = {}
+    timings = []
+    first_id = int(time.time()) * 1000
+
+    async def post(client, update_id):
+        async with slots:
+            started = time.perf_counter()
+            try:
+                response = await client.post(url, json=fake_update(update_id, text), headers=headers)
+                status = response.status_code
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            timings.append(time.perf_counter() - started)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    started = time.perf_counter()
+    async with httpx.AsyncClient(timeout=30) as client:
+        await asyncio.gather(*(post(client, first_id + i) for i in range(count)))
+    return statuses, sorted(timings), time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser(description="Post fake Telegram updates to a webhook.")
+    parser.add_argument('--url', default="http://127.0.0.1:8443/telegram")
+    parser.add_argument('--count', type=int, default=50)
+    parser.add_argument('--concurrency', type=int, default=10)
+    parser.add_argument('--secret', default="", help="Value for X-Telegram-Bot-Api-Secret-Token")
+    parser.add_argument('--text', default=DEFAULT_TEXT, help="Message text of every update")
+    args = parser.parse_args()
+
+    statuses, timings, elapsed = asyncio.run(post_all(args.url, args.count, args.concurrency, args.secret, args.text))
+    p50 = timings[len(timings) // 2] * 1000 if timings else 0.0
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))] * 1000 if timings else 0.0
+    print(f"Posted {args.count} updates in {elapsed:.2f}s | statuses {statuses} | p50 {p50:.1f} ms, p95 {p95:.1f} ms")
+    if any(status != 200 for status in statuses):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+# benchmarks/stub_server.py - Local stand-in for the marketplaces
+
+"""
+Serves the recorded fixtures so the bot's network paths can be measured
+without touching live sites. It runs as a plain HTTP forward proxy: point
+HTTP_PROXY at it and request http:// marketplace URLs, and it answers by host.
+  - shortener hosts (cutt.ly, fkrt.cc, ...): 301 to the platform's product URL
+  - marketplace hosts (amazon.in, flipkart.com, ...): the saved product page,
+    compressed with the first of br / zstd / gzip the client accepts
+  - image CDN hosts: the platform's product image, with an ETag so
+    conditional GETs get a 304
+Absolute https:// links inside pages are rewritten to http:// so image
+fetches come back through the proxy too.
+
+Usage: python benchmarks/stub_server.py [--port 8765] [--pad-kb 500] [--delay-ms 0]
+"""
+
+import os
+import re
+import sys
+import gzip
+import time
+import hashlib
+import argparse
+import threading
+from urllib.parse import urlsplit
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+
+from bench_parsers import load_pages
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+PAGES_DIR = os.path.join(BENCH_DIR, 'pages')
+IMAGES_DIR = os.path.join(BENCH_DIR, 'images')
+
+# Canonical product URL served for each platform (plain http, via the proxy)
+PRODUCT_URLS = {
+    'amazon': "http://www.amazon.in/dp/B0BENCH450",
+    'flipkart': "http://www.flipkart.com/apple-iphone-15-black-128-gb/p/itm6ac6485515ae4?pid=MOBGTAGPTB3VS24W",
+    'meesho': "http://www.meesho.com/trendy-women-kurtis/p/123456789",
+    'myntra': "http://www.myntra.com/shirts/roadster/roadster-men-navy-blue-checked-casual-shirt/1364628/buy",
+    'ajio': "http://www.ajio.com/netplay-crew-neck-t-shirt/p/469012345_navy",
+    'snapdeal': "http://www.snapdeal.com/product/prestige-pkgss-17-litre-electric/123456789"
+}
+# Short link per platform; each shortener redirects to PRODUCT_URLS[platform]
+SHORT_URLS = {
+    'amazon': "http://amzn-to.co/amazon",
+    'flipkart': "http://fkrt.cc/flipkart",
+    'meesho': "http://spoo.me/meesho",
+    'myntra': "http://bitli.in/myntra",
+    'ajio': "http://da.gd/ajio",
+    'snapdeal': "http://cutt.ly/snapdeal"
+}
+MARKETPLACE_HOSTS = {
+    'amazon.in': 'amazon',
+    'flipkart.com': 'flipkart',
+    'meesho.com': 'meesho',
+    'myntra.com': 'myntra',
+    'ajio.com': 'ajio',
+    'snapdeal.com': 'snapdeal'
+}
+IMAGE_HOSTS = {
+    'media-amazon.com': 'amazon',
+    'flixcart.com': 'flipkart',
+    'images.meesho.com': 'meesho',
+    'myntassets.com': 'myntra',
+    'assets.ajio.com': 'ajio',
+    'sdlcdn.com': 'snapdeal'
+}
+
+def load_images(directory=IMAGES_DIR):
+    """Read <platform>.jpg product images and <platform>_screenshot.png OCR inputs."""
+    images, screenshots = {}, {}
+    for name in sorted(os.listdir(directory)):
+        with open(os.path.join(directory, name), 'rb') as f:
+            data = f.read()
+        stem = os.path.splitext(name)[0]
+        if stem.endswith('_screenshot'):
+            screenshots[stem[:-len('_screenshot')]] = data
+        else:
+            images[stem] = data
+    return images, screenshots
+
+# Content encodings the stub can produce, with compression levels typical of CDNs
+ENCODERS = {'gzip': lambda body: gzip.compress(body, 6)}
+if brotli is not None:
+    ENCODERS['br'] = lambda body: brotli.compress(body, quality=5)
+if zstandard is not None:
+    ENCODERS['zstd'] = lambda body: zstandard.ZstdCompressor(level=3).compress(body)
+
+def _match_host(host, table):
+    return next((value for suffix, value in table.items() if host == suffix or host.endswith(suffix)), None)
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and small (compressed) bodies are separate writes; without this,
+    # Nagle plus delayed ACKs adds ~40 ms to every response
+    disable_nagle_algorithm = True
+    pages = {}
+    images = {}
+    etags = {}
+    encoded = {}  # (platform, encoding) -> compressed page
+    delay = 0.0
+    hits = {}
+
+    def do_GET(self):
+        self._respond(send_body=True)
+
+    def do_HEAD(self):
+        self._respond(send_body=False)
+
+    def _respond(self, send_body):
+        parts = urlsplit(self.path)
+        host = (parts.hostname or self.headers.get('Host', '').split(':')[0]).lower()
+        if self.delay:
+            time.sleep(self.delay)
+
+        short = next((p for p, url in SHORT_URLS.items() if urlsplit(url).hostname == host and parts.path == urlsplit(url).path), None)
+        if short:
+            self._count('redirect')
+            return self._send(301, b"", {'Location': PRODUCT_URLS[short]}, send_body)
+        # CDN hosts first: images.meesho.com would otherwise match meesho.com
+        platform = _match_host(host, IMAGE_HOSTS)
+        if platform and platform in self.images:
+            # CDN-style validators, so conditional GETs can be answered with a 304
+            etag = self.etags[platform]
+            if self.headers.get('If-None-Match') == etag:
+                self._count('not_modified')
+                return self._send(304, b"", {'ETag': etag}, send_body)
+            self._count('image')
+            return self._send(200, self.images[platform], {'Content-Type': 'image/jpeg', 'ETag': etag}, send_body)
+        platform = _match_host(host, MARKETPLACE_HOSTS)
+        if platform and platform in self.pages:
+            self._count('page')
+            headers = {'Content-Type': 'text/html; charset=utf-8'}
+            encoding = self._pick_encoding()
+            body = self.pages[platform]
+            if encoding:
+                key = (platform, encoding)
+                if key not in self.encoded:
+                    self.encoded[key] = ENCODERS[encoding](body)
+                body = self.encoded[key]
+                headers['Content-Encoding'] = encoding
+            return self._send(200, body, headers, send_body)
+        self._count('not_found')
+        self._send(404, b"not found", {'Content-Type': 'text/plain'}, send_body)
+
+    def _pick_encoding(self):
+        accepted = [token.split(';')[0].strip().lower() for token in self.headers.get('Accept-Encoding', '').split(',')]
+        return next((name for name in accepted if name in ENCODERS), None)
+
+    def _count(self, kind):
+        StubHandler.hits[kind] = StubHandler.hits.get(kind, 0) + 1
+
+    def _send(self, status, body, headers, send_body):
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if send_body and body:
+            try:
+                self.wfile.write(body)
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # Streaming clients hang up once they have the fields
+
+    def log_message(self, format, *args):
+        pass
+
+def start(port=0, pad_kb=500, delay_ms=0):
+    """Start the stub in a daemon thread; returns (server, proxy_url)."""
+    pages = load_pages(PAGES_DIR, pad_kb)
+    StubHandler.pages = {p: re.sub(rb'https://(?!schema\.org)', b'http://', html) for p, html in pages.items()}
+    StubHandler.images, _ = load_images()
+    StubHandler.encoded = {}
+    StubHandler.etags = {p: f'"{hashlib.md5(data).hexdigest()}"' for p, data in StubHandler.images.items()}
+    StubHandler.delay = delay_ms / 1000
+    StubHandler.hits = {}
+    server = ThreadingHTTPServer(('127.0.0.1', port), StubHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve benchmark fixtures as a local HTTP proxy.")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--pad-kb', type=int, default=500, help="Filler markup added to each page")
+    parser.add_argument('--delay-ms', type=float, default=0, help="Simulated latency per response")
+    args = parser.parse_args()
+
+    server, proxy_url = start(args.port, args.pad_kb, args.delay_ms)
+    print(f"Stub server listening; use HTTP_PROXY={proxy_url}")
+    for platform, url in SHORT_URLS.items():
+        print(f"  {platform:<9} {url} -> {PRODUCT_URLS[platform]}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
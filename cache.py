@@ -0,0 +1,419 @@
+# cache.py - In-process caches
+
+"""
+Bounded caches shared by the bot's hot paths.
+TTLCache combines time-based expiry with LRU eviction and keeps hit/miss
+counters so the admin /cache command can report how well it is doing.
+ShortLinkCache persists short-link resolutions in a local SQLite file,
+FileIdCache does the same for Telegram file_ids of uploaded product images,
+and HttpCache keeps response bodies with their validators for conditional GETs;
+all three share the connection setup and housekeeping of SQLiteStore.
+SingleFlight deduplicates concurrent work for the same key.
+"""
+
+import os
+import time
+import asyncio
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+class TTLCache:
+    """Dictionary-like cache with per-entry TTL and LRU eviction."""
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, default=None):
+        """Return the cached value, or `default` if missing or expired."""
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self.expirations += 1
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key, value, ttl=None):
+        """Store a value, evicting the least recently used entry when full."""
+        expires_at = time.monotonic() + (ttl if ttl is not None else self.ttl)
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        """Remove all entries; returns how many were dropped."""
+        count = len(self._data)
+        self._data.clear()
+        return count
+
+    def stats(self):
+        """Snapshot of size and counters."""
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'max_size': self.max_size,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'expirations': self.expirations
+        }
+
+    def __len__(self):
+        return len(self._data)
+
+class SQLiteStore:
+    """Base for the persistent caches: one WAL-mode SQLite connection over one table.
+
+    Subclasses pass their table name and schema statements, and share the
+    row-count trimming, clear() and close() defined here.
+    """
+
+    def __init__(self, path, table, schema):
+        self.path = path
+        self.table = table
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        for statement in schema:
+            self._conn.execute(statement)
+        self._conn.commit()
+
+    def _commit(self):
+        self._conn.commit()
+
+    def _count(self):
+        (count,) = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()
+        return count
+
+    def _trim_rows(self, key, order_by, max_rows):
+        """Drop the rows first in `order_by` until at most `max_rows` remain."""
+        count = self._count()
+        if count > max_rows:
+            self._conn.execute(
+                f"DELETE FROM {self.table} WHERE {key} IN ("
+                f" SELECT {key} FROM {self.table} ORDER BY {order_by} LIMIT ?)",
+                (count - max_rows,)
+            )
+
+    def clear(self):
+        """Remove all rows; returns how many were dropped."""
+        count = self._conn.execute(f"DELETE FROM {self.table}").rowcount
+        self._commit()
+        return count
+
+    def close(self):
+        self._commit()
+        self._conn.close()
+
+class ShortLinkCache(SQLiteStore):
+    """SQLite-backed map of short URL -> expanded URL that survives restarts.
+
+    A short code's target never changes, so resolved links are kept until
+    the table exceeds `max_entries` (oldest rows are dropped first). Failed
+    expansions are cached as dead links for `negative_ttl` seconds only.
+    """
+
+    def __init__(self, path, max_entries, negative_ttl):
+        super().__init__(path, 'short_links', [
+            "CREATE TABLE IF NOT EXISTS short_links ("
+            " short_url TEXT PRIMARY KEY,"
+            " target TEXT,"  # NULL marks a dead link
+            " resolved_at REAL NOT NULL)",
+            "CREATE INDEX IF NOT EXISTS idx_short_links_resolved ON short_links(resolved_at)"
+        ])
+        self.max_entries = max_entries
+        self.negative_ttl = negative_ttl
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, short_url):
+        """Return (hit, target); target is None for a cached dead link."""
+        row = self._conn.execute(
+            "SELECT target, resolved_at FROM short_links WHERE short_url = ?", (short_url,)
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return False, None
+        target, resolved_at = row
+        if target is None and time.time() - resolved_at > self.negative_ttl:
+            self._conn.execute("DELETE FROM short_links WHERE short_url = ?", (short_url,))
+            self._conn.commit()
+            self.misses += 1
+            return False, None
+        self.hits += 1
+        return True, target
+
+    def set(self, short_url, target):
+        """Record a resolution; pass target=None to cache a dead link."""
+        self._conn.execute(
+            "INSERT OR REPLACE INTO short_links (short_url, target, resolved_at) VALUES (?, ?, ?)",
+            (short_url, target, time.time())
+        )
+        self._trim_rows('short_url', 'resolved_at', self.max_entries)
+        self._conn.commit()
+
+    def stats(self):
+        """Snapshot of size and counters."""
+        size = self._count()
+        (dead,) = self._conn.execute("SELECT COUNT(*) FROM short_links WHERE target IS NULL").fetchone()
+        return {
+            'size': size,
+            'dead': dead,
+            'max_size': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses
+        }
+
+class FileIdCache(SQLiteStore):
+    """SQLite-backed map of product image -> Telegram file_id that survives restarts.
+
+    Entries are keyed both on the image URL and on a hash of the uploaded
+    bytes. URL entries expire after `url_ttl` seconds in case a CDN URL is
+    reused for a new picture; content-hash entries are kept until the table
+    exceeds `max_entries`.
+    """
+
+    def __init__(self, path, max_entries, url_ttl):
+        super().__init__(path, 'file_ids', [
+            "CREATE TABLE IF NOT EXISTS file_ids ("
+            " key TEXT PRIMARY KEY,"  # 'url:<image url>' or 'sha256:<hex digest>'
+            " file_id TEXT NOT NULL,"
+            " stored_at REAL NOT NULL)",
+            "CREATE INDEX IF NOT EXISTS idx_file_ids_stored ON file_ids(stored_at)",
+            "CREATE INDEX IF NOT EXISTS idx_file_ids_file_id ON file_ids(file_id)"
+        ])
+        self.max_entries = max_entries
+        self.url_ttl = url_ttl
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, url=None, digest=None):
+        """Return the cached file_id for an image URL or content digest, else None."""
+        if url is not None:
+            row = self._conn.execute(
+                "SELECT file_id FROM file_ids WHERE key = ? AND stored_at > ?",
+                (f"url:{url}", time.time() - self.url_ttl)
+            ).fetchone()
+        else:
+            row = self._conn.execute("SELECT file_id FROM file_ids WHERE key = ?", (f"sha256:{digest}",)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return row[0]
+
+    def set(self, file_id, url=None, digest=None):
+        """Remember `file_id` under the image URL and/or content digest."""
+        now = time.time()
+        keys = ([f"url:{url}"] if url else []) + ([f"sha256:{digest}"] if digest else [])
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO file_ids (key, file_id, stored_at) VALUES (?, ?, ?)",
+            [(key, file_id, now) for key in keys]
+        )
+        self._trim_rows('key', 'stored_at', self.max_entries)
+        self._conn.commit()
+
+    def discard(self, file_id):
+        """Forget every key pointing at a file_id Telegram no longer accepts."""
+        self._conn.execute("DELETE FROM file_ids WHERE file_id = ?", (file_id,))
+        self._conn.commit()
+
+    def stats(self):
+        """Snapshot of size and counters."""
+        return {
+            'size': self._count(),
+            'max_size': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses
+        }
+
+class HttpCache(SQLiteStore):
+    """SQLite-backed HTTP response cache for conditional GETs, bounded by total body size.
+
+    Bodies are stored with their ETag / Last-Modified validators and a
+    freshness deadline from Cache-Control max-age. Fresh entries are served
+    without a request; stale ones are revalidated. Least recently used
+    entries are dropped once the stored bodies exceed `max_bytes`.
+
+    Lookups read the validators only; a body is loaded with body() when it
+    is actually served. Usage stamps from touch() are committed in batches,
+    and the total body size is kept as a running count. Calls are
+    serialized by a lock, so the cache can be used from worker threads
+    (http_client runs it through asyncio.to_thread).
+    """
+
+    # Commit pending touch() updates after this many, or this many seconds
+    TOUCH_BATCH = 64
+    TOUCH_INTERVAL = 5.0
+
+    def __init__(self, path, max_bytes, max_entry_bytes):
+        super().__init__(path, 'http_responses', [
+            "CREATE TABLE IF NOT EXISTS http_responses ("
+            " url TEXT PRIMARY KEY,"
+            " etag TEXT,"
+            " last_modified TEXT,"
+            " content_type TEXT,"
+            " fresh_until REAL NOT NULL,"  # 0: revalidate on every use
+            " body BLOB NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " used_at REAL NOT NULL)",
+            "CREATE INDEX IF NOT EXISTS idx_http_responses_used ON http_responses(used_at)"
+        ])
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.fresh_hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        (self._bytes,) = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM http_responses").fetchone()
+        self._touched = 0
+        self._committed_at = time.monotonic()
+
+    def get(self, url):
+        """Return the stored validators as a dict (etag, last_modified, content_type, fresh), else None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, last_modified, content_type, fresh_until FROM http_responses WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        etag, last_modified, content_type, fresh_until = row
+        return {
+            'etag': etag,
+            'last_modified': last_modified,
+            'content_type': content_type,
+            'fresh': fresh_until > time.time()
+        }
+
+    def body(self, url):
+        """Return the stored body, or None if the entry has been evicted since get()."""
+        with self._lock:
+            row = self._conn.execute("SELECT body FROM http_responses WHERE url = ?", (url,)).fetchone()
+        return row[0] if row else None
+
+    def set(self, url, body, etag=None, last_modified=None, content_type=None, max_age=0):
+        """Store a 200 response body; returns False if it is too large to keep."""
+        if len(body) > self.max_entry_bytes:
+            return False
+        now = time.time()
+        with self._lock:
+            old = self._conn.execute("SELECT size FROM http_responses WHERE url = ?", (url,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO http_responses"
+                " (url, etag, last_modified, content_type, fresh_until, body, size, used_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, etag, last_modified, content_type, now + max_age if max_age else 0, body, len(body), now)
+            )
+            self._bytes += len(body) - (old[0] if old else 0)
+            self._trim()
+            self._commit()
+        return True
+
+    def touch(self, url, max_age=0):
+        """Mark an entry as used after a fresh hit or a 304, renewing its freshness."""
+        now = time.time()
+        with self._lock:
+            if max_age:
+                self._conn.execute(
+                    "UPDATE http_responses SET used_at = ?, fresh_until = ? WHERE url = ?", (now, now + max_age, url)
+                )
+            else:
+                self._conn.execute("UPDATE http_responses SET used_at = ? WHERE url = ?", (now, url))
+            self._touched += 1
+            if self._touched >= self.TOUCH_BATCH or time.monotonic() - self._committed_at >= self.TOUCH_INTERVAL:
+                self._commit()
+
+    def _commit(self):
+        super()._commit()
+        self._touched = 0
+        self._committed_at = time.monotonic()
+
+    def _trim(self):
+        if self._bytes <= self.max_bytes:
+            return
+        excess = self._bytes - self.max_bytes
+        dropped = []
+        for url, size in self._conn.execute("SELECT url, size FROM http_responses ORDER BY used_at"):
+            dropped.append((url,))
+            excess -= size
+            self._bytes -= size
+            if excess <= 0:
+                break
+        self._conn.executemany("DELETE FROM http_responses WHERE url = ?", dropped)
+
+    def clear(self):
+        """Remove all rows; returns how many were dropped."""
+        with self._lock:
+            self._bytes = 0
+            return super().clear()
+
+    def stats(self):
+        """Snapshot of size and counters."""
+        with self._lock:
+            size = self._count()
+        return {
+            'size': size,
+            'bytes': self._bytes,
+            'max_bytes': self.max_bytes,
+            'fresh_hits': self.fresh_hits,
+            'revalidated': self.revalidated,
+            'misses': self.misses
+        }
+
+    def close(self):
+        with self._lock:
+            super().close()
+
+class SingleFlight:
+    """Coalesce concurrent calls for the same key into one in-flight task.
+
+    The first caller starts the work; callers arriving while it runs await the
+    same task and receive the same result (or exception). The task is shielded
+    so a cancelled waiter does not cancel the fetch for everyone else.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self.started = 0
+        self.shared = 0
+
+    async def do(self, key, func, *args):
+        task = self._calls.get(key)
+        if task is not None:
+            self.shared += 1
+            return await asyncio.shield(task)
+        task = asyncio.ensure_future(func(*args))
+        self._calls[key] = task
+        self.started += 1
+        task.add_done_callback(lambda done: self._forget(key, done))
+        return await asyncio.shield(task)
+
+    def _forget(self, key, task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+
+    def in_flight(self):
+        return len(self._calls)
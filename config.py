@@ -31,9 +31,10 @@ SHORTENER_DOMAINS = [
 # ======================
 PIN_DEFAULT = '110001'
 SCREENSHOT_DIR = "screenshots"
-MAX_RETRIES = 2
+DATA_DIR = "data"          # Local persistent stores (SQLite caches)
+MAX_RETRIES = 2            # Extra attempts for throttled/failed outbound requests
 WATERMARK_THRESHOLD = 0.85 # Placeholder for future use
-OCR_CONFIDENCE = 0.75      # Placeholder for future use
+OCR_CONFIDENCE = 0.75      # Minimum mean word confidence for an OCR line to be kept
 
 # ======================
 # PERFORMANCE TUNING
@@ -42,11 +43,183 @@ PERFORMANCE = {
     'page_load_timeout': 8,      # Seconds for page load
     'element_wait_timeout': 5,   # Seconds for element waits
     'max_workers': 3,            # Max concurrent scraping tasks
-    'cache_ttl': 300,            # 5 minutes (Placeholder)
-    'cache_max_size': 1000,      # Max cache entries (Placeholder)
+    'cache_ttl': 300,            # Product cache entry lifetime (seconds)
+    'cache_max_size': 1000,      # Max product cache entries (LRU evicted)
     'response_target': 2.5,      # Target processing time per message (seconds)
+    'url_timeout': 20,           # Hard cap per message before unfinished URLs give up
     'monitor_interval': 10       # Log performance every N messages
 }
 
+# ======================
+# CPU WORKER POOL
+# ======================
+CPU_POOL = {
+    'processes': PERFORMANCE['max_workers'],  # Worker processes for parsing/OCR
+    'max_pending': 24            # Jobs queued or running before callers wait
+}
+OCR_POOL = {
+    'processes': 1,              # Long-lived OCR processes, each keeps the model loaded
+    'max_pending': 8             # Screenshots queued or running before callers wait
+}
+
+# ======================
+# HTTP CLIENT
+# ======================
+HTTP_CLIENT = {
+    'max_connections': 50,       # Total pooled connections across all hosts
+    'max_keepalive': 20,         # Idle keep-alive connections kept open
+    'keepalive_expiry': 30,      # Seconds an idle connection stays in the pool
+    'per_host_limit': 6,         # Concurrent requests allowed per host
+    'connect_timeout': 5,        # Seconds to establish a connection
+    'read_timeout': 10,          # Seconds for a full response
+    'http2': True                # Used only when the `h2` package is installed
+}
+
+# ======================
+# UPDATE DELIVERY
+# ======================
+UPDATES = {
+    'mode': 'polling',           # 'polling' or 'webhook'
+    'drop_pending_updates': False # Discard updates that arrived while the bot was down
+}
+WEBHOOK = {
+    'listen': '0.0.0.0',         # Bind address of the embedded aiohttp server
+    'port': 8443,
+    'path': '/telegram',         # POST endpoint Telegram delivers updates to
+    'url': '',                   # Public HTTPS URL registered with Telegram ('' = don't register, local testing)
+    'secret_token': '',          # Expected X-Telegram-Bot-Api-Secret-Token header ('' = not checked)
+    'max_connections': 40,       # Parallel deliveries Telegram may open
+    'workers': 8,                # Updates processed concurrently
+    'queue_size': 100,           # Updates buffered before Telegram is told to retry
+    'enqueue_timeout': 2,        # Seconds a delivery waits for queue space before a 503
+    'drain_timeout': 25          # Seconds allowed to finish queued updates on shutdown
+}
+
 # Global state flags (can be modified by commands)
 MODE_ADVANCED = False
+
+# ======================
+# OUTBOUND RATE LIMITING
+# ======================
+RATE_LIMIT = {
+    'rate': 10.0,                # Requests per second per host (token refill rate)
+    'burst': 20,                 # Requests a host may receive back to back
+    'initial_concurrency': 4,    # Starting in-flight limit per host (AIMD adjusts it)
+    'min_concurrency': 1,        # Floor when backing off
+    'latency_target': 3.0,       # Slower responses count as congestion (seconds)
+    'backoff_cooldown': 3.0,     # Minimum time between two halvings of a host's limit (seconds)
+    'retry_base': 0.5,           # Backoff base: delay drawn from [0, base * 2^attempt]
+    'retry_cap': 8.0,            # Longest backoff / Retry-After honoured (seconds)
+    # Stricter limits for marketplaces that serve captchas to bursty clients
+    'host_overrides': {
+        'amazon.in': {'rate': 2.0, 'burst': 4, 'initial_concurrency': 2},
+        'flipkart.com': {'rate': 3.0, 'burst': 6, 'initial_concurrency': 2}
+    },
+    # Lowercase byte markers of bot-check pages served with HTTP 200
+    'block_markers': [
+        b'/errors/validatecaptcha',
+        b'type the characters you see in this image',
+        b'api-services-support@amazon.com',
+        b'are you a human?',
+        b'captcha-delivery.com'
+    ]
+}
+
+# ======================
+# SHORT-LINK CACHE
+# ======================
+SHORTLINK_CACHE = {
+    'path': f"{DATA_DIR}/shortlinks.db",  # SQLite file, survives restarts
+    'max_entries': 50000,        # Oldest resolutions dropped beyond this
+    'negative_ttl': 600          # Seconds a dead/failed link stays cached
+}
+
+# ======================
+# TELEGRAM FILE_ID CACHE
+# ======================
+FILE_ID_CACHE = {
+    'path': f"{DATA_DIR}/file_ids.db",  # SQLite file, survives restarts
+    'max_entries': 20000,        # Oldest entries dropped beyond this
+    'url_ttl': 7 * 24 * 3600     # Seconds an image URL -> file_id mapping is trusted
+}
+
+# ======================
+# COMPRESSED TRANSFERS
+# ======================
+COMPRESSION = {
+    'encodings': ['br', 'zstd', 'gzip'],  # Advertised in preference order (br/zstd need brotli/zstandard)
+    'thread_min_bytes': 16384    # Compressed chunks at least this big are decoded in a worker thread
+}
+
+# ======================
+# OUTBOUND TELEGRAM SENDS
+# ======================
+TELEGRAM_SEND = {
+    'enabled': True,             # Route replies through the rate-limited send queue
+    'global_rate': 30,           # Messages per second across all chats (Bot API limit)
+    'global_burst': 30,
+    'chat_rate': 1.0,            # Messages per second in one private chat
+    'chat_burst': 3,             # Short bursts Telegram tolerates in a private chat
+    'group_rate': 20 / 60,       # Messages per second in one group (20 per minute)
+    'group_burst': 3,
+    'max_flood_retries': 3,      # RetryAfter responses retried per send before giving up
+    'idle_timeout': 60           # Seconds before an idle chat's lane is dropped
+}
+
+# ======================
+# MEDIA GROUPS
+# ======================
+MEDIA_GROUP = {
+    'enabled': True,             # Send a message's product photos as albums
+    'max_items': 10              # Photos per send_media_group (Bot API maximum is 10)
+}
+
+# ======================
+# HTTP RESPONSE CACHE
+# ======================
+HTTP_CACHE = {
+    'enabled': True,             # Conditional GETs (ETag / Last-Modified) for pages and images
+    'path': f"{DATA_DIR}/http_cache.db",  # SQLite file, survives restarts
+    'max_bytes': 200 * 1024 * 1024,       # Least recently used bodies dropped beyond this
+    'max_entry_bytes': 5 * 1024 * 1024    # Larger bodies are never stored
+}
+
+# ======================
+# STREAMING FETCH
+# ======================
+STREAMING = {
+    'enabled': True,             # Stop product page downloads once fields are found
+    'chunk_size': 65536,         # Bytes read per chunk
+    'max_bytes': 3 * 1024 * 1024 # Safety cap on bytes read per page
+}
+
+# ======================
+# IMAGE PIPELINE
+# ======================
+IMAGE_PIPELINE = {
+    'enabled': True,             # Downscale/recompress product images before upload
+    'max_side': 1280,            # Telegram displays photos at most this many px wide/tall
+    'jpeg_quality': 82,          # Quality used when recompressing
+    'passthrough_bytes': 300 * 1024, # Small JPEG/PNG within max_side are sent untouched
+    'max_download_bytes': 10 * 1024 * 1024 # Give up on images larger than this
+}
+
+# ======================
+# SCREENSHOT OCR
+# ======================
+OCR = {
+    'lang': 'eng',               # Tesseract language model
+    'max_side': 2000,            # Screenshots are downscaled to this before OCR
+    'address_bar_fraction': 0.15, # Height of the top/bottom strips read for URLs first
+    'cache_ttl': 24 * 3600,      # Seconds an OCR result is reused for the same screenshot
+    'cache_max_size': 2000       # Max cached OCR results (LRU evicted)
+}
+
+# ======================
+# METRICS
+# ======================
+METRICS_ENDPOINT = {
+    'enabled': True,             # Serve Prometheus-style metrics over HTTP
+    'host': '127.0.0.1',         # Bind address (keep local unless scraped remotely)
+    'port': 9108                 # GET http://host:port/metrics
+}
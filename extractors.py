@@ -0,0 +1,583 @@
+# extractors.py - Declarative product field extraction
+
+"""
+Per-platform extractor registry for scrape_product.
+Each platform is described as data: for every field an ordered list of rules
+(CSS selectors, meta tags, text patterns). The registry is compiled once at
+import and dispatched by platform name. Rules run on a C-based engine
+(selectolax, else lxml) first; BeautifulSoup evaluates the same rules only
+when that fast path cannot find every required field. StreamExtractor runs
+the exact (class/id) rules on a partially downloaded page, scanning only
+the newly received bytes each time, so the fetch can stop early.
+Before any tree is built, structured data (JSON-LD Product blocks, embedded
+page state, OpenGraph/product meta tags) is located with byte-level regexes;
+the DOM rules only run for fields it does not provide.
+"""
+
+import re
+import json
+import html
+import logging
+
+import soupsieve
+from bs4 import BeautifulSoup
+
+logger = logging.getLogger(__name__)
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
+
+try:
+    import lxml.html
+    from lxml.cssselect import CSSSelector
+except ImportError:
+    lxml = None
+
+FIELDS = ('title', 'price', 'image')
+REQUIRED_FIELDS = ('title', 'price', 'image')
+DEFAULTS = {'title': "Product", 'price': "Price unavailable", 'image': None}
+IMAGE_ATTRS = ('src', 'data-src', 'data-old-hires')
+PRICE_TEXT = r'₹|Rs\.'
+PRICE_NUMBER = r'(?:₹|Rs\.?)\s*([\d,]+\.?\d*)'
+
+# ========================
+# RULE CONSTRUCTORS
+# ========================
+
+def css(selector, attr=None, extract=None):
+    """First element matching `selector`: its text, or the first non-empty `attr`."""
+    attrs = (attr,) if isinstance(attr, str) else attr
+    return {'kind': 'css', 'selector': selector, 'attrs': attrs, 'extract': extract}
+
+def meta(prop):
+    """Content of <meta property=...> or <meta name=...>."""
+    return css(f'meta[property="{prop}"], meta[name="{prop}"]', 'content')
+
+def text(selector, pattern, extract=None):
+    """First element matching `selector` whose text matches `pattern`."""
+    return {'kind': 'text', 'selector': selector, 'pattern': pattern, 'extract': extract}
+
+def join(*rules):
+    """Space-joined values of every rule that matches (at least one must)."""
+    return {'kind': 'join', 'rules': list(rules)}
+
+def state(var, **paths):
+    """Embedded JSON page state (`window.<var> = {...}` or <script id="<var>">).
+
+    `paths` maps fields to dotted paths inside it; integers index lists.
+    """
+    return {'var': var, 'paths': paths}
+
+# ========================
+# PLATFORM DEFINITIONS
+# ========================
+# Rules are tried in order; the first one producing a value wins.
+EXTRACTOR_DEFINITIONS = {
+    'amazon': {
+        'title': [css('#productTitle'), meta('og:title')],
+        'price': [css('span.a-price-whole'), css('span.a-offscreen'), text('span', PRICE_TEXT)],
+        'image': [css('img#landingImage', IMAGE_ATTRS), css('img[class*="image"]', IMAGE_ATTRS), meta('og:image')],
+        'defaults': {'title': "Amazon Product"}
+    },
+    'flipkart': {
+        'title': [css('span.VU-ZEz'), css('span.B_NuCI'), css('span[class*="title"]'), css('h1'), meta('og:title')],
+        'price': [css('div.Nx9bqj'), css('div._30jeq3'), css('div[class*="price"]')],
+        'image': [
+            css('img._396cs4', IMAGE_ATTRS), css('img._2r_T1I', IMAGE_ATTRS), css('img.DByuf4', IMAGE_ATTRS),
+            css('img[class*="image"]', IMAGE_ATTRS), meta('og:image'), css('img', IMAGE_ATTRS)
+        ],
+        'defaults': {'title': "Flipkart Product"}
+    },
+    'myntra': {
+        'state': state(
+            '__myx', title='pdpData.name', price='pdpData.price.discounted',
+            image='pdpData.media.albums.0.images.0.imageURL'
+        ),
+        'title': [join(css('h1.pdp-name'), css('h1.pdp-title')), css('h1'), meta('og:title')],
+        'price': [css('span.pdp-price'), text('span', PRICE_TEXT)],
+        'image': [
+            css('img.image-grid-image', IMAGE_ATTRS),
+            css('div.image-grid-image', 'style', extract=r"url\(['\"]?(.*?)['\"]?\)"),
+            meta('og:image'),
+            css('img[alt*="product"], img[alt*="image"]', IMAGE_ATTRS)
+        ]
+    },
+    'meesho': {
+        'title': [css('h1'), meta('og:title')],
+        'price': [text('h4, h5, span', r'₹\s*[\d,]+', extract=PRICE_NUMBER), text('span', r'\d')],
+        'image': [css('img[alt*="product"]', IMAGE_ATTRS), meta('og:image'), css('img', IMAGE_ATTRS)],
+        'defaults': {'title': "Meesho Product"}
+    },
+    'ajio': {
+        'title': [join(css('h2.brand-name'), css('h1.prod-name')), meta('og:title'), css('title')],
+        'price': [css('div.prod-sp'), css('span.prod-sp'), text('div, span', PRICE_TEXT, extract=PRICE_NUMBER)],
+        'image': [css('img.rilrtl-lazy-img', IMAGE_ATTRS), meta('og:image')],
+        'defaults': {'title': "Ajio Product"}
+    },
+    'snapdeal': {
+        'title': [css('h1.pdp-e-i-head'), meta('og:title'), css('title')],
+        'price': [css('span.payBlkBig'), css('span.pdp-final-price'), text('span', PRICE_TEXT, extract=PRICE_NUMBER)],
+        'image': [css('img.cloudzoom', IMAGE_ATTRS), meta('og:image')],
+        'defaults': {'title': "Snapdeal Product"}
+    },
+    'generic': {
+        'title': [css('title'), css('h1'), meta('og:title')],
+        'price': [text('span, div, p, strong', PRICE_TEXT, extract=PRICE_NUMBER)],
+        'image': [meta('og:image'), css('img', IMAGE_ATTRS)]
+    }
+}
+
+# ========================
+# BACKENDS
+# ========================
+
+class SoupBackend:
+    """BeautifulSoup (html.parser) with soupsieve-compiled selectors; the fallback."""
+    name = 'beautifulsoup'
+
+    def compile(self, selector):
+        return soupsieve.compile(selector)
+
+    def parse(self, content):
+        return BeautifulSoup(content, 'html.parser')
+
+    def first(self, tree, compiled):
+        return compiled.select_one(tree)
+
+    def select(self, tree, compiled):
+        return compiled.select(tree)
+
+    def text(self, node):
+        return node.get_text(strip=True)
+
+    def attr(self, node, name):
+        return node.get(name)
+
+class SelectolaxBackend:
+    """Lexbor-based parser; selectors are compiled by the engine per call."""
+    name = 'selectolax'
+
+    def compile(self, selector):
+        return selector
+
+    def parse(self, content):
+        return LexborHTMLParser(content)
+
+    def first(self, tree, compiled):
+        return tree.css_first(compiled)
+
+    def select(self, tree, compiled):
+        return tree.css(compiled)
+
+    def text(self, node):
+        return node.text(strip=True)
+
+    def attr(self, node, name):
+        return node.attributes.get(name)
+
+class LxmlBackend:
+    """libxml2-based parser with CSS selectors precompiled to XPath."""
+    name = 'lxml'
+
+    def compile(self, selector):
+        return CSSSelector(selector)
+
+    def parse(self, content):
+        return lxml.html.fromstring(content)
+
+    def first(self, tree, compiled):
+        matches = compiled(tree)
+        return matches[0] if matches else None
+
+    def select(self, tree, compiled):
+        return compiled(tree)
+
+    def text(self, node):
+        return node.text_content().strip()
+
+    def attr(self, node, name):
+        return node.get(name)
+
+# Fastest first; BeautifulSoup is always available as the fallback
+BACKENDS = {}
+if LexborHTMLParser is not None:
+    BACKENDS['selectolax'] = SelectolaxBackend()
+if lxml is not None:
+    BACKENDS['lxml'] = LxmlBackend()
+BACKENDS['beautifulsoup'] = SoupBackend()
+
+# ========================
+# COMPILED EXTRACTORS
+# ========================
+
+def _selector_token(selector):
+    """Class/id name a simple selector targets, usable as a cheap byte marker."""
+    if ',' in selector or '[' in selector:
+        return None
+    names = re.findall(r'[.#]([\w-]+)', selector.split()[-1])
+    return names[-1].encode() if names else None
+
+def _rule_markers(rule):
+    """Byte markers proving a rule can match, or None if it is not streamable."""
+    if rule['kind'] == 'css':
+        token = _selector_token(rule['selector'])
+        return [token] if token else None
+    if rule['kind'] == 'join':
+        markers = [_rule_markers(part) for part in rule['rules']]
+        return None if None in markers else [m for group in markers for m in group]
+    return None
+
+class Extractor:
+    """One platform's rules, with selectors compiled for every backend."""
+
+    def __init__(self, platform, definition):
+        self.platform = platform
+        self.defaults = dict(DEFAULTS, **definition.get('defaults', {}))
+        self.rules = {field: [self._compile(rule) for rule in definition.get(field, [])] for field in FIELDS}
+        # Exact class/id rules only: a fuzzy fallback must not win on a page prefix
+        self.stream_rules = {
+            field: [rule for rule in rules if _rule_markers(rule)]
+            for field, rules in self.rules.items()
+        }
+        self.state = None
+        if definition.get('state'):
+            var = re.escape(definition['state']['var']).encode()
+            self.state = {
+                'pattern': re.compile(rb'(?:window\.' + var + rb'\s*=\s*|id=["\']' + var + rb'["\'][^>]*>)'),
+                'paths': {field: path.split('.') for field, path in definition['state']['paths'].items()}
+            }
+        self.markers = None
+        if all(self.stream_rules[field] for field in REQUIRED_FIELDS):
+            self.markers = [
+                [token for rule in self.stream_rules[field] for token in _rule_markers(rule)]
+                for field in REQUIRED_FIELDS
+            ]
+
+    def _compile(self, rule):
+        rule = dict(rule)
+        if rule['kind'] == 'join':
+            rule['rules'] = [self._compile(part) for part in rule['rules']]
+            return rule
+        rule['compiled'] = {name: backend.compile(rule['selector']) for name, backend in BACKENDS.items()}
+        if rule.get('pattern'):
+            rule['pattern'] = re.compile(rule['pattern'])
+        if rule.get('extract'):
+            rule['extract'] = re.compile(rule['extract'])
+        return rule
+
+    def extract(self, tree, backend, streaming=False):
+        """Return {field: value} for every field some rule could fill."""
+        rules = self.stream_rules if streaming else self.rules
+        values = {}
+        for field in FIELDS:
+            for rule in rules[field]:
+                value = _apply(rule, tree, backend)
+                if value:
+                    values[field] = value
+                    break
+        return values
+
+def _finish(rule, value):
+    if value and rule.get('extract'):
+        match = rule['extract'].search(value)
+        value = (match.group(1) if match.groups() else match.group(0)) if match else None
+    return value
+
+def _apply(rule, tree, backend):
+    kind = rule['kind']
+    if kind == 'join':
+        parts = [_apply(part, tree, backend) for part in rule['rules']]
+        return " ".join(part for part in parts if part) or None
+    compiled = rule['compiled'][backend.name]
+    if kind == 'text':
+        for node in backend.select(tree, compiled):
+            value = backend.text(node)
+            if value and rule['pattern'].search(value):
+                return _finish(rule, value)
+        return None
+    node = backend.first(tree, compiled)
+    if node is None:
+        return None
+    if rule['attrs']:
+        value = next((backend.attr(node, a) for a in rule['attrs'] if backend.attr(node, a)), None)
+    else:
+        value = backend.text(node)
+    return _finish(rule, value)
+
+# ========================
+# STRUCTURED DATA
+# ========================
+
+_JSONLD_RE = re.compile(rb'<script[^>]+application/ld\+json[^>]*>(.*?)</script>', re.I | re.S)
+_JSONLD_OPEN_RE = re.compile(rb'<script[^>]+application/ld\+json[^>]*>', re.I)
+_SCRIPT_CLOSE = b'</script>'
+_META_RE = re.compile(rb'<meta\s[^>]*>', re.I)
+_ATTR_RE = re.compile(rb'([\w:-]+)\s*=\s*(?:"([^"]*)"|\'([^\']*)\')')
+META_FIELDS = {
+    'title': (b'og:title', b'twitter:title'),
+    'price': (b'product:price:amount', b'og:price:amount'),
+    'image': (b'og:image', b'og:image:secure_url', b'twitter:image')
+}
+
+def _find_product(node, depth=0):
+    """Depth-limited search for a schema.org Product object."""
+    if depth > 4:
+        return None
+    if isinstance(node, list):
+        return next((p for p in (_find_product(n, depth + 1) for n in node) if p), None)
+    if not isinstance(node, dict):
+        return None
+    types = node.get('@type')
+    if types == 'Product' or (isinstance(types, list) and 'Product' in types):
+        return node
+    return next((p for p in (_find_product(v, depth + 1) for v in node.values() if isinstance(v, (dict, list))) if p), None)
+
+def _first(value, *keys):
+    """Unwrap lists and dicts (e.g. ImageObject, Offer) down to a scalar."""
+    while isinstance(value, (list, dict)):
+        if isinstance(value, list):
+            value = value[0] if value else None
+        else:
+            value = next((value[k] for k in keys if value.get(k) not in (None, '')), None)
+    return str(value) if value not in (None, '') else None
+
+def _jsonld_product(raw):
+    """Fields of one JSON-LD block, or None if it holds no Product."""
+    try:
+        product = _find_product(json.loads(raw))
+    except ValueError:
+        return None
+    if not product:
+        return None
+    return {
+        'title': _first(product.get('name')),
+        'price': _first(product.get('offers'), 'price', 'lowPrice'),
+        'image': _first(product.get('image'), 'url', 'contentUrl')
+    }
+
+def jsonld_fields(content):
+    """Fields from the first JSON-LD Product block."""
+    for match in _JSONLD_RE.finditer(content):
+        fields = _jsonld_product(match.group(1))
+        if fields is not None:
+            return fields
+    return {}
+
+def _scan_meta(content, found, pos=0, endpos=None):
+    """Record the first content of every meta property/name in content[pos:endpos]."""
+    for tag in _META_RE.finditer(content, pos, len(content) if endpos is None else endpos):
+        attrs = {m.group(1).lower(): m.group(2) if m.group(2) is not None else m.group(3)
+                 for m in _ATTR_RE.finditer(tag.group(0))}
+        key = attrs.get(b'property') or attrs.get(b'name')
+        if key and attrs.get(b'content'):
+            found.setdefault(key.lower(), attrs[b'content'])
+
+def _meta_values(found):
+    values = {}
+    for field, keys in META_FIELDS.items():
+        value = next((found[k] for k in keys if k in found), None)
+        if value:
+            values[field] = value.decode('utf-8', 'replace')
+    return values
+
+def meta_fields(content):
+    """OpenGraph / product meta values, scanned without building a tree."""
+    found = {}
+    _scan_meta(content, found)
+    return _meta_values(found)
+
+def state_fields(content, extractor):
+    """Fields read from the platform's embedded JSON state, if it declares one."""
+    if extractor.state is None:
+        return {}
+    match = extractor.state['pattern'].search(content)
+    if match is None:
+        return {}
+    return _state_values(content[match.end():], extractor)
+
+def _state_values(raw, extractor):
+    """Decode the state JSON at the start of `raw` and read the declared paths."""
+    try:
+        data, _ = json.JSONDecoder().raw_decode(raw.decode('utf-8', 'replace').lstrip())
+    except ValueError:
+        return {}
+    values = {}
+    for field, path in extractor.state['paths'].items():
+        node = data
+        for key in path:
+            try:
+                node = node[int(key)] if isinstance(node, list) else node.get(key)
+            except (AttributeError, IndexError, ValueError):
+                node = None
+            if node is None:
+                break
+        if node not in (None, '') and not isinstance(node, (dict, list)):
+            values[field] = str(node)
+    return values
+
+def structured_fields(content, platform):
+    """Return (primary, meta): JSON-LD over embedded state, and meta tag values."""
+    extractor = get_extractor(platform)
+    primary = state_fields(content, extractor)
+    primary.update({k: v for k, v in jsonld_fields(content).items() if v})
+    return _unescape(primary), _unescape(meta_fields(content))
+
+def _unescape(values):
+    return {k: html.unescape(v).strip() for k, v in values.items() if v}
+
+def _complete(values):
+    return all(values.get(field) for field in REQUIRED_FIELDS)
+
+def _structured_complete(content, platform):
+    """Structured values if they alone cover every required field, else None."""
+    primary, meta = structured_fields(content, platform)
+    merged = dict(meta, **primary)
+    return (merged if _complete(merged) else None), primary, meta
+
+REGISTRY = {platform: Extractor(platform, definition) for platform, definition in EXTRACTOR_DEFINITIONS.items()}
+STREAM_MARKERS = {platform: ex.markers for platform, ex in REGISTRY.items() if ex.markers}
+
+_fast = next((b for name, b in BACKENDS.items() if name != 'beautifulsoup'), None)
+if _fast is None:
+    logger.info("No fast HTML parser installed; using BeautifulSoup only.")
+
+def get_extractor(platform):
+    return REGISTRY.get(platform, REGISTRY['generic'])
+
+# ========================
+# EXTRACTION
+# ========================
+
+def extract_fields(content, platform, backend_name):
+    """Run one platform's rules on one backend; returns the raw {field: value} found."""
+    backend = BACKENDS[backend_name]
+    return get_extractor(platform).extract(backend.parse(content), backend)
+
+def extract(content, platform):
+    """Return (title, price, image_url): structured data, then fast DOM, then BeautifulSoup."""
+    extractor = get_extractor(platform)
+    complete, primary, meta = _structured_complete(content, platform)
+    if complete:
+        return tuple(complete[field] for field in FIELDS)
+
+    values = {}
+    if _fast is not None:
+        try:
+            values = extractor.extract(_fast.parse(content), _fast)
+        except Exception as e:
+            logger.debug(f"Fast parser failed for {platform}: {e}")
+    if not _complete(dict(values, **primary)):
+        soup = BACKENDS['beautifulsoup']
+        values = dict(values, **extractor.extract(soup.parse(content), soup))
+    # JSON-LD/state beat DOM selectors; meta tags only fill what is still missing
+    values = dict(meta, **dict(values, **primary))
+    return tuple(values.get(field) or extractor.defaults[field] for field in FIELDS)
+
+class StreamExtractor:
+    """Structured data, then the exact rules, on a page as it downloads.
+
+    Call it with the growing buffer after every chunk; it returns the field
+    tuple once every required field is available, else None. Each call
+    only scans the bytes added since the last one: meta tags, JSON-LD
+    blocks and the embedded state are picked up as they complete, marker
+    tokens are searched in the new bytes, and the DOM prefix is parsed at
+    most once, when every marker group has been seen. A different buffer
+    object (a retried or cached fetch) starts the scan over.
+
+    The buffer is cut at its last '<' so a text node or tag split by a chunk
+    boundary is dropped instead of being read as a truncated value.
+    """
+
+    def __init__(self, platform):
+        self.extractor = get_extractor(platform)
+        self.markers = STREAM_MARKERS.get(platform) if _fast is not None else None
+        self._overlap = max((len(token) for group in self.markers or () for token in group), default=1) - 1
+        self._reset(None)
+
+    def _reset(self, buffer):
+        self._buffer = buffer
+        self._scanned = 0
+        self._meta = {}
+        self._jsonld = None
+        self._jsonld_open = None
+        self._state_at = None
+        self._state = None
+        self._primary = {}
+        self._meta_values = {}
+        self._seen = [False] * len(self.markers or ())
+        self._parsed = False
+
+    def __call__(self, buffer):
+        if buffer is not self._buffer:
+            self._reset(buffer)
+        cut = buffer.rfind(b'<')
+        if cut <= self._scanned:
+            return None
+        start, self._scanned = self._scanned, cut
+        fields = self._structured(buffer, start, cut)
+        if fields is None and self.markers and not self._parsed:
+            fields = self._rules(buffer, start, cut)
+        return fields
+
+    def _structured(self, buffer, start, cut):
+        _scan_meta(buffer, self._meta, start, cut)
+        if self._jsonld is None:
+            self._scan_jsonld(buffer, start, cut)
+        if self.extractor.state is not None and self._state is None:
+            self._scan_state(buffer, start, cut)
+        primary = dict(self._state or {})
+        primary.update({k: v for k, v in (self._jsonld or {}).items() if v})
+        self._primary = _unescape(primary)
+        self._meta_values = _unescape(_meta_values(self._meta))
+        merged = dict(self._meta_values, **self._primary)
+        return tuple(merged[field] for field in FIELDS) if _complete(merged) else None
+
+    def _scan_jsonld(self, buffer, start, cut):
+        pos = start
+        while True:
+            if self._jsonld_open is None:
+                match = _JSONLD_OPEN_RE.search(buffer, pos, cut)
+                if match is None:
+                    return
+                self._jsonld_open = pos = match.end()
+            # The closing tag starts with '<', so it is never split across the cut
+            close = buffer.find(_SCRIPT_CLOSE, pos, cut)
+            if close == -1:
+                return
+            fields = _jsonld_product(bytes(buffer[self._jsonld_open:close]))
+            self._jsonld_open, pos = None, close + len(_SCRIPT_CLOSE)
+            if fields is not None:
+                self._jsonld = fields
+                return
+
+    def _scan_state(self, buffer, start, cut):
+        if self._state_at is None:
+            # The opening pattern can straddle the previous cut; re-check a short overlap
+            match = self.extractor.state['pattern'].search(buffer, max(0, start - 256), cut)
+            if match is None:
+                return
+            self._state_at = start = match.end()
+        # Decode once, when the script holding the state has closed
+        close = buffer.find(_SCRIPT_CLOSE, max(self._state_at, start), cut)
+        if close != -1:
+            self._state = _state_values(bytes(buffer[self._state_at:close]), self.extractor)
+
+    def _rules(self, buffer, start, cut):
+        for i, group in enumerate(self.markers):
+            if not self._seen[i]:
+                begin = max(0, start - self._overlap)
+                self._seen[i] = any(buffer.find(token, begin, cut) != -1 for token in group)
+        if not all(self._seen):
+            return None
+        self._parsed = True
+        try:
+            values = self.extractor.extract(_fast.parse(bytes(buffer[:cut])), _fast, streaming=True)
+        except Exception:
+            return None
+        # Same precedence as extract(): JSON-LD/state beat DOM selectors, meta fills gaps
+        values = dict(self._meta_values, **dict(values, **self._primary))
+        if not _complete(values):
+            return None
+        return tuple(values.get(field) for field in FIELDS)
@@ -0,0 +1,551 @@
+# http_client.py - Shared async HTTP client
+
+"""
+Non-blocking fetch layer used by every network path of the bot.
+One pooled httpx.AsyncClient (keep-alive, HTTP/2 when `h2` is installed)
+is shared by all handlers. Every request goes through a per-host limiter:
+a token bucket caps the request rate, and an AIMD concurrency limit backs
+off when a marketplace answers with 429/5xx, captcha pages or slow
+responses. Callers queue for a slot rather than fail. Throttled, failed or
+blocked requests are retried up to MAX_RETRIES times with jittered
+exponential backoff. With a response cache installed (use_cache), GETs
+send If-None-Match / If-Modified-Since for stored bodies, a 304 is
+answered from local storage, and bodies still fresh under max-age skip
+the network entirely. GETs advertise br, zstd and gzip; bodies are read
+raw and decoded incrementally here, large compressed chunks in a worker
+thread, with wire and decoded byte counts recorded per platform.
+"""
+
+import time
+import zlib
+import random
+import asyncio
+import logging
+from urllib.parse import urlparse
+
+import httpx
+
+import metrics
+from config import HTTP_CLIENT, RATE_LIMIT, COMPRESSION, MAX_RETRIES
+
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401 - presence enables HTTP/2 in httpx
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    brotli = None
+    BROTLI_AVAILABLE = False
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    zstandard = None
+    ZSTD_AVAILABLE = False
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (iPhone; CPU iPhone OS 15_0 like Mac OS X) AppleWebKit/605.1.15'
+}
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Only the start of a body is checked; bot-check pages are small
+BLOCK_SCAN_BYTES = 16384
+
+_client = None
+_limiters = {}
+_cache = None  # cache.HttpCache, installed by use_cache()
+
+class BlockedError(Exception):
+    """The host answered with a bot-check / captcha page instead of content."""
+
+# ========================
+# PER-HOST LIMITER
+# ========================
+
+class HostLimiter:
+    """Token bucket plus AIMD concurrency limit for one host.
+
+    The concurrency limit grows by about one slot per limit's worth of fast
+    successes and halves (at most once per `backoff_cooldown` seconds) on
+    throttling, errors or responses slower than `latency_target`. A
+    Retry-After header pauses the whole host.
+    """
+
+    def __init__(self, host, rate, burst, initial_concurrency, min_concurrency, max_concurrency, latency_target,
+                 backoff_cooldown):
+        self.host = host
+        self.rate = rate
+        self.burst = burst
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.latency_target = latency_target
+        self.backoff_cooldown = backoff_cooldown
+        self.limit = float(initial_concurrency)
+        self.active = 0
+        self.waiting = 0
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+        self._cond = asyncio.Condition()
+
+    async def acquire(self):
+        """Wait for a concurrency slot and a token; returns seconds spent waiting."""
+        started = time.monotonic()
+        self.waiting += 1
+        try:
+            async with self._cond:
+                await self._cond.wait_for(lambda: self.active < int(self.limit))
+                self.active += 1
+        finally:
+            self.waiting -= 1
+        try:
+            pause = self._paused_until - time.monotonic()
+            if pause > 0:
+                await asyncio.sleep(pause)
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # Reserve a token now; a negative balance is the wait until it exists
+            self._tokens -= 1
+            if self._tokens < 0:
+                await asyncio.sleep(-self._tokens / self.rate)
+        except BaseException:
+            await self.release(ok=True, latency=0.0)
+            raise
+        return time.monotonic() - started
+
+    async def release(self, ok, latency, retry_after=None):
+        """Free the slot and adapt the limit to how the request went."""
+        now = time.monotonic()
+        if retry_after:
+            self._paused_until = max(self._paused_until, now + retry_after)
+        if not ok or latency > self.latency_target:
+            if now - self._last_decrease >= self.backoff_cooldown:
+                self.limit = max(self.min_concurrency, self.limit / 2)
+                self._last_decrease = now
+                logger.info(f"Backing off {self.host}: concurrency limit now {int(self.limit)}")
+        else:
+            self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+        async with self._cond:
+            self.active -= 1
+            self._cond.notify_all()
+
+    def stats(self):
+        return {'limit': int(self.limit), 'active': self.active, 'waiting': self.waiting, 'tokens': round(max(self._tokens, 0.0), 2)}
+
+def _limits_for(host):
+    settings = {key: RATE_LIMIT[key] for key in ('rate', 'burst', 'initial_concurrency', 'min_concurrency', 'latency_target', 'backoff_cooldown')}
+    settings['max_concurrency'] = HTTP_CLIENT['per_host_limit']
+    for suffix, overrides in RATE_LIMIT['host_overrides'].items():
+        if host == suffix or host.endswith('.' + suffix):
+            settings.update(overrides)
+    return settings
+
+def _host_limiter(url):
+    """Per-host limiter, created on first request to that host."""
+    host = urlparse(url).netloc.lower()
+    limiter = _limiters.get(host)
+    if limiter is None:
+        limiter = HostLimiter(host, **_limits_for(host))
+        _limiters[host] = limiter
+    return limiter
+
+def limiter_stats():
+    """Per-host limiter state, keyed by host."""
+    return {host: limiter.stats() for host, limiter in _limiters.items()}
+
+# ========================
+# CONTENT DECODING
+# ========================
+
+def accept_encoding():
+    """Accept-Encoding for the COMPRESSION encodings this process can decode."""
+    available = {'gzip': True, 'deflate': True, 'br': BROTLI_AVAILABLE, 'zstd': ZSTD_AVAILABLE}
+    return ", ".join(name for name in COMPRESSION['encodings'] if available.get(name)) or "identity"
+
+class BodyDecoder:
+    """Incremental decoder for a Content-Encoding header such as "gzip" or "gzip, br"."""
+
+    def __init__(self, content_encoding):
+        names = [name.strip().lower() for name in content_encoding.split(',')]
+        names = [name for name in names if name and name != 'identity']
+        self.encoding = ",".join(names) or 'identity'
+        # Codings are listed in the order applied, so undo them last to first
+        self._steps = [self._step(name) for name in reversed(names)]
+
+    @staticmethod
+    def _step(name):
+        """(decompress, flush) callables for one content coding."""
+        if name in ('gzip', 'x-gzip', 'deflate'):
+            # 32 + MAX_WBITS: accept both gzip and zlib framing
+            decoder = zlib.decompressobj(32 + zlib.MAX_WBITS)
+            return decoder.decompress, decoder.flush
+        if name == 'br' and BROTLI_AVAILABLE:
+            decoder = brotli.Decompressor()
+            return decoder.process, lambda: b""
+        if name == 'zstd' and ZSTD_AVAILABLE:
+            decoder = zstandard.ZstdDecompressor().decompressobj()
+            return decoder.decompress, decoder.flush
+        raise httpx.DecodingError(f"Unsupported Content-Encoding: {name}")
+
+    @property
+    def compressed(self):
+        return bool(self._steps)
+
+    def decode(self, data):
+        try:
+            for decompress, _ in self._steps:
+                data = decompress(data) if data else data
+        except Exception as e:
+            raise httpx.DecodingError(f"Failed to decode {self.encoding} body: {e}") from e
+        return data
+
+    def flush(self):
+        data = b""
+        try:
+            for decompress, flush in self._steps:
+                data = (decompress(data) if data else b"") + flush()
+        except Exception as e:
+            raise httpx.DecodingError(f"Failed to decode {self.encoding} body: {e}") from e
+        return data
+
+async def iter_decoded(response, chunk_size=65536, platform=""):
+    """Decoded body chunks of a streamed response, counting wire and decoded bytes."""
+    decoder = BodyDecoder(response.headers.get('content-encoding', ''))
+    label = platform or response.url.host
+    async for raw in response.aiter_raw(chunk_size):
+        metrics.HTTP_BODY_BYTES.inc(label, decoder.encoding, 'wire', amount=len(raw))
+        if decoder.compressed and len(raw) >= COMPRESSION['thread_min_bytes']:
+            # Calls are awaited in order, so the stateful decoder is never shared
+            chunk = await asyncio.to_thread(decoder.decode, raw)
+        else:
+            chunk = decoder.decode(raw)
+        if chunk:
+            metrics.HTTP_BODY_BYTES.inc(label, decoder.encoding, 'decoded', amount=len(chunk))
+            # A small compressed chunk can inflate 10x; re-slice so callers can still stop early
+            for start in range(0, len(chunk), chunk_size):
+                yield chunk[start:start + chunk_size]
+    tail = decoder.flush()
+    if tail:
+        metrics.HTTP_BODY_BYTES.inc(label, decoder.encoding, 'decoded', amount=len(tail))
+        yield tail
+
+def _decoded_response(response, body):
+    """Copy of a streamed response carrying the decoded body."""
+    headers = [(k, v) for k, v in response.headers.multi_items() if k.lower() not in ('content-encoding', 'content-length')]
+    return httpx.Response(
+        response.status_code, headers=headers, content=body, request=response.request,
+        history=response.history, extensions=response.extensions
+    )
+
+# ========================
+# CLIENT LIFECYCLE
+# ========================
+
+def get_client():
+    """Return the shared AsyncClient, creating it on first use."""
+    global _client
+    if _client is None or _client.is_closed:
+        limits = httpx.Limits(
+            max_connections=HTTP_CLIENT['max_connections'],
+            max_keepalive_connections=HTTP_CLIENT['max_keepalive'],
+            keepalive_expiry=HTTP_CLIENT['keepalive_expiry']
+        )
+        timeout = httpx.Timeout(HTTP_CLIENT['read_timeout'], connect=HTTP_CLIENT['connect_timeout'])
+        _client = httpx.AsyncClient(
+            headers=dict(DEFAULT_HEADERS, **{'Accept-Encoding': accept_encoding()}),
+            limits=limits,
+            timeout=timeout,
+            http2=HTTP_CLIENT['http2'] and HTTP2_AVAILABLE,
+            follow_redirects=False
+        )
+        logger.info(f"HTTP client created (http2={HTTP_CLIENT['http2'] and HTTP2_AVAILABLE}, accept-encoding: {accept_encoding()})")
+    return _client
+
+async def close_client():
+    """Close the shared client and drop per-host limiters (call on shutdown)."""
+    global _client
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+        logger.info("HTTP client closed.")
+    _client = None
+    _limiters.clear()
+
+# ========================
+# RESPONSE CACHE
+# ========================
+
+def use_cache(cache):
+    """Install an HttpCache for conditional GETs (None disables caching)."""
+    global _cache
+    _cache = cache
+
+def _cache_policy(response):
+    """(storable, max_age) for a 200 response, from Cache-Control, Vary and its validators."""
+    directives = {}
+    for part in response.headers.get('cache-control', '').lower().split(','):
+        name, _, value = part.strip().partition('=')
+        directives[name] = value.strip('"')
+    if 'no-store' in directives or response.headers.get('vary', '').strip() == '*':
+        return False, 0
+    max_age = 0
+    if 'no-cache' not in directives:
+        try:
+            max_age = max(0, int(directives.get('max-age', 0)))
+        except ValueError:
+            pass
+    has_validator = 'etag' in response.headers or 'last-modified' in response.headers
+    return has_validator or max_age > 0, max_age
+
+def _lookup(url):
+    """Validators for `url`; a fresh entry also gets its body and is marked used."""
+    entry = _cache.get(url)
+    if entry is not None and entry['fresh']:
+        entry['body'] = _cache.body(url)
+        if entry['body'] is None:
+            return None
+        _cache.touch(url)
+    return entry
+
+async def _cache_lookup(url):
+    """Stored entry for `url`, or None; fresh entries are counted as hits here."""
+    if _cache is None:
+        return None
+    # SQLite work runs in a thread so a large body never blocks the loop
+    entry = await asyncio.to_thread(_lookup, url)
+    if entry is not None and entry['fresh']:
+        _cache.fresh_hits += 1
+        metrics.CACHE_LOOKUPS.inc('http', urlparse(url).netloc.lower(), 'fresh')
+    return entry
+
+def _conditional_headers(entry, headers=None):
+    headers = dict(headers or {})
+    if entry is not None:
+        if entry['etag']:
+            headers['If-None-Match'] = entry['etag']
+        if entry['last_modified']:
+            headers['If-Modified-Since'] = entry['last_modified']
+    return headers
+
+def _cached_response(url, entry):
+    """Synthetic 200 response carrying a stored body."""
+    headers = {'Content-Type': entry['content_type']} if entry['content_type'] else {}
+    return httpx.Response(200, content=entry['body'], headers=headers, request=httpx.Request('GET', url))
+
+def _renew(url, max_age):
+    body = _cache.body(url)
+    if body is not None:
+        _cache.touch(url, max_age)
+    return body
+
+async def _revalidated(url, response, entry):
+    """Handle a 304: renew the stored entry and return it as a 200 response.
+
+    Returns None if the body was evicted after the lookup; the caller then
+    repeats the request without validators.
+    """
+    entry['body'] = await asyncio.to_thread(_renew, url, _cache_policy(response)[1])
+    if entry['body'] is None:
+        return None
+    _cache.revalidated += 1
+    metrics.CACHE_LOOKUPS.inc('http', urlparse(url).netloc.lower(), 'revalidated')
+    return _cached_response(url, entry)
+
+async def _remember(url, response, body, complete=True):
+    """Count a cache miss and store a complete 200 body that carries validators or max-age."""
+    if _cache is None:
+        return
+    _cache.misses += 1
+    metrics.CACHE_LOOKUPS.inc('http', urlparse(url).netloc.lower(), 'miss')
+    if not complete or response.status_code != 200:
+        return
+    storable, max_age = _cache_policy(response)
+    if storable:
+        await asyncio.to_thread(
+            _cache.set,
+            url, body,
+            etag=response.headers.get('etag'),
+            last_modified=response.headers.get('last-modified'),
+            content_type=response.headers.get('content-type'),
+            max_age=max_age
+        )
+
+# ========================
+# RETRY POLICY
+# ========================
+
+def _retry_after(response):
+    """Seconds from a Retry-After header (delta form only), capped at retry_cap."""
+    value = response.headers.get('retry-after', '') if response is not None else ''
+    try:
+        return min(float(value), RATE_LIMIT['retry_cap'])
+    except ValueError:
+        return None
+
+def _is_blocked(body):
+    head = bytes(body[:BLOCK_SCAN_BYTES]).lower()
+    return any(marker in head for marker in RATE_LIMIT['block_markers'])
+
+def _backoff(attempt, retry_after=None):
+    """Full-jitter exponential backoff, never shorter than Retry-After."""
+    delay = random.uniform(0, min(RATE_LIMIT['retry_cap'], RATE_LIMIT['retry_base'] * 2 ** attempt))
+    return max(delay, retry_after or 0.0)
+
+async def _with_retries(url, attempt_once):
+    """Run `attempt_once(last)` under the host limiter, retrying transient failures.
+
+    `attempt_once` returns (result, response, retryable_reason or None);
+    on the last attempt (last=True) its result is returned as is.
+    """
+    limiter = _host_limiter(url)
+    host = limiter.host
+    for attempt in range(MAX_RETRIES + 1):
+        last = attempt == MAX_RETRIES
+        waited = await limiter.acquire()
+        metrics.HOST_WAIT_SECONDS.observe(waited, host)
+        started = time.monotonic()
+        response = None
+        try:
+            result, response, reason = await attempt_once(last)
+        except (httpx.TransportError, BlockedError) as e:
+            await limiter.release(ok=False, latency=time.monotonic() - started)
+            reason = type(e).__name__
+            if last:
+                metrics.ERRORS.inc('http', host)
+                raise
+            error = e
+        except httpx.HTTPStatusError as e:
+            await limiter.release(ok=e.response.status_code not in RETRY_STATUSES, latency=time.monotonic() - started)
+            raise
+        except BaseException:
+            await limiter.release(ok=True, latency=time.monotonic() - started)
+            raise
+        else:
+            retry_after = _retry_after(response) if reason else None
+            await limiter.release(ok=reason is None, latency=time.monotonic() - started, retry_after=retry_after)
+            if reason is None or last:
+                return result
+            error = None
+        delay = _backoff(attempt, _retry_after(response))
+        metrics.HTTP_RETRIES.inc(host, reason)
+        logger.info(f"Retrying {url} in {delay:.2f}s ({reason}{f': {error}' if error else ''}), attempt {attempt + 2}/{MAX_RETRIES + 1}")
+        await asyncio.sleep(delay)
+
+# ========================
+# REQUEST HELPERS
+# ========================
+
+async def fetch(url, headers=None, timeout=None, follow_redirects=True, platform=""):
+    """GET a URL through the shared client and return the httpx.Response (body decoded)."""
+    entry = await _cache_lookup(url)
+    if entry is not None and entry['fresh']:
+        return _cached_response(url, entry)
+
+    async def attempt(last):
+        nonlocal entry
+        while True:
+            async with get_client().stream(
+                'GET',
+                url,
+                headers=_conditional_headers(entry, headers),
+                timeout=timeout if timeout is not None else httpx.USE_CLIENT_DEFAULT,
+                follow_redirects=follow_redirects
+            ) as streamed:
+                body = b"".join([chunk async for chunk in iter_decoded(streamed, platform=platform)])
+            response = _decoded_response(streamed, body)
+            if response.status_code != 304 or entry is None:
+                break
+            cached = await _revalidated(url, response, entry)
+            if cached is not None:
+                return cached, response, None
+            # Evicted since the lookup: ask again without validators
+            entry = None
+        if response.status_code in RETRY_STATUSES:
+            return response, response, f"HTTP {response.status_code}"
+        if _is_blocked(response.content):
+            raise BlockedError(f"bot check page from {url}")
+        await _remember(url, response, response.content)
+        return response, response, None
+    return await _with_retries(url, attempt)
+
+async def head(url, timeout=None):
+    """HEAD a URL without following redirects (used for short-link expansion)."""
+    async def attempt(last):
+        response = await get_client().head(
+            url,
+            timeout=timeout if timeout is not None else httpx.USE_CLIENT_DEFAULT,
+            follow_redirects=False
+        )
+        reason = f"HTTP {response.status_code}" if response.status_code in RETRY_STATUSES else None
+        return response, response, reason
+    return await _with_retries(url, attempt)
+
+async def fetch_stream(url, stop=None, max_bytes=None, chunk_size=65536, timeout=None, platform=""):
+    """GET a URL reading the body in chunks; returns (response, body, truncated).
+
+    After each decoded chunk `stop(buffer)` is called with everything received so far;
+    when it returns True, or `max_bytes` is reached, the transfer is aborted
+    and the partial body returned with truncated=True. Captcha / bot-check
+    pages raise BlockedError once retries are exhausted. Only complete
+    bodies are stored in the response cache; cached bodies are passed to
+    `stop` once.
+    """
+    def from_cache(response, body):
+        if max_bytes and len(body) >= max_bytes:
+            return response, body[:max_bytes], True
+        if stop is not None and stop(bytearray(body)):
+            return response, body, True
+        return response, body, False
+
+    entry = await _cache_lookup(url)
+    if entry is not None and entry['fresh']:
+        return from_cache(_cached_response(url, entry), entry['body'])
+
+    async def attempt(last):
+        nonlocal entry
+        while True:
+            async with get_client().stream(
+                'GET',
+                url,
+                headers=_conditional_headers(entry),
+                timeout=timeout if timeout is not None else httpx.USE_CLIENT_DEFAULT,
+                follow_redirects=True
+            ) as response:
+                if response.status_code == 304 and entry is not None:
+                    cached = await _revalidated(url, response, entry)
+                    if cached is not None:
+                        return from_cache(cached, entry['body']), response, None
+                    # Evicted since the lookup: ask again without validators
+                    entry = None
+                    continue
+                if response.status_code in RETRY_STATUSES and not last:
+                    return None, response, f"HTTP {response.status_code}"
+                response.raise_for_status()
+                buffer = bytearray()
+                checked = False
+                async for chunk in iter_decoded(response, chunk_size, platform):
+                    buffer += chunk
+                    if not checked and len(buffer) >= min(BLOCK_SCAN_BYTES, chunk_size):
+                        checked = True
+                        if _is_blocked(buffer):
+                            raise BlockedError(f"bot check page from {url}")
+                    if max_bytes and len(buffer) >= max_bytes:
+                        logger.info(f"Byte cap reached for {url} ({len(buffer)} bytes)")
+                        await _remember(url, response, None, complete=False)
+                        return (response, bytes(buffer), True), response, None
+                    if stop is not None and stop(buffer):
+                        logger.debug(f"Stopped {url} early after {len(buffer)} bytes")
+                        await _remember(url, response, None, complete=False)
+                        return (response, bytes(buffer), True), response, None
+                if not checked and _is_blocked(buffer):
+                    raise BlockedError(f"bot check page from {url}")
+                await _remember(url, response, bytes(buffer))
+                return (response, bytes(buffer), False), response, None
+    return await _with_retries(url, attempt)
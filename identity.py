@@ -0,0 +1,109 @@
+# identity.py - Product identity canonicalization
+
+"""
+Maps any supported product link to a stable (platform, product_id) key.
+Each platform's identifier (Amazon ASIN, Flipkart pid / item id, Myntra
+style id, Meesho / Ajio / Snapdeal product codes) is pulled out with
+patterns compiled once at import, so m./www./dl. hosts, /dp/ versus
+/gp/product/, slug variations and referral paths all resolve to the same
+key. The key only indexes caches and coalesces scrapes; the link itself is
+still what gets fetched and titled, since its slug carries hints (gender,
+category) that clean_title uses. Links with no recognisable identifier
+return None and callers fall back to the plain URL.
+"""
+
+import re
+from collections import namedtuple
+from urllib.parse import urlparse, parse_qs
+
+ProductIdentity = namedtuple('ProductIdentity', ['platform', 'product_id'])
+
+# platform -> host suffix
+HOSTS = {
+    'amazon': 'amazon.in',
+    'flipkart': 'flipkart.com',
+    'meesho': 'meesho.com',
+    'myntra': 'myntra.com',
+    'ajio': 'ajio.com',
+    'snapdeal': 'snapdeal.com'
+}
+
+_ASIN_PATH = re.compile(r'/(?:dp|gp/product|gp/aw/d|exec/obidos/asin|o/asin)/([A-Z0-9]{10})(?=[/?#]|$)', re.I)
+_ASIN = re.compile(r'^[A-Z0-9]{10}$', re.I)
+_FLIPKART_PID = re.compile(r'^[A-Z0-9]{16}$', re.I)
+_FLIPKART_ITEM = re.compile(r'/p/(itm[0-9a-z]+)', re.I)
+_MEESHO_PATH = re.compile(r'/p/([0-9a-z]+)(?=[/?#]|$)', re.I)
+_MYNTRA_PATH = re.compile(r'/(\d{5,})(?:/buy)?/?$')
+_MYNTRA_ID = re.compile(r'^\d{5,}$')
+_AJIO_PATH = re.compile(r'/p/(\d+(?:_[0-9a-z]+)?)(?=[/?#]|$)', re.I)
+_SNAPDEAL_PATH = re.compile(r'^/product/[^/]+/(\d+)(?=[/?#]|$)')
+
+def _query_value(query, names, pattern):
+    """First query parameter in `names` (any case) whose value matches `pattern`."""
+    params = {k.lower(): v for k, v in parse_qs(query).items()}
+    for name in names:
+        for value in params.get(name, []):
+            if pattern.match(value):
+                return value
+    return None
+
+def _amazon(parsed):
+    match = _ASIN_PATH.search(parsed.path)
+    asin = match.group(1) if match else _query_value(parsed.query, ('asin',), _ASIN)
+    return asin.upper() if asin else None
+
+def _flipkart(parsed):
+    # The slug is cosmetic; the pid picks the exact variant
+    pid = _query_value(parsed.query, ('pid',), _FLIPKART_PID)
+    if pid:
+        return pid.upper()
+    item = _FLIPKART_ITEM.search(parsed.path)
+    return item.group(1).lower() if item else None
+
+def _meesho(parsed):
+    match = _MEESHO_PATH.search(parsed.path)
+    return match.group(1).lower() if match else None
+
+def _myntra(parsed):
+    match = _MYNTRA_PATH.search(parsed.path)
+    return match.group(1) if match else _query_value(parsed.query, ('p', 'productid'), _MYNTRA_ID)
+
+def _ajio(parsed):
+    match = _AJIO_PATH.search(parsed.path)
+    return match.group(1).lower() if match else None
+
+def _snapdeal(parsed):
+    match = _SNAPDEAL_PATH.match(parsed.path)
+    return match.group(1) if match else None
+
+# platform -> parsed URL -> product_id or None
+RULES = {
+    'amazon': _amazon,
+    'flipkart': _flipkart,
+    'meesho': _meesho,
+    'myntra': _myntra,
+    'ajio': _ajio,
+    'snapdeal': _snapdeal
+}
+
+def platform_for(host):
+    """Platform whose domain `host` belongs to, else None."""
+    host = host.lower().split(':')[0]
+    for platform, suffix in HOSTS.items():
+        if host == suffix or host.endswith('.' + suffix):
+            return platform
+    return None
+
+def canonicalize(url):
+    """ProductIdentity for a product link, or None when no product id is recognised."""
+    parsed = urlparse(url)
+    platform = platform_for(parsed.netloc)
+    if platform is None:
+        return None
+    product_id = RULES[platform](parsed)
+    return ProductIdentity(platform, product_id) if product_id else None
+
+def product_key(url):
+    """Stable cache key "platform:product_id" for a link, falling back to the URL itself."""
+    identity = canonicalize(url)
+    return f"{identity.platform}:{identity.product_id}" if identity else url
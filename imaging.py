@@ -0,0 +1,117 @@
+# imaging.py - Product image preparation
+
+"""
+Shrinks product images before they are uploaded to Telegram.
+variant_url() rewrites marketplace CDN URLs to request a smaller rendition
+where the URL scheme encodes the size, and prepare() validates the bytes
+from the header alone, then downscales and recompresses only when that
+actually saves bytes. Telegram shows photos at most 1280 px on the long
+side, so anything larger is wasted upload bandwidth.
+"""
+
+import io
+import re
+import logging
+
+from PIL import Image
+
+from config import IMAGE_PIPELINE
+
+logger = logging.getLogger(__name__)
+
+# ========================
+# CDN VARIANTS
+# ========================
+
+# 51FNnHjzhQL._SL1500_.jpg / 51FNnHjzhQL._SX300_SY300_QL70_FMwebp_.jpg / 51FNnHjzhQL.jpg
+_AMAZON_RE = re.compile(r'/([A-Za-z0-9+%-]+)\.(?:_([^/]*)_\.)?(jpe?g|png)$')
+_AMAZON_SIZE_RE = re.compile(r'(?:SL|SX|SY|UL|UX|UY|AC_SL|AC_SX|AC_SY)(\d+)')
+# rukminim2.flixcart.com/image/416/416/...
+_FLIPKART_RE = re.compile(r'/image/(\d+)/(\d+)/')
+# assets.myntassets.com/h_720,q_90,w_540/v1/...
+_MYNTRA_RE = re.compile(r'/h_(\d+),q_(\d+),w_(\d+)/')
+
+def _amazon_variant(url, side):
+    match = _AMAZON_RE.search(url)
+    if not match:
+        return url
+    sizes = [int(n) for n in _AMAZON_SIZE_RE.findall(match.group(2) or "")]
+    # No size modifier means the full-resolution original
+    if sizes and max(sizes) <= side:
+        return url
+    return f"{url[:match.start()]}/{match.group(1)}._SL{side}_.{match.group(3)}"
+
+def _flipkart_variant(url, side):
+    match = _FLIPKART_RE.search(url)
+    if not match or max(int(match.group(1)), int(match.group(2))) <= side:
+        return url
+    return f"{url[:match.start()]}/image/{side}/{side}/{url[match.end():]}"
+
+def _myntra_variant(url, side):
+    match = _MYNTRA_RE.search(url)
+    if not match:
+        return url
+    height, quality, width = (int(n) for n in match.groups())
+    if max(height, width) <= side:
+        return url
+    scale = side / max(height, width)
+    return f"{url[:match.start()]}/h_{round(height * scale)},q_{quality},w_{round(width * scale)}/{url[match.end():]}"
+
+CDN_VARIANTS = {
+    'amazon': _amazon_variant,
+    'flipkart': _flipkart_variant,
+    'myntra': _myntra_variant
+}
+
+def variant_url(url, platform, side=None):
+    """URL of a rendition no larger than `side` px, or `url` when none is known."""
+    rewrite = CDN_VARIANTS.get(platform)
+    if rewrite is None:
+        return url
+    try:
+        return rewrite(url, side or IMAGE_PIPELINE['max_side'])
+    except ValueError:
+        return url
+
+# ========================
+# DOWNSCALE / RECOMPRESS
+# ========================
+
+def probe(data):
+    """Return (format, (width, height)) from the header; raises if not a valid image."""
+    with Image.open(io.BytesIO(data)) as image:
+        # verify() checks structure without decoding pixels
+        image.verify()
+        return image.format, image.size
+
+def prepare(data, max_side=None, quality=None):
+    """Validate raw image bytes and shrink them for upload (CPU-bound, runs in a worker).
+
+    Returns the bytes to upload: the original when it is already a small
+    JPEG/PNG within `max_side`, otherwise a downscaled JPEG if that is smaller.
+    """
+    max_side = max_side or IMAGE_PIPELINE['max_side']
+    quality = quality or IMAGE_PIPELINE['jpeg_quality']
+    fmt, size = probe(data)
+    if fmt in ('JPEG', 'PNG') and max(size) <= max_side and len(data) <= IMAGE_PIPELINE['passthrough_bytes']:
+        return data
+
+    image = Image.open(io.BytesIO(data))
+    # JPEG: let libjpeg decode straight at 1/2, 1/4 or 1/8 scale
+    image.draft('RGB', (max_side, max_side))
+    if image.mode in ('RGBA', 'LA', 'P'):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        image = background
+    elif image.mode != 'RGB':
+        image = image.convert('RGB')
+    image.thumbnail((max_side, max_side), Image.Resampling.BILINEAR, reducing_gap=2.0)
+
+    out = io.BytesIO()
+    image.save(out, 'JPEG', quality=quality)
+    result = out.getvalue()
+    # Formats Telegram may not render as a photo (WebP, AVIF...) are always converted
+    if fmt in ('JPEG', 'PNG') and len(result) >= len(data):
+        return data
+    return result
@@ -10,14 +10,24 @@ import os
 import re
 import io
 import time
+import signal
+import asyncio
+import hashlib
 import logging
-import requests
 from urllib.parse import urlparse, parse_qs
-from PIL import Image
-import pytesseract
-from bs4 import BeautifulSoup
 from telegram.ext import Application, CommandHandler, MessageHandler, filters, ContextTypes
-from telegram import Update
+from telegram import Update, InputMediaPhoto
+
+import http_client
+import workers
+import extractors
+import metrics
+import imaging
+import ocr
+import sender
+import identity
+from cache import TTLCache, ShortLinkCache, FileIdCache, HttpCache, SingleFlight
+from config import PERFORMANCE, ADMIN_USER_IDS, SHORTLINK_CACHE, FILE_ID_CACHE, HTTP_CACHE, OCR, STREAMING, METRICS_ENDPOINT, IMAGE_PIPELINE, UPDATES, WEBHOOK, TELEGRAM_SEND, MEDIA_GROUP
 
 # ========================
 # CONFIGURATION (Hardcoded for simplicity and fewer files)
@@ -35,6 +45,32 @@ SUPPORTED_DOMAINS = {
     "snapdeal.com": "snapdeal"
 }
 SHORTENER_DOMAINS = ["cutt.ly", "fkrt.cc", "amzn-to.co", "bitli.in", "spoo.me", "da.gd", "wishlink.com"]
+# Hosts recognised as links in screenshots even without an http(s):// prefix
+LINK_DOMAINS = list(SUPPORTED_DOMAINS) + SHORTENER_DOMAINS
+
+# Latest scraped product dicts keyed on product identity ("amazon:B0..."), see identity.product_key
+product_cache = TTLCache(PERFORMANCE['cache_max_size'], PERFORMANCE['cache_ttl'])
+# Concurrent requests for the same product (see identity.product_key) share one scrape
+product_flight = SingleFlight()
+# Persistent short URL -> expanded URL map (dead links cached briefly)
+shortlink_cache = ShortLinkCache(
+    SHORTLINK_CACHE['path'], SHORTLINK_CACHE['max_entries'], SHORTLINK_CACHE['negative_ttl']
+)
+# OCR text keyed on Telegram's file_unique_id and on a sha256 of the image bytes
+ocr_cache = TTLCache(OCR['cache_max_size'], OCR['cache_ttl'])
+# Telegram file_ids of uploaded product photos, so repeats are sent by reference
+file_id_cache = FileIdCache(FILE_ID_CACHE['path'], FILE_ID_CACHE['max_entries'], FILE_ID_CACHE['url_ttl'])
+# Page and image bodies with their validators, revalidated with conditional GETs
+http_cache = HttpCache(HTTP_CACHE['path'], HTTP_CACHE['max_bytes'], HTTP_CACHE['max_entry_bytes'])
+if HTTP_CACHE['enabled']:
+    http_client.use_cache(http_cache)
+# Replies paced to Telegram's per-chat and global limits
+send_queue = sender.SendQueue(
+    TELEGRAM_SEND['global_rate'], TELEGRAM_SEND['global_burst'],
+    TELEGRAM_SEND['chat_rate'], TELEGRAM_SEND['chat_burst'],
+    TELEGRAM_SEND['group_rate'], TELEGRAM_SEND['group_burst'],
+    max_flood_retries=TELEGRAM_SEND['max_flood_retries'], idle_timeout=TELEGRAM_SEND['idle_timeout']
+)
 
 # ========================
 # LOGGING SETUP
@@ -46,30 +82,46 @@ logger = logging.getLogger(__name__)
 # UTILITY FUNCTIONS
 # ========================
 
-def expand_short_url(url, max_redirects=5):
-    """Expand shortened URLs."""
+async def expand_short_url(url, max_redirects=5):
+    """Expand shortened URLs, consulting the persistent short-link cache first."""
+    hit, target = shortlink_cache.get(url)
+    metrics.CACHE_LOOKUPS.inc('shortlink', "", 'hit' if hit else 'miss')
+    if hit:
+        logger.info(f"Short URL cache hit: {url} -> {target or 'dead link'}")
+        return target or url
     logger.info(f"Expanding short URL: {url}")
     original_url = url
-    for _ in range(max_redirects):
-        try:
-            response = requests.head(url, allow_redirects=False, timeout=5)
-            if 'location' in response.headers:
-                url = response.headers['location']
-                logger.debug(f"Redirected to: {url}")
-            else:
-                break
-        except Exception as e:
-            logger.warning(f"Error expanding URL {url}: {e}")
-            return original_url
+    with metrics.timer('expand'):
+        for _ in range(max_redirects):
+            try:
+                response = await http_client.head(url, timeout=5)
+                if 'location' in response.headers:
+                    url = response.headers['location']
+                    logger.debug(f"Redirected to: {url}")
+                else:
+                    break
+            except Exception as e:
+                logger.warning(f"Error expanding URL {url}: {e}")
+                metrics.ERRORS.inc('expand', "")
+                shortlink_cache.set(original_url, None)
+                return original_url
+    # A 5xx/429 or an interstitial page leaves us on a short link: cache that only
+    # for negative_ttl, never as the link's permanent target
+    if url == original_url or any(short_domain in urlparse(url).netloc for short_domain in SHORTENER_DOMAINS):
+        logger.warning(f"Could not expand {original_url} (HTTP {response.status_code} from {url})")
+        metrics.ERRORS.inc('expand', "")
+        shortlink_cache.set(original_url, None)
+        return original_url
     logger.info(f"Expanded URL: {url}")
+    shortlink_cache.set(original_url, url)
     return url
 
-def clean_url(url):
+async def clean_url(url):
     """Rule 14-16: Remove affiliate tags and shorten parameters."""
     logger.info(f"Cleaning URL: {url}")
     # Expand if short
     if any(short_domain in url for short_domain in SHORTENER_DOMAINS):
-        url = expand_short_url(url)
+        url = await expand_short_url(url)
 
     parsed = urlparse(url)
     query_params = parse_qs(parsed.query)
@@ -106,6 +158,85 @@ def get_platform(url):
             return platform_name
     return "generic"
 
+# ========================
+# TITLE ENGINE
+# ========================
+# Patterns and keyword sets are built once at import, since clean_title runs
+# on every scrape and bulk backfill.
+# Rule 29: clothing keywords and Myntra clothing categories
+CLOTHING_KEYWORDS = [
+    'shirt', 't-shirt', 'jeans', 'trousers', 'shorts', 'kurti', 'saree', 'dress',
+    'top', 'skirt', 'jacket', 'blazer', 'coat', 'suit', 'sweater', 'sweatshirt',
+    'ethnic', 'western', 'lingerie', 'nightwear', 'innerwear', 'footwear', 'shoe',
+    'sandal', 'flip flop', 'heel', 'flat', 'boot', 'sneaker'
+]
+MYNTRA_CLOTHING_CATEGORIES = [
+    'Topwear', 'Bottomwear', 'Innerwear', 'Footwear', 'Indian & Fusion Wear',
+    'Western Wear', 'Lingerie', 'Nightwear', 'Loungewear', 'Ethnic Wear',
+    'Casual Shoes', 'Sports Shoes', 'Formal Shoes', 'Flats', 'Heels', 'Boots',
+    'Sandals', 'Flip Flops'
+]
+def _keyword_pattern(words):
+    """Compile words into one regex shaped as a prefix trie (Aho-Corasick style).
+
+    Shared prefixes are factored out, so each position of the haystack is
+    checked against a handful of branches instead of every keyword.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node):
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        pattern = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        return f'(?:{pattern})?' if '' in node else pattern
+
+    return re.compile(build(trie))
+
+# Substring semantics as before ('top' also matches 'laptop'), one scan per haystack
+_CLOTHING_RE = _keyword_pattern(CLOTHING_KEYWORDS)
+_CLOTHING_CATEGORY_RE = _keyword_pattern([c.lower() for c in MYNTRA_CLOTHING_CATEGORIES])
+# Whole-word gender terms: after cleanup, a \b-bounded match is exactly a token
+GENDER_TITLE_WORDS = (
+    ('Women', frozenset(['women', 'ladies', 'female', 'girl'])),
+    ('Men', frozenset(['men', 'gentlemen', 'male', 'boy'])),
+    ('Kids', frozenset(['kids', 'children', 'baby']))
+)
+# Possessive forms span an apostrophe, so titles containing one use regexes
+_GENDER_TITLE_RES = tuple(
+    (gender, re.compile(r"\b(?:" + '|'.join(sorted(words) + [possessive]) + r")\b"))
+    for (gender, words), possessive in zip(GENDER_TITLE_WORDS, ["women's", "men's", "kid's"])
+)
+GENDER_URL_HINTS = (('Women', ('women', 'girl')), ('Men', ('men', 'boy')), ('Kids', ('kids', 'child')))
+# Matched against the lowercased title, so no IGNORECASE is needed
+_QUANTITY_RE = re.compile(r'\b(\d+)\s*(?:piece|pcs|ml|gm|kg|ltr|pack|set)s?\b')
+_UNICODE_ESCAPE_RE = re.compile(r'\\[uU][0-9a-fA-F]{4}')
+_DISALLOWED_CHARS_RE = re.compile(r"[^\w\s\-\'\.]")
+# Besides the apostrophe, the only non-word characters left after cleanup;
+# mapping them to spaces turns str.split() into a \b-aware word tokenizer
+_TOKEN_SEPARATORS = str.maketrans("-.", "  ")
+
+def _detect_gender(title_lower, url_lower):
+    """Gender from title words first, then URL hints; Unisex if neither has one."""
+    if "'" in title_lower:
+        for gender, pattern in _GENDER_TITLE_RES:
+            if pattern.search(title_lower):
+                return gender
+    else:
+        tokens = set(title_lower.translate(_TOKEN_SEPARATORS).split())
+        for gender, words in GENDER_TITLE_WORDS:
+            if not tokens.isdisjoint(words):
+                return gender
+    for gender, hints in GENDER_URL_HINTS:
+        if any(hint in url_lower for hint in hints):
+            return gender
+    return "Unisex"
+
 def clean_title(title, platform, url):
     """Rules 23-31: Clean title according to strict formatting rules."""
     logger.debug(f"Cleaning title: '{title}' for platform: {platform}")
@@ -113,58 +244,27 @@ def clean_title(title, platform, url):
         return "Product"
     # Basic cleanup
     title = title.encode('ascii', 'ignore').decode('unicode_escape').strip()
-    title = re.sub(r'\\[uU][0-9a-fA-F]{4}', '', title)
-    title = re.sub(r'[^\w\s\-\'\.]', ' ', title)
-    title = re.sub(r'\s+', ' ', title).strip()
-    
+    title = _UNICODE_ESCAPE_RE.sub('', title)
+    title = _DISALLOWED_CHARS_RE.sub(' ', title)
     words = title.split()
     if not words:
         return "Product"
-    
+    title = ' '.join(words) # Collapse whitespace
+
     # Rule 24: First word must be brand (assume first word is brand)
     brand = words[0].title()
     rest_title = ' '.join(words[1:8]) # Rule 28: 5-8 words max
 
     # Rule 29: Clothing must include gender
-    # Use provided Myntra categories and common keywords
-    is_clothing_keywords = [
-        'shirt', 't-shirt', 'jeans', 'trousers', 'shorts', 'kurti', 'saree', 'dress',
-        'top', 'skirt', 'jacket', 'blazer', 'coat', 'suit', 'sweater', 'sweatshirt',
-        'ethnic', 'western', 'lingerie', 'nightwear', 'innerwear', 'footwear', 'shoe',
-        'sandal', 'flip flop', 'heel', 'flat', 'boot', 'sneaker'
-    ]
-    is_clothing = any(kw in url.lower() or kw in title.lower() for kw in is_clothing_keywords)
-    # Also check Myntra categories from the provided data
-    myntra_clothing_categories = [
-        'Topwear', 'Bottomwear', 'Innerwear', 'Footwear', 'Indian & Fusion Wear',
-        'Western Wear', 'Lingerie', 'Nightwear', 'Loungewear', 'Ethnic Wear',
-        'Casual Shoes', 'Sports Shoes', 'Formal Shoes', 'Flats', 'Heels', 'Boots',
-        'Sandals', 'Flip Flops'
-    ]
-    is_clothing = is_clothing or any(cat.lower() in title.lower() for cat in myntra_clothing_categories)
-
-    gender = ""
-    if is_clothing:
-        if re.search(r'\b(women|ladies|female|girl|women\'s)\b', title, re.IGNORECASE):
-            gender = "Women"
-        elif re.search(r'\b(men|gentlemen|male|boy|men\'s)\b', title, re.IGNORECASE):
-            gender = "Men"
-        elif re.search(r'\b(kids|children|baby|kid\'s)\b', title, re.IGNORECASE):
-            gender = "Kids"
-        else:
-            # Default heuristic based on URL or common patterns if not in title
-            if 'women' in url.lower() or 'girl' in url.lower():
-                gender = "Women"
-            elif 'men' in url.lower() or 'boy' in url.lower():
-                gender = "Men"
-            elif 'kids' in url.lower() or 'child' in url.lower():
-                gender = "Kids"
-            else:
-                gender = "Unisex" # Fallback
+    title_lower, url_lower = title.lower(), url.lower()
+    # Keywords can't contain a newline, so one scan covers both URL and title
+    is_clothing = bool(_CLOTHING_RE.search(f"{url_lower}\n{title_lower}") or _CLOTHING_CATEGORY_RE.search(title_lower))
+
+    gender = _detect_gender(title_lower, url_lower) if is_clothing else ""
 
     # Rule 30: Quantity like Pack of 2, 300ml, 1 Piece
     quantity = ""
-    qty_match = re.search(r'\b(\d+)\s*(?:piece|pcs|ml|gm|kg|ltr|pack|set)s?\b', title, re.IGNORECASE)
+    qty_match = _QUANTITY_RE.search(title_lower)
     if qty_match:
         unit = qty_match.group(0).split()[-1]
         quantity = f"{qty_match.group(1)} {unit.title()}"
@@ -198,10 +298,8 @@ def extract_text_from_image(image_bytes):
     """OCR Fallback for title extraction."""
     logger.info("Performing OCR on image...")
     try:
-        image = Image.open(io.BytesIO(image_bytes))
-        # Convert to grayscale for better OCR
-        grayscale_image = image.convert('L')
-        text = pytesseract.image_to_string(grayscale_image)
+        # Address bar strips first, then the binarized full page
+        text = ocr.read_text(image_bytes, LINK_DOMAINS)
         logger.debug(f"OCR extracted text: {text[:100]}...")
         return text.strip()
     except Exception as e:
@@ -212,140 +310,107 @@ def extract_text_from_image(image_bytes):
 # SCRAPER FUNCTIONS
 # ========================
 
-def scrape_product(url, platform):
-    """Scrape product details using requests and BeautifulSoup."""
+async def scrape_product(url, platform):
+    """Scrape product details: fetch on the event loop, parse in the worker pool."""
     logger.info(f"Scraping {platform} product: {url}")
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (iPhone; CPU iPhone OS 15_0 like Mac OS X) AppleWebKit/605.1.15'
-    }
+    streamed = {}
+    stream_extract = extractors.StreamExtractor(platform)
+
+    def fields_found(buffer):
+        fields = stream_extract(buffer)
+        if fields:
+            streamed['fields'] = fields
+        return fields is not None
+
     try:
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.content, 'html.parser')
+        with metrics.timer('fetch', platform):
+            if STREAMING['enabled']:
+                # Read the page in chunks and abort as soon as every field is present
+                _, content, _ = await http_client.fetch_stream(
+                    url, stop=fields_found, max_bytes=STREAMING['max_bytes'],
+                    chunk_size=STREAMING['chunk_size'], timeout=10, platform=platform
+                )
+            else:
+                response = await http_client.fetch(url, timeout=10, platform=platform)
+                response.raise_for_status()
+                content = response.content
     except Exception as e:
         logger.error(f"Failed to fetch page for {url}: {e}")
+        metrics.ERRORS.inc('fetch', platform)
         return None
-
-    title, price, image_url = "Product", "Price unavailable", None
-
-    # --- Platform Specific Scraping ---
-    if platform == "myntra":
-        # Using more generic selectors based on common structure
-        title_elem = soup.find('h1', {'class': lambda x: x and ('pdp' in x and 'title' in x)})
-        name_elem = soup.find('h1', {'class': lambda x: x and ('pdp' in x and 'name' in x)})
-        price_elem = soup.find('span', {'class': lambda x: x and ('pdp' in x and 'price' in x)})
-        
-        # Fallback selectors if specific ones fail
-        if not title_elem: title_elem = soup.find('h1')
-        if not name_elem: name_elem = soup.find('h1')
-        if not price_elem: price_elem = soup.find('span', string=re.compile(r'₹|Rs\.'))
-        
-        if name_elem and title_elem:
-            title = f"{name_elem.get_text(strip=True)} {title_elem.get_text(strip=True)}"
-        elif title_elem:
-            title = title_elem.get_text(strip=True)
-        elif name_elem:
-            title = name_elem.get_text(strip=True)
-            
-        if price_elem:
-            price = price_elem.get_text(strip=True)
-            
-        # Image - harder without JS, look for main product image
-        img_elem = soup.find('img', {'alt': lambda x: x and ('product' in x.lower() or 'image' in x.lower())})
-        if not img_elem:
-             # Fallback: first large image
-            img_candidates = soup.find_all('img')
-            for img in img_candidates:
-                src = img.get('src') or img.get('data-src')
-                if src and ('product' in src or 'media' in src):
-                    img_elem = img
-                    break
-        image_url = img_elem.get('src') or img_elem.get('data-src') if img_elem else None
-
-    elif platform == "meesho":
-        # Meesho structure can vary, use generic selectors
-        title_elem = soup.find('h1') # Often the first h1 is the product title
-        # Price often inside a span with a class containing 'price'
-        price_elem = soup.find('span', string=re.compile(r'₹'))
-        if not price_elem:
-             # Look for spans containing numbers
-            price_candidates = soup.find_all('span')
-            for pc in price_candidates:
-                if re.search(r'\d+', pc.get_text()):
-                    price_elem = pc
-                    break
-        
-        title = title_elem.get_text(strip=True) if title_elem else "Meesho Product"
-        price = price_elem.get_text(strip=True) if price_elem else "Price unavailable"
-        
-        # Image
-        img_elem = soup.find('img', {'alt': lambda x: x and 'product' in x.lower()})
-        if not img_elem:
-            img_elem = soup.find('img') # First image as fallback
-        image_url = img_elem.get('src') if img_elem else None
-
-    elif platform == "amazon":
-        title_elem = soup.find('span', {'id': 'productTitle'})
-        # Amazon price structure can be complex, look for common patterns
-        price_whole = soup.find('span', {'class': 'a-price-whole'})
-        price_symbol = soup.find('span', {'class': 'a-price-symbol'})
-        if price_whole:
-            price = f"{price_symbol.get_text(strip=True) if price_symbol else ''}{price_whole.get_text(strip=True)}"
-        else:
-            # Fallback price search
-            price_elem = soup.find('span', string=re.compile(r'₹|Rs\.'))
-            price = price_elem.get_text(strip=True) if price_elem else "Price unavailable"
-            
-        title = title_elem.get_text(strip=True) if title_elem else "Amazon Product"
-        
-        # Image
-        img_elem = soup.find('img', {'id': 'landingImage'})
-        if not img_elem:
-            img_elem = soup.find('img', {'class': lambda x: x and 'image' in x})
-        image_url = img_elem.get('src') if img_elem else None
-
-    elif platform == "flipkart":
-        # Flipkart dynamic classes, use generic selectors
-        title_elem = soup.find('span', {'class': lambda x: x and 'title' in x.lower()})
-        if not title_elem:
-            title_elem = soup.find('h1') # Fallback
-        price_elem = soup.find('div', {'class': lambda x: x and ('price' in x.lower() or '_30jeq3' in x)}) # Common price class
-        
-        title = title_elem.get_text(strip=True) if title_elem else "Flipkart Product"
-        price = price_elem.get_text(strip=True) if price_elem else "Price unavailable"
-        
-        # Image
-        img_elem = soup.find('img', {'class': lambda x: x and ('image' in x.lower() or '_396cs4' in x)})
-        if not img_elem:
-            img_elem = soup.find('img') # Ultimate fallback
-        image_url = img_elem.get('src') if img_elem else None
-
-    else: # Generic fallback
-        title_elem = soup.find('title') or soup.find('h1')
-        title = title_elem.get_text(strip=True) if title_elem else "Product"
-        # Generic price search
-        price_elem = soup.find(string=re.compile(r'₹|Rs\.|Price'))
-        if price_elem:
-            price_match = re.search(r'[\d,]+\.?\d*', str(price_elem))
-            price = price_match.group() if price_match else "Price unavailable"
-        else:
-            price = "Price unavailable"
-        # Generic image
-        img_elem = soup.find('img')
-        image_url = img_elem.get('src') if img_elem else None
+    timings = {}
+    if 'fields' in streamed:
+        product = build_product(streamed['fields'], url, platform, timings)
+    else:
+        try:
+            product, timings = await workers.run_cpu(parse_product_page, content, url, platform)
+        except Exception as e:
+            logger.error(f"Failed to parse page for {url}: {e}")
+            metrics.ERRORS.inc('parse', platform)
+            return None
+    for stage, seconds in timings.items():
+        metrics.observe(stage, seconds, platform)
+    return product
+
+def parse_product_page(content, url, platform):
+    """Extract product details from page HTML (CPU-bound, runs in a worker process).
+
+    Returns (product, stage timings): metrics recorded inside a worker
+    process would be lost, so the parent records them.
+    """
+    timings = {}
+    started = time.perf_counter()
+    # Registry dispatch: fast parser first, BeautifulSoup only on a miss
+    fields = extractors.extract(content, platform)
+    timings['parse'] = time.perf_counter() - started
+    return build_product(fields, url, platform, timings), timings
+
+def build_product(fields, url, platform, timings=None):
+    """Turn raw (title, price, image_url) into the cleaned product dict."""
+    title, price, image_url = fields
 
     # Clean and finalize
+    started = time.perf_counter()
     clean_title_str = clean_title(title, platform, url)
+    if timings is not None:
+        timings['title_clean'] = time.perf_counter() - started
     clean_price = parse_price(price)
 
     return {
         'platform': platform,
         'title': clean_title_str,
+        'raw_title': title,
         'price': clean_price,
         'url': url,
         'image_url': image_url
     }
 
+# Fields that depend on the link a product was requested with; never shared via product_cache
+LINK_FIELDS = ('url', 'title')
+
+def for_link(data, url):
+    """A shared product record as seen from one link: its own URL, and a title cleaned with its slug hints."""
+    return dict(data, url=url, title=clean_title(data['raw_title'], data['platform'], url))
+
+async def get_product(url, platform):
+    """Return product data for a cleaned URL, serving repeats of the same product from product_cache."""
+    key = identity.product_key(url)
+    data = product_cache.get(key)
+    metrics.CACHE_LOOKUPS.inc('product', platform, 'hit' if data is not None else 'miss')
+    if data is not None:
+        logger.info(f"Cache hit for {key}")
+    else:
+        # Parallel updates for the same product, whatever the link form, wait on a single scrape
+        data = await product_flight.do(key, _scrape_and_cache, key, url, platform)
+    return for_link(data, url) if data else data
+
+async def _scrape_and_cache(key, url, platform):
+    data = await scrape_product(url, platform)
+    if data:
+        data = {k: v for k, v in data.items() if k not in LINK_FIELDS}
+        product_cache.set(key, data)
+    return data
+
 # ========================
 # FORMATTING
 # ========================
@@ -398,408 +463,249 @@ async def mode_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def img_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text("🔄 Regenerating image... (Simulated)")
 
+async def cache_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Admin only: /cache shows cache stats, /cache flush [links|photos|http] empties them."""
+    if update.effective_user is None or update.effective_user.id not in ADMIN_USER_IDS:
+        await update.message.reply_text("⛔ Admin only command.")
+        return
+    if context.args and context.args[0].lower() == "flush":
+        removed = product_cache.clear() + ocr_cache.clear()
+        if len(context.args) > 1 and context.args[1].lower() == "links":
+            removed += shortlink_cache.clear()
+        if len(context.args) > 1 and context.args[1].lower() == "photos":
+            removed += file_id_cache.clear()
+        if len(context.args) > 1 and context.args[1].lower() == "http":
+            removed += http_cache.clear()
+        await update.message.reply_text(f"🧹 Cache flushed ({removed} entries).")
+        return
+    stats = product_cache.stats()
+    link_stats = shortlink_cache.stats()
+    photo_stats = file_id_cache.stats()
+    http_stats = http_cache.stats()
+    await update.message.reply_text(
+        "📦 Product cache\n"
+        f"Entries: {stats['size']}/{stats['max_size']} (TTL {stats['ttl']}s)\n"
+        f"Hits: {stats['hits']} | Misses: {stats['misses']} | Hit rate: {stats['hit_rate']:.0%}\n"
+        f"Evictions: {stats['evictions']} | Expired: {stats['expirations']}\n"
+        f"Scrapes started: {product_flight.started} | Coalesced: {product_flight.shared}\n"
+        "🔗 Short-link cache\n"
+        f"Entries: {link_stats['size']}/{link_stats['max_size']} ({link_stats['dead']} dead)\n"
+        f"Hits: {link_stats['hits']} | Misses: {link_stats['misses']}\n"
+        "🖼 Photo file_id cache\n"
+        f"Entries: {photo_stats['size']}/{photo_stats['max_size']}\n"
+        f"Hits: {photo_stats['hits']} | Misses: {photo_stats['misses']}\n"
+        "🌐 HTTP response cache\n"
+        f"Entries: {http_stats['size']} ({http_stats['bytes'] / 1048576:.1f}/{http_stats['max_bytes'] / 1048576:.0f} MB)\n"
+        f"Fresh: {http_stats['fresh_hits']} | Revalidated: {http_stats['revalidated']} | Misses: {http_stats['misses']}"
+    )
+
 # ========================
 # MESSAGE HANDLER
 # ========================
 
-async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    start_time = time.time()
-    # Correctly get text and photo
-    text = update.message.text if update.message.text else update.message.caption if update.message.caption else ""
-    photo = update.message.photo[-1] if update.message.photo else None # Get largest photo
-    
-    urls = re.findall(r'https?://[^\s]+', text)
-    pin_code = PIN_DEFAULT
-    pin_match = re.search(r'(?:pin|code)\s*[:\-]?\s*(\d{6})', text, re.IGNORECASE)
-    if pin_match:
-        pin_code = pin_match.group(1)
-
-    # --- Handle OCR Fallback ---
-    ocr_title = ""
-    if photo and not urls:
-        logger.info("No URL found, attempting OCR...")
+async def process_url(url, pin_code, slots):
+    """Expand, scrape and fetch the image for one URL; returns the reply to send."""
+    async with slots:
+        logger.info(f"Processing URL: {url}")
+        platform = ""
         try:
-            file = await context.bot.get_file(photo.file_id)
-            image_bytes = await file.download_as_bytearray()
-            ocr_title = extract_text_from_image(bytes(image_bytes))
-            if ocr_title:
-                 # Try to find a URL in the OCR text
-                ocr_urls = re.findall(r'https?://[^\s]+', ocr_title)
-                urls.extend(ocr_urls)
-                logger.info(f"Found URLs via OCR: {ocr_urls}")
-                # If OCR text is substantial and no URL found, send it back
-                if not ocr_urls and len(ocr_title) > 50:
-                     await update.message.reply_text(f"📄 OCR Extracted:\n{ocr_title[:300]}...")
+            clean_url_str = await clean_url(url)
+            if not is_supported(clean_url_str):
+                metrics.URLS.inc(platform, 'unsupported')
+                return {'text': "❌ Unsupported or invalid product link.", 'image_bytes': None}
+
+            platform = get_platform(clean_url_str)
+            data = await get_product(clean_url_str, platform)
+            if not data:
+                metrics.URLS.inc(platform, 'failed')
+                return {'text': "❌ Unable to extract product info.", 'image_bytes': None}
+
+            formatted_text = format_output(data, pin_code)
         except Exception as e:
-            logger.error(f"Error during OCR processing: {e}")
-    
-    # --- Main Processing Loop for URLs ---
-    if not urls:
-        # If no URLs were found initially or via OCR, we can't process further
-        # The OCR text (if any) was already sent above
-        return # Exit the handler
+            logger.error(f"Failed to process URL {url}: {e}")
+            metrics.URLS.inc(platform, 'error')
+            return {'text': "❌ Unable to extract product info.", 'image_bytes': None}
+        metrics.URLS.inc(platform, 'ok')
 
-    for url in urls:
-        logger.info(f"Processing URL: {url}")
-        clean_url_str = clean_url(url)
-        
-        if not is_supported(clean_url_str):
-            await update.message.reply_text("❌ Unsupported or invalid product link.")
-            continue
-
-        platform = get_platform(clean_url_str)
-        data = scrape_product(clean_url_str, platform)
-
-        if not data:
-            await update.message.reply_text("❌ Unable to extract product info.")
-            continue
-
-        formatted_text = format_output(data, pin_code)
-        
-        # --- Handle Image Sending ---
-        media_sent = False
+        # --- Fetch Product Image ---
+        result = {'text': formatted_text, 'image_bytes': None, 'file_id': None, 'platform': platform, 'image_url': data.get('image_url')}
         if data.get('image_url'):
-            try:
-                img_response = requests.get(data['image_url'], timeout=10)
-                img_response.raise_for_status()
-                image_bytes = img_response.content
-                # Validate it's an image by trying to open it
-                img = Image.open(io.BytesIO(image_bytes))
-                # Send image with caption
-                await update.message.reply_photo(photo=io.BytesIO(image_bytes), caption=formatted_text)
-                media_sent = True
-                logger.info("Product image sent successfully.")
-            except Exception as e:
-                logger.warning(f"Failed to send image from URL: {e}")
-        
-        # Fallback: Send text only if image failed or wasn't found
-        if not media_sent:
-            await update.message.reply_text(formatted_text)
-            logger.info("Sent product info as text.")
-
-    logger.info(f"Processed message in {time.time() - start_time:.2f} seconds.")
-
-# ========================
-# MAIN
-# ========================
-
-def main():
-    if not BOT_TOKEN or BOT_TOKEN == "YOUR_BOT_TOKEN_HERE":
-        logger.critical("BOT_TOKEN is not set in the code. Please update main.py with your actual token.")
-        return
-
-    logger.info("Starting ReviewCheckk Bot...")
+            # A photo Telegram already has is sent by file_id, skipping download and upload
+            result['file_id'] = file_id_cache.get(url=data['image_url'])
+            metrics.CACHE_LOOKUPS.inc('file_id', platform, 'hit' if result['file_id'] else 'miss')
+            if not result['file_id']:
+                await attach_image(result)
+        return result
+
+async def attach_image(result):
+    """Download and prepare the result's image; reuse a file_id if the same bytes were sent before."""
     try:
-        app = Application.builder().token(BOT_TOKEN).concurrent_updates(True).build()
-        
-        # Register handlers
-        app.add_handler(CommandHandler("start", start))
-        app.add_handler(CommandHandler("advancing", mode_command))
-        app.add_handler(CommandHandler("off_advancing", mode_command))
-        app.add_handler(CommandHandler("img", img_command))
-        app.add_handler(MessageHandler(filters.TEXT | filters.CAPTION | filters.PHOTO, handle_message))
-        
-        logger.info("Bot handlers registered. Starting polling...")
-        app.run_polling(drop_pending_updates=True)
+        image_bytes = await fetch_product_image(result['image_url'], result['platform'])
     except Exception as e:
-        logger.critical(f"Failed to start bot: {e}", exc_info=True)
-
-if __name__ == "__main__":
-    main()def clean_title(title, platform, url):
-    """Rules 23-31: Clean title according to strict formatting rules."""
-    logger.debug(f"Cleaning title: '{title}' for platform: {platform}")
-    if not title:
-        return "Product"
-    # Basic cleanup
-    title = title.encode('ascii', 'ignore').decode('unicode_escape').strip()
-    title = re.sub(r'\\[uU][0-9a-fA-F]{4}', '', title)
-    title = re.sub(r'[^\w\s\-\'\.]', ' ', title)
-    title = re.sub(r'\s+', ' ', title).strip()
-    
-    words = title.split()
-    if not words:
-        return "Product"
-    
-    # Rule 24: First word must be brand (assume first word is brand)
-    brand = words[0].title()
-    rest_title = ' '.join(words[1:8]) # Rule 28: 5-8 words max
-
-    # Rule 29: Clothing must include gender
-    # Use provided Myntra categories and common keywords
-    is_clothing_keywords = [
-        'shirt', 't-shirt', 'jeans', 'trousers', 'shorts', 'kurti', 'saree', 'dress',
-        'top', 'skirt', 'jacket', 'blazer', 'coat', 'suit', 'sweater', 'sweatshirt',
-        'ethnic', 'western', 'lingerie', 'nightwear', 'innerwear', 'footwear', 'shoe',
-        'sandal', 'flip flop', 'heel', 'flat', 'boot', 'sneaker'
-    ]
-    is_clothing = any(kw in url.lower() or kw in title.lower() for kw in is_clothing_keywords)
-    # Also check Myntra categories from the provided data
-    myntra_clothing_categories = [
-        'Topwear', 'Bottomwear', 'Innerwear', 'Footwear', 'Indian & Fusion Wear',
-        'Western Wear', 'Lingerie', 'Nightwear', 'Loungewear', 'Ethnic Wear',
-        'Casual Shoes', 'Sports Shoes', 'Formal Shoes', 'Flats', 'Heels', 'Boots',
-        'Sandals', 'Flip Flops'
-    ]
-    is_clothing = is_clothing or any(cat.lower() in title.lower() for cat in myntra_clothing_categories)
-
-    gender = ""
-    if is_clothing:
-        if re.search(r'\b(women|ladies|female|girl|women\'s)\b', title, re.IGNORECASE):
-            gender = "Women"
-        elif re.search(r'\b(men|gentlemen|male|boy|men\'s)\b', title, re.IGNORECASE):
-            gender = "Men"
-        elif re.search(r'\b(kids|children|baby|kid\'s)\b', title, re.IGNORECASE):
-            gender = "Kids"
+        logger.warning(f"Failed to fetch image from URL: {e}")
+        metrics.ERRORS.inc('image', result['platform'])
+        return
+    result['image_bytes'] = image_bytes
+    result['image_digest'] = hashlib.sha256(image_bytes).hexdigest()
+    file_id = file_id_cache.get(digest=result['image_digest'])
+    if file_id:
+        # Same picture under a new URL: remember the URL too
+        file_id_cache.set(file_id, url=result['image_url'])
+        result['file_id'] = file_id
+
+async def download_image(url, platform=""):
+    """GET image bytes, refusing bodies over IMAGE_PIPELINE['max_download_bytes']."""
+    _, body, truncated = await http_client.fetch_stream(
+        url, max_bytes=IMAGE_PIPELINE['max_download_bytes'], timeout=10, platform=platform
+    )
+    if truncated:
+        raise ValueError(f"image larger than {IMAGE_PIPELINE['max_download_bytes']} bytes")
+    return body
+
+async def fetch_product_image(image_url, platform):
+    """Download the product image (smaller CDN rendition first) and shrink it for upload."""
+    with metrics.timer('image', platform):
+        if not IMAGE_PIPELINE['enabled']:
+            raw = await download_image(image_url, platform)
+            # Header-only check that it is an image at all
+            imaging.probe(raw)
+            return raw
+        url = imaging.variant_url(image_url, platform)
+        try:
+            raw = await download_image(url, platform)
+        except Exception as e:
+            if url == image_url:
+                raise
+            logger.info(f"CDN variant failed ({e}), using original image URL")
+            raw = await download_image(image_url, platform)
+    metrics.IMAGE_BYTES.inc(platform, 'downloaded', amount=len(raw))
+    with metrics.timer('image_process', platform):
+        image_bytes = await workers.run_cpu(imaging.prepare, raw)
+    metrics.IMAGE_BYTES.inc(platform, 'prepared', amount=len(image_bytes))
+    return image_bytes
+
+async def reply(update: Update, make, kind=sender.TEXT):
+    """Send a reply through the outbound send queue; `make()` returns the API call."""
+    if not TELEGRAM_SEND['enabled']:
+        return await make()
+    message = update.message
+    chat = getattr(message, 'chat', None)
+    group = chat is not None and chat.type != 'private'
+    return await send_queue.send(message.chat_id, make, kind, group=group)
+
+async def send_result(update: Update, result):
+    """Reply with the product photo and caption, falling back to text only."""
+    message = update.message
+    if result.get('file_id'):
+        try:
+            with metrics.timer('send'):
+                await reply(update, lambda: message.reply_photo(photo=result['file_id'], caption=result['text']), sender.PHOTO)
+            logger.info("Product image sent by cached file_id.")
+            return
+        except Exception as e:
+            logger.warning(f"Cached file_id rejected, uploading instead: {e}")
+            file_id_cache.discard(result['file_id'])
+            result['file_id'] = None
+            if not result.get('image_bytes'):
+                await attach_image(result)
+    if result.get('image_bytes'):
+        try:
+            with metrics.timer('send'):
+                # A fresh BytesIO per attempt: a flood-wait retry re-reads the upload
+                sent = await reply(
+                    update, lambda: message.reply_photo(photo=io.BytesIO(result['image_bytes']), caption=result['text']), sender.PHOTO
+                )
+            metrics.IMAGE_BYTES.inc(result['platform'], 'uploaded', amount=len(result['image_bytes']))
+            remember_file_id(sent, result)
+            logger.info("Product image sent successfully.")
+            return
+        except Exception as e:
+            logger.warning(f"Failed to send image: {e}")
+            metrics.ERRORS.inc('send', "")
+    # Fallback: Send text only if image failed or wasn't found
+    with metrics.timer('send'):
+        await reply(update, lambda: message.reply_text(result['text']))
+    logger.info("Sent product info as text.")
+
+async def send_results(update: Update, results):
+    """Send one message's results: photos as albums of up to MEDIA_GROUP['max_items'], the rest one by one."""
+    photos = [r for r in results if r.get('file_id') or r.get('image_bytes')]
+    if not MEDIA_GROUP['enabled'] or len(photos) < 2:
+        for result in results:
+            await send_result(update, result)
+        return
+    size = MEDIA_GROUP['max_items']
+    for start in range(0, len(photos), size):
+        chunk = photos[start:start + size]
+        if len(chunk) == 1:
+            await send_result(update, chunk[0])
         else:
-            # Default heuristic based on URL or common patterns if not in title
-            if 'women' in url.lower() or 'girl' in url.lower():
-                gender = "Women"
-            elif 'men' in url.lower() or 'boy' in url.lower():
-                gender = "Men"
-            elif 'kids' in url.lower() or 'child' in url.lower():
-                gender = "Kids"
-            else:
-                gender = "Unisex" # Fallback
-
-    # Rule 30: Quantity like Pack of 2, 300ml, 1 Piece
-    quantity = ""
-    qty_match = re.search(r'\b(\d+)\s*(?:piece|pcs|ml|gm|kg|ltr|pack|set)s?\b', title, re.IGNORECASE)
-    if qty_match:
-        unit = qty_match.group(0).split()[-1]
-        quantity = f"{qty_match.group(1)} {unit.title()}"
-
-    # Rebuild title
-    if is_clothing:
-        # [Brand] [Gender] [Quantity] [Product Name]
-        parts = [part for part in [brand, gender, quantity, rest_title] if part]
-        return " ".join(parts)
-    else:
-        # [Brand] [Product Title] from @[price] rs (price added later)
-        parts = [part for part in [brand, quantity, rest_title] if part]
-        return " ".join(parts)
+            await send_album(update, chunk)
+    for result in results:
+        if not (result.get('file_id') or result.get('image_bytes')):
+            await send_result(update, result)
+
+async def send_album(update: Update, results):
+    """Send 2-10 product photos as one media group, each with its format_output caption."""
+    message = update.message
+
+    def make():
+        # Fresh BytesIO objects per attempt, like single uploads
+        media = [
+            InputMediaPhoto(media=r.get('file_id') or io.BytesIO(r['image_bytes']), caption=r['text'])
+            for r in results
+        ]
+        return message.reply_media_group(media=media)
 
-def parse_price(price_str):
-    """Rules 32-39: Parse price string to numeric value."""
-    logger.debug(f"Parsing price: '{price_str}'")
-    if not price_str:
-        return "Price unavailable"
-    # Extract numeric value
-    price_value = re.sub(r'[^\d.]', '', price_str)
-    if not price_value:
-        return "Price unavailable"
-    try:
-        # Return integer part only
-        return f"{float(price_value):.0f}"
-    except ValueError:
-        return "Price unavailable"
-
-def extract_text_from_image(image_bytes):
-    """OCR Fallback for title extraction."""
-    logger.info("Performing OCR on image...")
     try:
-        image = Image.open(io.BytesIO(image_bytes))
-        # Convert to grayscale for better OCR
-        grayscale_image = image.convert('L')
-        text = pytesseract.image_to_string(grayscale_image)
-        logger.debug(f"OCR extracted text: {text[:100]}...")
-        return text.strip()
+        with metrics.timer('send'):
+            sent = await reply(update, make, sender.PHOTO)
     except Exception as e:
-        logger.error(f"OCR failed: {e}")
-        return ""
-
-# ========================
-# SCRAPER FUNCTIONS
-# ========================
-
-def scrape_product(url, platform):
-    """Scrape product details using requests and BeautifulSoup."""
-    logger.info(f"Scraping {platform} product: {url}")
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (iPhone; CPU iPhone OS 15_0 like Mac OS X) AppleWebKit/605.1.15'
-    }
-    try:
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.content, 'html.parser')
-    except Exception as e:
-        logger.error(f"Failed to fetch page for {url}: {e}")
-        return None
-
-    title, price, image_url = "Product", "Price unavailable", None
-
-    # --- Platform Specific Scraping ---
-    if platform == "myntra":
-        # Using more generic selectors based on common structure
-        title_elem = soup.find('h1', {'class': lambda x: x and ('pdp' in x and 'title' in x)})
-        name_elem = soup.find('h1', {'class': lambda x: x and ('pdp' in x and 'name' in x)})
-        price_elem = soup.find('span', {'class': lambda x: x and ('pdp' in x and 'price' in x)})
-        
-        # Fallback selectors if specific ones fail
-        if not title_elem: title_elem = soup.find('h1')
-        if not name_elem: name_elem = soup.find('h1')
-        if not price_elem: price_elem = soup.find('span', string=re.compile(r'₹|Rs\.'))
-        
-        if name_elem and title_elem:
-            title = f"{name_elem.get_text(strip=True)} {title_elem.get_text(strip=True)}"
-        elif title_elem:
-            title = title_elem.get_text(strip=True)
-        elif name_elem:
-            title = name_elem.get_text(strip=True)
-            
-        if price_elem:
-            price = price_elem.get_text(strip=True)
-            
-        # Image - harder without JS, look for main product image
-        img_elem = soup.find('img', {'alt': lambda x: x and ('product' in x.lower() or 'image' in x.lower())})
-        if not img_elem:
-             # Fallback: first large image
-            img_candidates = soup.find_all('img')
-            for img in img_candidates:
-                src = img.get('src') or img.get('data-src')
-                if src and ('product' in src or 'media' in src):
-                    img_elem = img
-                    break
-        image_url = img_elem.get('src') or img_elem.get('data-src') if img_elem else None
-
-    elif platform == "meesho":
-        # Meesho structure can vary, use generic selectors
-        title_elem = soup.find('h1') # Often the first h1 is the product title
-        # Price often inside a span with a class containing 'price'
-        price_elem = soup.find('span', string=re.compile(r'₹'))
-        if not price_elem:
-             # Look for spans containing numbers
-            price_candidates = soup.find_all('span')
-            for pc in price_candidates:
-                if re.search(r'\d+', pc.get_text()):
-                    price_elem = pc
-                    break
-        
-        title = title_elem.get_text(strip=True) if title_elem else "Meesho Product"
-        price = price_elem.get_text(strip=True) if price_elem else "Price unavailable"
-        
-        # Image
-        img_elem = soup.find('img', {'alt': lambda x: x and 'product' in x.lower()})
-        if not img_elem:
-            img_elem = soup.find('img') # First image as fallback
-        image_url = img_elem.get('src') if img_elem else None
-
-    elif platform == "amazon":
-        title_elem = soup.find('span', {'id': 'productTitle'})
-        # Amazon price structure can be complex, look for common patterns
-        price_whole = soup.find('span', {'class': 'a-price-whole'})
-        price_symbol = soup.find('span', {'class': 'a-price-symbol'})
-        if price_whole:
-            price = f"{price_symbol.get_text(strip=True) if price_symbol else ''}{price_whole.get_text(strip=True)}"
-        else:
-            # Fallback price search
-            price_elem = soup.find('span', string=re.compile(r'₹|Rs\.'))
-            price = price_elem.get_text(strip=True) if price_elem else "Price unavailable"
-            
-        title = title_elem.get_text(strip=True) if title_elem else "Amazon Product"
-        
-        # Image
-        img_elem = soup.find('img', {'id': 'landingImage'})
-        if not img_elem:
-            img_elem = soup.find('img', {'class': lambda x: x and 'image' in x})
-        image_url = img_elem.get('src') if img_elem else None
-
-    elif platform == "flipkart":
-        # Flipkart dynamic classes, use generic selectors
-        title_elem = soup.find('span', {'class': lambda x: x and 'title' in x.lower()})
-        if not title_elem:
-            title_elem = soup.find('h1') # Fallback
-        price_elem = soup.find('div', {'class': lambda x: x and ('price' in x.lower() or '_30jeq3' in x)}) # Common price class
-        
-        title = title_elem.get_text(strip=True) if title_elem else "Flipkart Product"
-        price = price_elem.get_text(strip=True) if price_elem else "Price unavailable"
-        
-        # Image
-        img_elem = soup.find('img', {'class': lambda x: x and ('image' in x.lower() or '_396cs4' in x)})
-        if not img_elem:
-            img_elem = soup.find('img') # Ultimate fallback
-        image_url = img_elem.get('src') if img_elem else None
-
-    else: # Generic fallback
-        title_elem = soup.find('title') or soup.find('h1')
-        title = title_elem.get_text(strip=True) if title_elem else "Product"
-        # Generic price search
-        price_elem = soup.find(string=re.compile(r'₹|Rs\.|Price'))
-        if price_elem:
-            price_match = re.search(r'[\d,]+\.?\d*', str(price_elem))
-            price = price_match.group() if price_match else "Price unavailable"
-        else:
-            price = "Price unavailable"
-        # Generic image
-        img_elem = soup.find('img')
-        image_url = img_elem.get('src') if img_elem else None
-
-    # Clean and finalize
-    clean_title_str = clean_title(title, platform, url)
-    clean_price = parse_price(price)
-
-    return {
-        'platform': platform,
-        'title': clean_title_str,
-        'price': clean_price,
-        'url': url,
-        'image_url': image_url
-    }
-
-# ========================
-# FORMATTING
-# ========================
-
-def format_output(data, pin=PIN_DEFAULT):
-    """Rules 40-50, 81-85: Format output according to platform-specific rules."""
-    platform = data['platform']
-    title = data['title']
-    price = data['price']
-    url = data['url']
-
-    # Rule 51: Common footer
-    footer = "\n@reviewcheckk"
-
-    if platform == 'meesho':
-        # Rule 41: Meesho format
-        formatted = f"{title} @{price} rs\n{url}"
-        # Rule 45: Add pin code
-        formatted += f"\nPin - {pin}"
-        return formatted + footer
-
-    elif 'clothing' in title.lower() or platform in ['myntra', 'meesho'] or any(g in title for g in ['Men', 'Women', 'Kids']):
-        # Rule 42: Clothing format (non-Meesho) - Heuristic check for gender in title
-        formatted = f"{title} @{price} rs\n{url}"
-        return formatted + footer
-
-    else:
-        # Rule 43: Non-clothing format
-        formatted = f"{title} from @{price} rs\n{url}"
-        return formatted + footer
-
-# ========================
-# COMMAND HANDLERS
-# ========================
-
-async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    await update.message.reply_text(
-        f"🚀 {BOT_USERNAME} Ready!\n"
-        "Send product links from Amazon, Flipkart, Meesho, Myntra, Ajio, Snapdeal.\n"
-        "Commands: /advancing, /off_advancing, /img"
-    )
-
-async def mode_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    command = update.message.text.strip()
-    if command == "/advancing":
-        await update.message.reply_text("✅ Advanced Mode ON (Simulated)")
-    elif command == "/off_advancing":
-        await update.message.reply_text("✅ Advanced Mode OFF (Simulated)")
-
-async def img_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    await update.message.reply_text("🔄 Regenerating image... (Simulated)")
-
-# ========================
-# MESSAGE HANDLER
-# ========================
+        # e.g. a stale cached file_id fails the whole album; send_result handles that per photo
+        logger.warning(f"Album of {len(results)} photos failed, sending one by one: {e}")
+        metrics.ERRORS.inc('send', "")
+        for result in results:
+            await send_result(update, result)
+        return
+    for result, sent_message in zip(results, sent):
+        if not result.get('file_id'):
+            metrics.IMAGE_BYTES.inc(result['platform'], 'uploaded', amount=len(result['image_bytes']))
+            remember_file_id(sent_message, result)
+    logger.info(f"Sent {len(results)} product images as an album.")
+
+async def read_screenshot(photo, context):
+    """OCR a photo, reusing earlier results for the same image.
+
+    Only non-empty text is cached, so a failed or blank OCR run is retried
+    next time instead of being served for cache_ttl.
+    """
+    # Re-forwarded photos keep their file_unique_id, so no download is needed
+    file_key = f"file:{photo.file_unique_id}" if getattr(photo, 'file_unique_id', None) else None
+    text = ocr_cache.get(file_key) if file_key else None
+    cached = text is not None
+    if text is None:
+        file = await context.bot.get_file(photo.file_id)
+        image_bytes = bytes(await file.download_as_bytearray())
+        # Exact bytes only: a perceptual hash cannot tell two URLs in the address bar apart
+        hash_key = f"sha256:{hashlib.sha256(image_bytes).hexdigest()}"
+        text = ocr_cache.get(hash_key)
+        cached = text is not None
+        if text is None:
+            with metrics.timer('ocr'):
+                text = await workers.run_ocr(extract_text_from_image, image_bytes)
+            if text:
+                ocr_cache.set(hash_key, text)
+        if file_key and text:
+            ocr_cache.set(file_key, text)
+    metrics.CACHE_LOOKUPS.inc('ocr', "", 'hit' if cached else 'miss')
+    return text
+
+def remember_file_id(message, result):
+    """Store the file_id Telegram assigned to an uploaded photo."""
+    photo = getattr(message, 'photo', None)
+    if photo:
+        # Sizes are ordered small to large; the largest is the one we uploaded
+        file_id_cache.set(photo[-1].file_id, url=result.get('image_url'), digest=result.get('image_digest'))
 
 async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     start_time = time.time()
@@ -818,19 +724,18 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if photo and not urls:
         logger.info("No URL found, attempting OCR...")
         try:
-            file = await context.bot.get_file(photo.file_id)
-            image_bytes = await file.download_as_bytearray()
-            ocr_title = extract_text_from_image(bytes(image_bytes))
+            ocr_title = await read_screenshot(photo, context)
             if ocr_title:
                  # Try to find a URL in the OCR text
-                ocr_urls = re.findall(r'https?://[^\s]+', ocr_title)
+                ocr_urls = ocr.find_urls(ocr_title, LINK_DOMAINS)
                 urls.extend(ocr_urls)
                 logger.info(f"Found URLs via OCR: {ocr_urls}")
                 # If OCR text is substantial and no URL found, send it back
                 if not ocr_urls and len(ocr_title) > 50:
-                     await update.message.reply_text(f"📄 OCR Extracted:\n{ocr_title[:300]}...")
+                     await reply(update, lambda: update.message.reply_text(f"📄 OCR Extracted:\n{ocr_title[:300]}..."))
         except Exception as e:
             logger.error(f"Error during OCR processing: {e}")
+            metrics.ERRORS.inc('ocr', "")
     
     # --- Main Processing Loop for URLs ---
     if not urls:
@@ -838,484 +743,161 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
         # The OCR text (if any) was already sent above
         return # Exit the handler
 
-    for url in urls:
-        logger.info(f"Processing URL: {url}")
-        clean_url_str = clean_url(url)
-        
-        if not is_supported(clean_url_str):
-            await update.message.reply_text("❌ Unsupported or invalid product link.")
-            continue
-
-        platform = get_platform(clean_url_str)
-        data = scrape_product(clean_url_str, platform)
-
-        if not data:
-            await update.message.reply_text("❌ Unable to extract product info.")
-            continue
-
-        formatted_text = format_output(data, pin_code)
-        
-        # --- Handle Image Sending ---
-        media_sent = False
-        if data.get('image_url'):
-            try:
-                img_response = requests.get(data['image_url'], timeout=10)
-                img_response.raise_for_status()
-                image_bytes = img_response.content
-                # Validate it's an image by trying to open it
-                img = Image.open(io.BytesIO(image_bytes))
-                # Send image with caption
-                await update.message.reply_photo(photo=io.BytesIO(image_bytes), caption=formatted_text)
-                media_sent = True
-                logger.info("Product image sent successfully.")
-            except Exception as e:
-                logger.warning(f"Failed to send image from URL: {e}")
-        
-        # Fallback: Send text only if image failed or wasn't found
-        if not media_sent:
-            await update.message.reply_text(formatted_text)
-            logger.info("Sent product info as text.")
-
-    logger.info(f"Processed message in {time.time() - start_time:.2f} seconds.")
+    # Run the per-URL pipelines concurrently, but reply in the original order
+    slots = asyncio.Semaphore(PERFORMANCE['max_workers'])
+    tasks = [asyncio.create_task(process_url(url, pin_code, slots)) for url in urls]
+
+    # Deliver whatever is ready by the response target first, then the stragglers
+    remaining = max(0.0, start_time + PERFORMANCE['response_target'] - time.time())
+    await asyncio.wait(tasks, timeout=remaining)
+    ready = [task for task in tasks if task.done()]
+    late = [task for task in tasks if not task.done()]
+    await send_results(update, [task.result() for task in ready])
+    if late:
+        logger.info(f"{len(late)} of {len(tasks)} URLs missed the {PERFORMANCE['response_target']}s target.")
+        # Each straggler goes out as soon as it finishes; ones finishing together share an album
+        deadline = start_time + PERFORMANCE['url_timeout']
+        pending = set(late)
+        while pending:
+            done, pending = await asyncio.wait(pending, timeout=max(0.0, deadline - time.time()),
+                                               return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                break
+            await send_results(update, [task.result() for task in late if task in done])
+        for task in pending:
+            task.cancel()
+        if pending:
+            await send_results(update, [
+                {'text': "⏱ Timed out while fetching product info.", 'image_bytes': None} for _ in pending
+            ])
+
+    elapsed = time.time() - start_time
+    record_message(elapsed)
+    logger.info(f"Processed message in {elapsed:.2f} seconds.")
+
+def record_message(elapsed):
+    """Count the message against response_target and log a summary every monitor_interval messages."""
+    metrics.MESSAGES.inc()
+    metrics.MESSAGE_SECONDS.observe(elapsed)
+    if elapsed > PERFORMANCE['response_target']:
+        metrics.SLO_MISSES.inc()
+    if metrics.MESSAGES.total() % PERFORMANCE['monitor_interval'] == 0:
+        logger.info(f"Performance: {metrics.summary()}")
 
 # ========================
 # MAIN
 # ========================
 
-def main():
-    if not BOT_TOKEN or BOT_TOKEN == "YOUR_BOT_TOKEN_HERE":
-        logger.critical("BOT_TOKEN is not set in the code. Please update main.py with your actual token.")
-        return
-
-    logger.info("Starting ReviewCheckk Bot...")
-    try:
-        app = Application.builder().token(BOT_TOKEN).concurrent_updates(True).build()
-        
-        # Register handlers
-        app.add_handler(CommandHandler("start", start))
-        app.add_handler(CommandHandler("advancing", mode_command))
-        app.add_handler(CommandHandler("off_advancing", mode_command))
-        app.add_handler(CommandHandler("img", img_command))
-        app.add_handler(MessageHandler(filters.TEXT | filters.CAPTION | filters.PHOTO, handle_message))
-        
-        logger.info("Bot handlers registered. Starting polling...")
-        app.run_polling(drop_pending_updates=True)
-    except Exception as e:
-        logger.critical(f"Failed to start bot: {e}", exc_info=True)
-
-if __name__ == "__main__":
-    main()    """Rules 23-31: Clean title according to strict formatting rules."""
-    logger.debug(f"Cleaning title: '{title}' for platform: {platform}")
-    if not title:
-        return "Product"
-    title = title.encode('ascii', 'ignore').decode('unicode_escape').strip()
-    title = re.sub(r'\\[uU][0-9a-fA-F]{4}', '', title) # Remove unicode escapes
-    title = re.sub(r'[^\w\s\-\'\.]', ' ', title) # Keep alphanum, space, -, ', .
-    title = re.sub(r'\s+', ' ', title).strip() # Collapse spaces
-    
-    words = title.split()
-    if not words:
-        return "Product"
-    
-    # Rule 24: First word must be brand (assume first word is brand for now)
-    brand = words[0].title()
-    rest_title = ' '.join(words[1:8]) # Rule 28: 5-8 words max
-
-    # Rule 29: Clothing must include gender
-    is_clothing = any(kw in url.lower() for kw in ['men', 'women', 'kids', 'shirt', 't-shirt', 'jeans', 'kurti', 'saree', 'dress'])
-    gender = ""
-    if is_clothing:
-        if re.search(r'\b(women|ladies|female|girl)\b', title, re.IGNORECASE):
-            gender = "Women"
-        elif re.search(r'\b(men|gentlemen|male|boy)\b', title, re.IGNORECASE):
-            gender = "Men"
-        elif re.search(r'\b(kids|children|baby)\b', title, re.IGNORECASE):
-            gender = "Kids"
-        else:
-            gender = "Unisex" # Default if not found
-
-    # Rule 30: Quantity like Pack of 2, 300ml, 1 Piece
-    quantity = ""
-    qty_match = re.search(r'\b(\d+)\s*(?:piece|pcs|ml|gm|kg|ltr|pack|set)\b', title, re.IGNORECASE)
-    if qty_match:
-        unit = qty_match.group(0).split()[-1]
-        quantity = f"{qty_match.group(1)} {unit.title()}"
-
-    # Rebuild title
-    if is_clothing:
-        # [Brand] [Gender] [Quantity] [Product Name]
-        parts = [part for part in [brand, gender, quantity, rest_title] if part]
-        return " ".join(parts)
-    else:
-        # [Brand] [Product Title] from @[price] rs
-        # Price will be added later
-        parts = [part for part in [brand, quantity, rest_title] if part]
-        return " ".join(parts)
-
-def parse_price(price_str):
-    """Rules 32-39: Parse price string to numeric value."""
-    logger.debug(f"Parsing price: '{price_str}'")
-    if not price_str:
-        return "Price unavailable"
-    # Extract numeric value
-    price_value = re.sub(r'[^\d.]', '', price_str)
-    if not price_value:
-        return "Price unavailable"
-    try:
-        return f"{float(price_value):.0f}"
-    except ValueError:
-        return "Price unavailable"
-
-def extract_text_from_image(image_bytes):
-    """OCR Fallback for title extraction."""
-    logger.info("Performing OCR on image...")
-    try:
-        image = Image.open(io.BytesIO(image_bytes))
-        # Convert to grayscale for better OCR
-        grayscale_image = image.convert('L')
-        text = pytesseract.image_to_string(grayscale_image)
-        logger.debug(f"OCR extracted text: {text[:100]}...")
-        return text.strip()
-    except Exception as e:
-        logger.error(f"OCR failed: {e}")
-        return ""
+def register_gauges():
+    """Expose cache and worker pool state on the metrics endpoint."""
+    metrics.register_gauge('reviewcheckk_product_cache_entries', "Entries in the product cache.", lambda: len(product_cache))
+    metrics.register_gauge('reviewcheckk_product_cache_hit_rate', "Product cache hit rate.", lambda: product_cache.stats()['hit_rate'])
+    metrics.register_gauge('reviewcheckk_scrapes_in_flight', "Scrapes currently running.", product_flight.in_flight)
+    metrics.register_gauge('reviewcheckk_cpu_jobs_in_flight', "Jobs running in the CPU pool.", lambda: workers.cpu_pool.stats()['in_flight'])
+    metrics.register_gauge('reviewcheckk_cpu_jobs_waiting', "Jobs waiting for a CPU pool slot.", lambda: workers.cpu_pool.stats()['waiting'])
+    metrics.register_gauge('reviewcheckk_ocr_jobs_in_flight', "Screenshots being OCR'd.", lambda: workers.ocr_pool.stats()['in_flight'])
+    metrics.register_gauge('reviewcheckk_ocr_jobs_waiting', "Screenshots waiting for an OCR worker.", lambda: workers.ocr_pool.stats()['waiting'])
+    metrics.register_gauge('reviewcheckk_ocr_wait_ms_avg', "Mean time screenshots waited for an OCR worker.", lambda: workers.ocr_pool.stats()['avg_wait_ms'])
+    metrics.register_gauge('reviewcheckk_ocr_run_ms_avg', "Mean OCR time per screenshot in the worker.", lambda: workers.ocr_pool.stats()['avg_run_ms'])
+    metrics.register_gauge(
+        'reviewcheckk_host_concurrency_limit', "Current adaptive concurrency limit per host.",
+        lambda: {(host, ): s['limit'] for host, s in http_client.limiter_stats().items()}, labels=('host',)
+    )
+    metrics.register_gauge(
+        'reviewcheckk_host_requests_waiting', "Requests queued for a host's rate limiter.",
+        lambda: {(host, ): s['waiting'] for host, s in http_client.limiter_stats().items()}, labels=('host',)
+    )
+    metrics.register_gauge(
+        'reviewcheckk_send_queue_depth', "Replies waiting in the outbound send queue.",
+        lambda: {(kind, ): n for kind, n in send_queue.stats()['queued'].items()}, labels=('kind',)
+    )
+    metrics.register_gauge('reviewcheckk_send_chats_active', "Chats with an active send lane.", lambda: send_queue.stats()['chats'])
 
-# ========================
-# SCRAPER FUNCTIONS
-# ========================
+async def post_init(app: Application):
+    """Start the metrics endpoint on the bot's event loop."""
+    if METRICS_ENDPOINT['enabled']:
+        register_gauges()
+        try:
+            await metrics.start_server(METRICS_ENDPOINT['host'], METRICS_ENDPOINT['port'])
+        except OSError as e:
+            logger.error(f"Metrics endpoint unavailable: {e}")
+
+async def post_shutdown(app: Application):
+    """Release pooled HTTP connections and local stores when the bot stops."""
+    await metrics.close_server()
+    await send_queue.close()
+    await http_client.close_client()
+    shortlink_cache.close()
+    file_id_cache.close()
+    http_cache.close()
+    workers.shutdown()
+
+async def serve_webhook(app: Application):
+    """Run the bot behind the embedded webhook server until SIGINT/SIGTERM, then drain."""
+    # aiohttp is only needed in webhook mode
+    import webhook
+
+    server = webhook.WebhookServer(
+        app, WEBHOOK['listen'], WEBHOOK['port'], WEBHOOK['path'], WEBHOOK['secret_token'],
+        workers=WEBHOOK['workers'], queue_size=WEBHOOK['queue_size'], enqueue_timeout=WEBHOOK['enqueue_timeout']
+    )
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
 
-def scrape_product(url, platform):
-    """Scrape product details using requests and BeautifulSoup."""
-    logger.info(f"Scraping {platform} product: {url}")
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (iPhone; CPU iPhone OS 15_0 like Mac OS X) AppleWebKit/605.1.15'
-    }
+    await app.initialize()
+    await post_init(app)
     try:
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.content, 'html.parser')
-    except Exception as e:
-        logger.error(f"Failed to fetch page for {url}: {e}")
-        return None
-
-    title, price, image_url = "Product", "Price unavailable", None
-
-    # --- Platform Specific Scraping ---
-    if platform == "myntra":
-        title_elem = soup.find('h1', class_='pdp-title')
-        name_elem = soup.find('h1', class_='pdp-name')
-        price_elem = soup.find('span', class_='pdp-price')
-        image_elem = soup.find('div', class_='image-grid-image') # Main image container
-        
-        title = f"{name_elem.get_text(strip=True)} {title_elem.get_text(strip=True)}" if name_elem and title_elem else "Myntra Product"
-        price = price_elem.get_text(strip=True) if price_elem else "Price unavailable"
-        if image_elem and image_elem.get('style'):
-             # Extract URL from style: background-image: url('...')
-             style = image_elem['style']
-             match = re.search(r"url\(['\"]?(.*?)['\"]?\)", style)
-             image_url = match.group(1) if match else None
-
-    elif platform == "meesho":
-        title_elem = soup.find('h1', class_='Text__StyledText-sc-1h1ca1g-0') # Check actual class
-        if not title_elem: title_elem = soup.find('h1') # Fallback
-        price_elem = soup.find('span', {'data-testid': 'price'}) # Check actual data-testid
-        if not price_elem: price_elem = soup.find('span', string=re.compile(r'₹')) # Fallback
-        
-        title = title_elem.get_text(strip=True) if title_elem else "Meesho Product"
-        price = price_elem.get_text(strip=True) if price_elem else "Price unavailable"
-        # Image is harder without JS, skip for now or use a generic selector
-        img_elem = soup.find('img', {'alt': lambda x: x and 'product' in x.lower()})
-        image_url = img_elem.get('src') if img_elem else None
-
-    elif platform == "amazon":
-        title_elem = soup.find('span', {'id': 'productTitle'})
-        price_whole = soup.find('span', {'class': 'a-price-whole'})
-        price_symbol = soup.find('span', {'class': 'a-price-symbol'})
-        price = f"{price_symbol.get_text(strip=True) if price_symbol else ''}{price_whole.get_text(strip=True) if price_whole else ''}"
-        title = title_elem.get_text(strip=True) if title_elem else "Amazon Product"
-        img_elem = soup.find('img', {'id': 'landingImage'})
-        image_url = img_elem.get('src') if img_elem else None
-
-    elif platform == "flipkart":
-         # Flipkart often uses dynamic class names, this is a rough attempt
-        title_elem = soup.find('span', {'class': 'VU-ZEz'}) # Product title class
-        price_elem = soup.find('div', {'class': 'Nx9bqj'}) # Price class
-        title = title_elem.get_text(strip=True) if title_elem else "Flipkart Product"
-        price = price_elem.get_text(strip=True) if price_elem else "Price unavailable"
-        img_elem = soup.find('img', {'class': '_2r_T1I'}) # Main image class
-        image_url = img_elem.get('src') if img_elem else None
-
-    else: # Generic fallback
-        title_elem = soup.find('title') or soup.find('h1')
-        title = title_elem.get_text(strip=True) if title_elem else "Product"
-        # Generic price search
-        price_elem = soup.find(string=re.compile(r'₹|Rs\.|Price'))
-        if price_elem:
-            price_match = re.search(r'[\d,]+\.?\d*', price_elem)
-            price = price_match.group() if price_match else "Price unavailable"
+        await app.start()
+        await server.start()
+        if WEBHOOK['url']:
+            await app.bot.set_webhook(
+                url=WEBHOOK['url'],
+                secret_token=WEBHOOK['secret_token'] or None,
+                max_connections=WEBHOOK['max_connections'],
+                allowed_updates=Update.ALL_TYPES,
+                drop_pending_updates=UPDATES['drop_pending_updates']
+            )
+            logger.info(f"Webhook registered at {WEBHOOK['url']}")
         else:
-            price = "Price unavailable"
+            logger.warning("WEBHOOK['url'] is empty; not registering with Telegram (local testing).")
+        await stop.wait()
+        logger.info("Shutdown requested, draining updates...")
+        # The webhook stays registered, so Telegram keeps new updates until we are back
+        await server.drain(WEBHOOK['drain_timeout'])
+    finally:
+        if app.running:
+            await app.stop()
+        await app.shutdown()
+        await post_shutdown(app)
 
-    # Clean and finalize
-    clean_title_str = clean_title(title, platform, url)
-    clean_price = parse_price(price)
-
-    return {
-        'platform': platform,
-        'title': clean_title_str,
-        'price': clean_price,
-        'url': url,
-        'image_url': image_url
-    }
-
-# ========================
-# FORMATTING
-# ========================
-
-def format_output(data, pin=PIN_DEFAULT):
-    """Rules 40-50, 81-85: Format output according to platform-specific rules."""
-    platform = data['platform']
-    title = data['title']
-    price = data['price']
-    url = data['url']
-
-    # Rule 51: Common footer
-    footer = "\n@reviewcheckk"
-
-    if platform == 'meesho':
-        # Rule 41: Meesho format
-        formatted = f"{title} @{price} rs\n{url}"
-        # Rule 45: Add pin code
-        formatted += f"\nPin - {pin}"
-        return formatted + footer
-
-    elif 'clothing' in title.lower() or platform in ['myntra', 'meesho']: # Heuristic for clothing
-        # Rule 42: Clothing format (non-Meesho)
-        formatted = f"{title} @{price} rs\n{url}"
-        return formatted + footer
-
-    else:
-        # Rule 43: Non-clothing format
-        formatted = f"{title} from @{price} rs\n{url}"
-        return formatted + footer
-
-# ========================
-# COMMAND HANDLERS
-# ========================
-
-async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    await update.message.reply_text(
-        f"🚀 {BOT_USERNAME} Ready!\n"
-        "Send product links from Amazon, Flipkart, Meesho, Myntra, Ajio, Snapdeal.\n"
-        "Commands: /advancing, /off_advancing, /img"
-    )
-
-async def mode_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    command = update.message.text.strip()
-    if command == "/advancing":
-        # In a real bot, you'd set a flag. Here we just acknowledge.
-        await update.message.reply_text("✅ Advanced Mode ON (Simulated)")
-    elif command == "/off_advancing":
-        await update.message.reply_text("✅ Advanced Mode OFF (Simulated)")
-
-async def img_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    await update.message.reply_text("🔄 Regenerating image... (Simulated)")
-
-# ========================
-# MESSAGE HANDLER
-# ========================
-
-async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    start_time = time.time()
-    text = update.message.text or update.message.caption or ""
-    photo = update.message.photo[-1] if update.message.photo else None # Get largest photo
-    
-    urls = re.findall(r'https?://[^\s]+', text)
-    pin_code = PIN_DEFAULT
-    pin_match = re.search(r'(?:pin|code)\s*[:\-]?\s*(\d{6})', text, re.IGNORECASE)
-    if pin_match:
-        pin_code = pin_match.group(1)
-
-    # --- Handle OCR Fallback ---
-    ocr_title = ""
-    if photo and not urls:
-        logger.info("No URL found, attempting OCR...")
-        try:
-            file = await context.bot.get_file(photo.file_id)
-            image_bytes = await file.download_as_bytearray()
-            ocr_title = extract_text_from_image(bytes(image_bytes))
-            if ocr_title:
-                 # Try to find a URL in the OCR text
-                ocr_urls = re.findall(r'https?://[^\s]+', ocr_title)
-                urls.extend(ocr_urls)
-                logger.info(f"Found URLs via OCR: {ocr_urls}")
-        except Exception as e:
-            logger.error(f"Error during OCR processing: {e}")
-    
-    if not urls:
-        if ocr_title:
-            await update.message.reply_text(f"OCR Extracted Text:\n{ocr_title[:200]}...\n(No valid product link found)")
-        # else: # Optional: Ignore messages with no links/usable content
-        #     pass
+def main():
+    if not BOT_TOKEN or BOT_TOKEN == "YOUR_BOT_TOKEN_HERE":
+        logger.critical("BOT_TOKEN is not set in the code. Please update main.py with your actual token.")
         return
 
-    for url in urls:
-        logger.info(f"Processing URL: {url}")
-        clean_url_str = clean_url(url)
-        
-        if not is_supported(clean_url_str):
-            await update.message.reply_text("❌ Unsupported or invalid product link.")
-            continue
-
-        platform = get_platform(clean_url_str)
-        data = scrape_product(clean_url_str, platform)
-
-        if not data:
-            await update.message.reply_text("❌ Unable to extract product info.")
-            continue
-
-        formatted_text = format_output(data, pin_code)
-        
-        # --- Handle Image Sending ---
-        media_group = []
-        if data.get('image_url'):
-            try:
-                img_response = requests.get(data['image_url'], timeout=10)
-                img_response.raise_for_status()
-                image_bytes = img_response.content
-                # Validate it's an image
-                img = Image.open(io.BytesIO(image_bytes))
-                # Send image with caption
-                await update.message.reply_photo(photo=io.BytesIO(image_bytes), caption=formatted_text)
-                continue # Skip sending text separately
-            except Exception as e:
-                logger.warning(f"Failed to send image from URL: {e}")
-        
-        # Fallback: Send text only
-        await update.message.reply_text(formatted_text)
-
-    logger.info(f"Processed message in {time.time() - start_time:.2f} seconds.")
-
-# ========================
-# MAIN
-# ========================
-
-def main():
     logger.info("Starting ReviewCheckk Bot...")
     try:
-        app = Application.builder().token(BOT_TOKEN).concurrent_updates(True).build()
+        workers.start()
+        app = Application.builder().token(BOT_TOKEN).concurrent_updates(True).post_init(post_init).post_shutdown(post_shutdown).build()
         
         # Register handlers
         app.add_handler(CommandHandler("start", start))
         app.add_handler(CommandHandler("advancing", mode_command))
         app.add_handler(CommandHandler("off_advancing", mode_command))
         app.add_handler(CommandHandler("img", img_command))
+        app.add_handler(CommandHandler("cache", cache_command))
         app.add_handler(MessageHandler(filters.TEXT | filters.CAPTION | filters.PHOTO, handle_message))
         
-        logger.info("Bot handlers registered. Starting polling...")
-        app.run_polling(drop_pending_updates=True)
-    except Exception as e:
-        logger.critical(f"Failed to start bot: {e}", exc_info=True)
-
-if __name__ == "__main__":
-    main()    
-    
-        # If there's a caption, try to extract product info
-        if caption:
-            # Simple title extraction from caption
-            title = caption.split('\n')[0][:100]  # First line, max 100 chars
-            
-            # Create a basic response
-            response = f"{title}\n[Image-based product]\n\n@reviewcheckk"
-            
-            # Send the same image back with formatted caption
-            await update.message.reply_photo(
-                photo=photo.file_id,
-                caption=response
-            )
-    except Exception as e:
-        logger.error(f"Error handling image: {e}")
-
-def extract_urls(text):
-    """Extract all URLs from text"""
-    if not text:
-        return []
-    
-    # URL regex pattern
-    url_pattern = r'https?://(?:[-\w.])+(?:[:\d]+)?(?:/(?:[\w/_.])*(?:\?(?:[\w&=%.])*)?(?:#(?:[\w.])*)?)?'
-    urls = re.findall(url_pattern, text)
-    return urls
-
-def format_product_post(product_data):
-    """Format product data according to requirements"""
-    try:
-        platform = product_data.get('platform', 'unknown')
-        title = product_data.get('title', 'Product Title')
-        price = product_data.get('price', '0')
-        url = product_data.get('url', '')
-        pin = product_data.get('pin', '110001')
-        gender = product_data.get('gender', '')
-        quantity = product_data.get('quantity', '')
-        sizes = product_data.get('sizes', '')
-        
-        # Clean and format title
-        clean_title = title.strip()
-        
-        # Platform-specific formatting
-        if platform == 'meesho':
-            # [Gender] [Quantity] [Clean Title] @[price] rs
-            formatted_title = f"{gender} {quantity} {clean_title}".strip()
-            formatted_title = f"{formatted_title} @{price} rs"
-            
-            response = f"{formatted_title}\n{url}\n\n"
-            
-            # Add sizes if available
-            if sizes:
-                response += f"Size - {sizes}\n"
-            else:
-                response += "Size - All\n"
-            
-            # Add pin
-            response += f"Pin - {pin}\n\n@reviewcheckk"
-            
+        if UPDATES['mode'] == 'webhook':
+            logger.info("Bot handlers registered. Starting webhook server...")
+            asyncio.run(serve_webhook(app))
         else:
-            # For other platforms: [Brand] [Clean Title] from @[price] rs
-            # For clothing: [Gender] [Quantity] [Clean Title] @[price] rs
-            if gender or quantity:
-                formatted_title = f"{gender} {quantity} {clean_title}".strip()
-                formatted_title = f"{formatted_title} @{price} rs"
-            else:
-                # Assume brand is first word for non-clothing
-                words = clean_title.split()
-                if len(words) > 1:
-                    brand = words[0]
-                    rest_title = ' '.join(words[1:])
-                    formatted_title = f"{brand} {rest_title} from @{price} rs"
-                else:
-                    formatted_title = f"{clean_title} from @{price} rs"
-            
-            response = f"{formatted_title}\n{url}\n\n@reviewcheckk"
-        
-        return response.strip()
+            logger.info("Bot handlers registered. Starting polling...")
+            app.run_polling(drop_pending_updates=UPDATES['drop_pending_updates'])
     except Exception as e:
-        logger.error(f"Error formatting post: {e}")
-        return "❌ Unable to extract product info."
-
-async def main():
-    """Main function to start the bot"""
-    # Create application
-    application = Application.builder().token(BOT_TOKEN).build()
-    
-    # Add handlers
-    application.add_handler(CommandHandler("start", start))
-    application.add_handler(MessageHandler(
-        filters.TEXT | filters.PHOTO | filters.CAPTION,
-        process_message
-    ))
-    
-    # Start the bot
-    logger.info("Starting bot...")
-    await application.run_polling()
+        logger.critical(f"Failed to start bot: {e}", exc_info=True)
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    main()
@@ -0,0 +1,215 @@
+# metrics.py - Latency histograms, counters and the /metrics endpoint
+
+"""
+In-process instrumentation for the bot's pipeline.
+Histograms and counters are kept per label set and rendered in the
+Prometheus text exposition format, served by a small asyncio HTTP endpoint
+on the bot's own event loop. summary() condenses the same data into one
+log line for the periodic performance report.
+"""
+
+import time
+import asyncio
+import logging
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Seconds; spans cache hits (sub-ms) up to the per-message hard cap
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0)
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _label_text(names, values):
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+class Counter:
+    """Monotonic counter with optional labels."""
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+
+    def inc(self, *labels, amount=1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def total(self):
+        return sum(self._values.values())
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_label_text(self.labels, labels)} {value}")
+        return lines
+
+class Histogram:
+    """Cumulative-bucket latency histogram with optional labels."""
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}  # labels -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, seconds, *labels):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        for i, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                series[i] += 1
+        series[-2] += 1
+        series[-1] += seconds
+
+    def quantile(self, q, *labels):
+        """Upper bound of the bucket holding the q-th observation (None if empty)."""
+        series = self._series.get(labels)
+        if not series or not series[-2]:
+            return None
+        rank = q * series[-2]
+        for i, bound in enumerate(self.buckets):
+            if series[i] >= rank:
+                return bound
+        return float('inf')
+
+    def series(self):
+        return list(self._series)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, series in sorted(self._series.items()):
+            for bound, count in zip(self.buckets, series):
+                lines.append(f"{self.name}_bucket{_label_text(self.labels + ('le',), labels + (bound,))} {count}")
+            lines.append(f"{self.name}_bucket{_label_text(self.labels + ('le',), labels + ('+Inf',))} {series[-2]}")
+            lines.append(f"{self.name}_sum{_label_text(self.labels, labels)} {series[-1]:.6f}")
+            lines.append(f"{self.name}_count{_label_text(self.labels, labels)} {series[-2]}")
+        return lines
+
+# ========================
+# BOT METRICS
+# ========================
+
+STAGE_SECONDS = Histogram(
+    'reviewcheckk_stage_seconds', "Latency of each pipeline stage.", ('stage', 'platform')
+)
+MESSAGE_SECONDS = Histogram(
+    'reviewcheckk_message_seconds', "End-to-end handling time per message."
+)
+MESSAGES = Counter('reviewcheckk_messages_total', "Messages handled.")
+URLS = Counter('reviewcheckk_urls_total', "Product links processed, by outcome.", ('platform', 'outcome'))
+CACHE_LOOKUPS = Counter('reviewcheckk_cache_lookups_total', "Cache lookups by result.", ('cache', 'platform', 'result'))
+ERRORS = Counter('reviewcheckk_errors_total', "Failures per stage.", ('stage', 'platform'))
+SLO_MISSES = Counter('reviewcheckk_slo_misses_total', "Messages whose total handling time exceeded response_target.")
+HOST_WAIT_SECONDS = Histogram('reviewcheckk_host_wait_seconds', "Time requests queued for a host's rate limiter.", ('host',))
+HTTP_RETRIES = Counter('reviewcheckk_http_retries_total', "Outbound requests retried, by host and reason.", ('host', 'reason'))
+HTTP_BODY_BYTES = Counter(
+    'reviewcheckk_http_body_bytes_total', "Response body bytes on the wire and after content decoding.",
+    ('platform', 'encoding', 'stage')
+)
+SEND_WAIT_SECONDS = Histogram('reviewcheckk_send_wait_seconds', "Time replies waited in the outbound send queue.", ('kind',))
+FLOOD_WAITS = Counter('reviewcheckk_flood_waits_total', "RetryAfter (flood control) responses from Telegram.", ('kind',))
+IMAGE_BYTES = Counter('reviewcheckk_image_bytes_total', "Product image bytes downloaded and uploaded.", ('platform', 'direction'))
+
+METRICS = [STAGE_SECONDS, MESSAGE_SECONDS, MESSAGES, URLS, CACHE_LOOKUPS, ERRORS, SLO_MISSES, HOST_WAIT_SECONDS, HTTP_RETRIES, HTTP_BODY_BYTES, SEND_WAIT_SECONDS, FLOOD_WAITS, IMAGE_BYTES]
+_gauges = []  # (name, help, labels, callable)
+
+def register_gauge(name, help, func, labels=()):
+    """Expose a value read at scrape time (queue depths, cache sizes).
+
+    With `labels`, `func` returns {label values tuple: number} instead of a number.
+    """
+    _gauges.append((name, help, tuple(labels), func))
+
+def observe(stage, seconds, platform=""):
+    STAGE_SECONDS.observe(seconds, stage, platform)
+
+@contextmanager
+def timer(stage, platform=""):
+    """Record the duration of the with-block as one `stage` observation."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - started, stage, platform)
+
+def render():
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    for name, help, labels, func in _gauges:
+        try:
+            value = func()
+        except Exception as e:
+            logger.debug(f"Gauge {name} failed: {e}")
+            continue
+        lines.extend([f"# HELP {name} {help}", f"# TYPE {name} gauge"])
+        if labels:
+            lines.extend(f"{name}{_label_text(labels, key)} {v}" for key, v in sorted(value.items()))
+        else:
+            lines.append(f"{name} {value}")
+    return "\n".join(lines) + "\n"
+
+def summary():
+    """One-line digest: message count, SLO misses and p95 per stage (all platforms)."""
+    stages = {}
+    for stage, platform in STAGE_SECONDS.series():
+        stages.setdefault(stage, []).append(platform)
+    parts = []
+    for stage in sorted(stages):
+        # Bucket bounds are coarse, so report the worst platform's p95
+        p95 = max(STAGE_SECONDS.quantile(0.95, stage, p) for p in stages[stage])
+        parts.append(f"{stage}≤{p95:g}s")
+    messages = MESSAGES.total()
+    misses = SLO_MISSES.total()
+    return (
+        f"{messages} messages, {misses} over response target ({misses / messages:.0%}), "
+        f"message p95≤{MESSAGE_SECONDS.quantile(0.95) or 0:g}s, errors {ERRORS.total()} | "
+        f"stage p95: {', '.join(parts) or 'none'}"
+    ) if messages else "no messages yet"
+
+# ========================
+# HTTP ENDPOINT
+# ========================
+
+_server = None
+
+async def _handle_request(reader, writer):
+    try:
+        request_line = await asyncio.wait_for(reader.readline(), timeout=5)
+        while (await asyncio.wait_for(reader.readline(), timeout=5)) not in (b"\r\n", b"\n", b""):
+            pass  # Headers are not needed
+        parts = request_line.decode('latin-1').split()
+        if len(parts) >= 2 and parts[0] == 'GET' and parts[1].split('?')[0] == '/metrics':
+            status, body = "200 OK", render().encode('utf-8')
+        else:
+            status, body = "404 Not Found", b"not found\n"
+        writer.write(
+            f"HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode('latin-1') + body
+        )
+        await writer.drain()
+    except (asyncio.TimeoutError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+async def start_server(host, port):
+    """Serve GET /metrics on host:port from the running event loop."""
+    global _server
+    _server = await asyncio.start_server(_handle_request, host, port)
+    logger.info(f"Metrics endpoint listening on http://{host}:{port}/metrics")
+
+async def close_server():
+    global _server
+    if _server is not None:
+        _server.close()
+        await _server.wait_closed()
+        logger.info("Metrics endpoint stopped.")
+    _server = None
@@ -0,0 +1,188 @@
+# ocr.py - Screenshot OCR
+
+"""
+Fast path for reading product links out of screenshots.
+Images are decoded at reduced scale, binarized, and the strips where mobile
+browsers show the address bar are read first with a URL-only character
+set; the whole page is OCR'd only when no link turns up there. Lines whose
+mean word confidence is below OCR_CONFIDENCE are dropped.
+With tesserocr installed, each OCR worker process keeps one Tesseract API
+instance (model loaded once) and images are handed over in memory; without
+it, pytesseract is used, which runs the tesseract binary per call.
+"""
+
+import io
+import re
+import logging
+
+import pytesseract
+from PIL import Image, ImageOps
+
+try:
+    import tesserocr
+    TESSEROCR_AVAILABLE = True
+except ImportError:
+    tesserocr = None
+    TESSEROCR_AVAILABLE = False
+
+from config import OCR, OCR_CONFIDENCE
+
+logger = logging.getLogger(__name__)
+
+URL_CHARS = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789:/.?=&-_%#~+"
+# LSTM engine; one uniform block of text; only characters that occur in URLs
+URL_CONFIG = f"--oem 1 --psm 6 -c tessedit_char_whitelist={URL_CHARS}"
+PAGE_CONFIG = "--oem 1 --psm 3"
+
+_api = None  # Per-process tesserocr.PyTessBaseAPI
+
+_URL_RE = re.compile(r'https?://[^\s]+')
+# Scheme-less links as browsers display them (amazon.in/dp/..., fkrt.cc/x)
+_BARE_LINK_RE = re.compile(r'(?<![\w./@-])((?:[a-z0-9-]+\.)+[a-z]{2,}(?:/[^\s]*)?)', re.I)
+
+# ========================
+# PREPROCESSING
+# ========================
+
+def _otsu_threshold(gray):
+    """Global threshold maximising between-class variance of the histogram."""
+    histogram = gray.histogram()
+    total = sum(histogram)
+    weighted_total = sum(i * count for i, count in enumerate(histogram))
+    weight_bg = weighted_bg = 0
+    best_threshold, best_variance = 127, 0.0
+    for level, count in enumerate(histogram):
+        weight_bg += count
+        if weight_bg == 0:
+            continue
+        weight_fg = total - weight_bg
+        if weight_fg == 0:
+            break
+        weighted_bg += level * count
+        mean_bg = weighted_bg / weight_bg
+        mean_fg = (weighted_total - weighted_bg) / weight_fg
+        variance = weight_bg * weight_fg * (mean_bg - mean_fg) ** 2
+        if variance > best_variance:
+            best_threshold, best_variance = level, variance
+    return best_threshold
+
+def preprocess(image):
+    """Grayscale, cap the long side at OCR['max_side'], binarize dark-on-light."""
+    gray = image.convert('L')
+    longest = max(gray.size)
+    if longest > OCR['max_side']:
+        scale = OCR['max_side'] / longest
+        gray = gray.resize((round(gray.width * scale), round(gray.height * scale)), Image.Resampling.BILINEAR)
+    gray = ImageOps.autocontrast(gray)
+    threshold = _otsu_threshold(gray)
+    binary = gray.point(lambda value: 255 if value > threshold else 0, mode='L')
+    # Dark mode screenshots: Tesseract expects dark text on a light background
+    if binary.histogram()[0] > binary.width * binary.height / 2:
+        binary = ImageOps.invert(binary)
+    return binary
+
+def address_bar_regions(image):
+    """Top and bottom strips, where mobile browsers draw the URL bar."""
+    height = round(image.height * OCR['address_bar_fraction'])
+    return [image.crop((0, 0, image.width, height)), image.crop((0, image.height - height, image.width, image.height))]
+
+# ========================
+# ENGINES
+# ========================
+
+def _get_api():
+    global _api, TESSEROCR_AVAILABLE
+    if _api is None:
+        try:
+            _api = tesserocr.PyTessBaseAPI(lang=OCR['lang'], oem=tesserocr.OEM.LSTM_ONLY)
+        except Exception:
+            # e.g. missing tessdata: don't retry on every image
+            TESSEROCR_AVAILABLE = False
+            raise
+        logger.info("Tesseract model loaded in OCR worker.")
+    return _api
+
+def warm_up():
+    """Pool initializer: load the Tesseract model once per OCR worker process."""
+    if TESSEROCR_AVAILABLE:
+        try:
+            _get_api()
+        except Exception as e:
+            logger.warning(f"tesserocr unavailable, falling back to pytesseract: {e}")
+
+def _api_lines(image, url_only):
+    """Lines of (word, confidence) from the persistent in-process API."""
+    api = _get_api()
+    api.SetPageSegMode(tesserocr.PSM.SINGLE_BLOCK if url_only else tesserocr.PSM.AUTO)
+    api.SetVariable('tessedit_char_whitelist', URL_CHARS if url_only else "")
+    api.SetImage(image)
+    api.Recognize()
+    lines = []
+    level = tesserocr.RIL.WORD
+    for word in tesserocr.iterate_level(api.GetIterator(), level):
+        text = word.GetUTF8Text(level)
+        if not text or not text.strip():
+            continue
+        if not lines or word.IsAtBeginningOf(tesserocr.RIL.TEXTLINE):
+            lines.append([])
+        lines[-1].append((text, word.Confidence(level)))
+    api.Clear()
+    return lines
+
+def _cli_lines(image, url_only):
+    """Lines of (word, confidence) via pytesseract (one tesseract process per call)."""
+    data = pytesseract.image_to_data(image, config=URL_CONFIG if url_only else PAGE_CONFIG, output_type=pytesseract.Output.DICT)
+    lines = {}
+    for i, word in enumerate(data['text']):
+        confidence = float(data['conf'][i])
+        if confidence < 0 or not word.strip():
+            continue
+        key = (data['block_num'][i], data['par_num'][i], data['line_num'][i])
+        lines.setdefault(key, []).append((word, confidence))
+    return [lines[key] for key in sorted(lines)]
+
+# ========================
+# RECOGNITION
+# ========================
+
+def _read(image, url_only):
+    """OCR one image, keeping lines whose mean word confidence passes OCR_CONFIDENCE."""
+    lines = None
+    if TESSEROCR_AVAILABLE:
+        try:
+            lines = _api_lines(image, url_only)
+        except Exception as e:
+            logger.warning(f"tesserocr failed, using pytesseract: {e}")
+    if lines is None:
+        lines = _cli_lines(image, url_only)
+    kept = []
+    for words in lines:
+        if sum(c for _, c in words) / len(words) >= OCR_CONFIDENCE * 100:
+            kept.append(" ".join(w for w, _ in words))
+        else:
+            logger.debug(f"Dropped low-confidence OCR line: {' '.join(w for w, _ in words)!r}")
+    return "\n".join(kept)
+
+def find_urls(text, domains=()):
+    """Links in OCR text: explicit http(s) URLs plus bare links on `domains`."""
+    urls = _URL_RE.findall(text)
+    for link in _BARE_LINK_RE.findall(text):
+        host = link.split('/', 1)[0].lower()
+        if any(host == d or host.endswith('.' + d) for d in domains):
+            url = f"https://{link}"
+            if url not in urls:
+                urls.append(url)
+    return urls
+
+def read_text(data, domains=()):
+    """Text of a screenshot, reading the address bar strips before the full page."""
+    with Image.open(io.BytesIO(data)) as image:
+        # JPEG: let the decoder downscale, nothing past max_side is needed
+        image.draft('L', (OCR['max_side'], OCR['max_side']))
+        page = preprocess(image)
+    for region in address_bar_regions(page):
+        text = _read(region, url_only=True)
+        if find_urls(text, domains):
+            logger.debug("Link found in address bar strip, skipping full-page OCR")
+            return text
+    return _read(page, url_only=False)
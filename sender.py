@@ -0,0 +1,179 @@
+# sender.py - Outbound Telegram send queue
+
+"""
+Paces the bot's replies to Telegram's limits instead of running into them.
+Every send goes through a lane for its chat: a priority queue drained by
+one task, gated by the chat's token bucket (about 1 message/s in private
+chats, 20/min in groups) and a global bucket shared by all chats (30/s).
+While a chat is throttled, its queued text replies go out before photos.
+A RetryAfter (flood wait) from Telegram pauses the chat for the requested
+time and the send is retried instead of being lost. Lanes exit after a
+period of inactivity.
+"""
+
+import time
+import asyncio
+import logging
+import itertools
+from datetime import timedelta
+
+from telegram.error import RetryAfter
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Lane priorities: lower values are sent first
+TEXT = 0
+PHOTO = 1
+KINDS = {TEXT: 'text', PHOTO: 'photo'}
+
+class TokenBucket:
+    """Token bucket handing out tokens in FIFO order; pause() blocks it for a while."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def pause(self, seconds):
+        """Hand out nothing for `seconds`, then restart from an empty bucket."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._tokens = 0.0
+        self._updated = self._paused_until
+
+class _Lane:
+    """Pending sends for one chat."""
+
+    def __init__(self, bucket):
+        self.bucket = bucket
+        self.queue = asyncio.PriorityQueue()
+        self.task = None
+
+def _seconds(retry_after):
+    return retry_after.total_seconds() if isinstance(retry_after, timedelta) else float(retry_after)
+
+class SendQueue:
+    """Per-chat and global rate limiting with flood-wait retries for Bot API calls."""
+
+    def __init__(self, global_rate, global_burst, chat_rate, chat_burst, group_rate, group_burst,
+                 max_flood_retries=3, idle_timeout=60.0):
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.group_rate = group_rate
+        self.group_burst = group_burst
+        self.max_flood_retries = max_flood_retries
+        self.idle_timeout = idle_timeout
+        self._global = TokenBucket(global_rate, global_burst)
+        self._lanes = {}
+        self._seq = itertools.count()
+        self._depth = {kind: 0 for kind in KINDS}
+        self._stats = {'sent': 0, 'failed': 0, 'flood_waits': 0}
+
+    async def send(self, chat_id, make, kind=TEXT, group=False):
+        """Queue `make()` (returns the API call's coroutine) for a chat and wait for its result.
+
+        `make` is called again for every retry, so uploads must build a fresh
+        file object inside it.
+        """
+        lane = self._lanes.get(chat_id)
+        if lane is None:
+            bucket = TokenBucket(self.group_rate, self.group_burst) if group else TokenBucket(self.chat_rate, self.chat_burst)
+            lane = self._lanes[chat_id] = _Lane(bucket)
+        future = asyncio.get_running_loop().create_future()
+        # (priority, seq) is unique, so the remaining fields are never compared
+        lane.queue.put_nowait((kind, next(self._seq), 0, time.monotonic(), make, future))
+        self._depth[kind] += 1
+        if lane.task is None or lane.task.done():
+            lane.task = asyncio.create_task(self._drain(chat_id, lane))
+        return await future
+
+    async def _drain(self, chat_id, lane):
+        while True:
+            try:
+                job = await asyncio.wait_for(lane.queue.get(), timeout=self.idle_timeout)
+            except asyncio.TimeoutError:
+                if lane.queue.empty():
+                    if self._lanes.get(chat_id) is lane:
+                        del self._lanes[chat_id]
+                    return
+                continue
+            try:
+                await self._process(chat_id, lane, job)
+            except asyncio.CancelledError:
+                kind, _, _, _, _, future = job
+                self._depth[kind] -= 1
+                future.cancel()
+                raise
+
+    async def _process(self, chat_id, lane, job):
+        kind, seq, attempt, queued_at, make, future = job
+        if future.done():
+            # The caller gave up (cancelled) while the send was queued
+            self._depth[kind] -= 1
+            return
+        await lane.bucket.acquire()
+        await self._global.acquire()
+        if attempt == 0:
+            metrics.SEND_WAIT_SECONDS.observe(time.monotonic() - queued_at, KINDS[kind])
+        try:
+            result = await make()
+        except RetryAfter as e:
+            wait = _seconds(e.retry_after)
+            self._stats['flood_waits'] += 1
+            metrics.FLOOD_WAITS.inc(KINDS[kind])
+            lane.bucket.pause(wait)
+            if attempt < self.max_flood_retries:
+                logger.warning(f"Flood wait {wait:g}s for chat {chat_id}, retrying {KINDS[kind]} send")
+                # Same (priority, seq): the send keeps its place at the front of the lane
+                lane.queue.put_nowait((kind, seq, attempt + 1, queued_at, make, future))
+                return
+            self._finish(kind, future, error=e)
+        except Exception as e:
+            self._finish(kind, future, error=e)
+        else:
+            self._finish(kind, future, result=result)
+
+    def _finish(self, kind, future, result=None, error=None):
+        self._depth[kind] -= 1
+        self._stats['failed' if error else 'sent'] += 1
+        if future.done():
+            return
+        if error:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def stats(self):
+        """Snapshot of counters, queued sends per kind and active chat lanes."""
+        return dict(self._stats, queued={KINDS[k]: n for k, n in self._depth.items()}, chats=len(self._lanes))
+
+    async def close(self):
+        """Cancel every lane; sends still queued fail with CancelledError."""
+        lanes = list(self._lanes.values())
+        self._lanes.clear()
+        for lane in lanes:
+            if lane.task is not None:
+                lane.task.cancel()
+            while not lane.queue.empty():
+                kind, _, _, _, _, future = lane.queue.get_nowait()
+                self._depth[kind] -= 1
+                future.cancel()
+        await asyncio.gather(*(lane.task for lane in lanes if lane.task is not None), return_exceptions=True)
@@ -0,0 +1,38 @@
+import pytest
+
+import extractors
+
+# JSON-LD names the product and its price but has no image; the DOM disagrees on both
+PAGE = b"""<!DOCTYPE html><html><head>
+<script type="application/ld+json">{"@type": "Product", "name": "LD Title Real", "offers": {"price": "999"}}</script>
+</head><body>
+<span id="productTitle">DOM Title Sponsored</span>
+<span class="a-price-whole">1,499</span>
+<img id="landingImage" src="https://m.media-amazon.com/images/I/dom.jpg">
+<div>""" + b"<p>filler</p>" * 2000 + b"</div></body></html>"
+
+def stream(page, platform, chunk_size):
+    scan = extractors.StreamExtractor(platform)
+    buffer = bytearray()
+    for start in range(0, len(page), chunk_size):
+        buffer += page[start:start + chunk_size]
+        fields = scan(buffer)
+        if fields:
+            return fields, len(buffer)
+    return None, len(buffer)
+
+@pytest.mark.skipif(extractors._fast is None, reason="needs a fast HTML parser")
+@pytest.mark.parametrize('chunk_size', [64, 1024, 65536])
+def test_stream_matches_full_extract_when_jsonld_is_incomplete(chunk_size):
+    fields, received = stream(PAGE, 'amazon', chunk_size)
+    assert fields == extractors.extract(PAGE, 'amazon')
+    assert fields == ("LD Title Real", "999", "https://m.media-amazon.com/images/I/dom.jpg")
+    if chunk_size < len(PAGE):
+        assert received < len(PAGE)
+
+def test_stream_returns_structured_fields_without_dom_rules():
+    page = (b'<html><head><meta property="og:title" content="Meta Title">'
+            b'<meta property="product:price:amount" content="10">'
+            b'<meta property="og:image" content="https://img/x.jpg"></head><body><p>x</p></body></html>')
+    fields, _ = stream(page, 'generic', 32)
+    assert fields == extractors.extract(page, 'generic') == ("Meta Title", "10", "https://img/x.jpg")
@@ -0,0 +1,28 @@
+import asyncio
+
+from http_client import HostLimiter
+
+def limiter(latency_target=3.0, backoff_cooldown=3.0):
+    return HostLimiter("example.com", rate=100.0, burst=100, initial_concurrency=8, min_concurrency=1,
+                       max_concurrency=16, latency_target=latency_target, backoff_cooldown=backoff_cooldown)
+
+async def slow_responses(host, count, latency):
+    for _ in range(count):
+        await host.acquire()
+        await host.release(ok=True, latency=latency)
+
+def test_back_to_back_slow_responses_halve_the_limit_once():
+    host = limiter()
+    asyncio.run(slow_responses(host, 2, 5.0))
+    assert host.limit == 4
+
+def test_cooldown_does_not_follow_the_latency_target():
+    # A tight latency SLO must not let the limit be cut more often
+    host = limiter(latency_target=0.001, backoff_cooldown=3.0)
+    asyncio.run(slow_responses(host, 3, 0.5))
+    assert host.limit == 4
+
+def test_limit_halves_again_after_the_cooldown():
+    host = limiter(backoff_cooldown=0.0)
+    asyncio.run(slow_responses(host, 2, 5.0))
+    assert host.limit == 2
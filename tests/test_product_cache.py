@@ -0,0 +1,31 @@
+import asyncio
+
+import main
+
+SLUG_URL = "https://www.myntra.com/shirts/roadster/roadster-men-navy-checked-casual-shirt/1364628/buy"
+BARE_URL = "https://www.myntra.com/1364628"
+
+def test_links_to_one_product_share_a_scrape_but_get_their_own_reply(monkeypatch):
+    scrapes = []
+
+    async def scrape_product(url, platform):
+        scrapes.append(url)
+        return main.build_product(("Roadster Navy Checked Casual", "799", "https://img/x.jpg"), url, platform)
+
+    monkeypatch.setattr(main, 'scrape_product', scrape_product)
+    main.product_cache.clear()
+
+    async def both():
+        first = await main.get_product(BARE_URL, 'myntra')
+        second = await main.get_product(SLUG_URL, 'myntra')
+        return first, second
+
+    first, second = asyncio.run(both())
+    assert scrapes == [BARE_URL]
+    assert first['url'] == BARE_URL and second['url'] == SLUG_URL
+    # The slug's "men" hint applies to the link that carries it only
+    assert "Men" not in first['title']
+    assert "Men" in second['title']
+    assert BARE_URL in main.format_output(first) and SLUG_URL not in main.format_output(first)
+    assert SLUG_URL in main.format_output(second) and BARE_URL not in main.format_output(second)
+    main.product_cache.clear()
@@ -0,0 +1,30 @@
+import os
+import time
+import signal
+import asyncio
+
+from workers import WorkerPool
+
+def pid():
+    return os.getpid()
+
+def test_pool_restarts_after_a_worker_is_killed():
+    pool = WorkerPool("test", 1, 4)
+
+    async def scenario():
+        first = await pool.run(pid)
+        os.kill(first, signal.SIGKILL)
+        # Wait for the executor to notice the dead worker
+        deadline = time.monotonic() + 10
+        while not pool._pool._broken and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        return first, await pool.run(pid)
+
+    try:
+        first, second = asyncio.run(scenario())
+        # The replacement must not be forked from the now multi-threaded parent
+        assert pool.get_pool()._mp_context.get_start_method() == 'forkserver'
+    finally:
+        pool.shutdown()
+    assert second != first
+    assert pool.restarts == 1
@@ -0,0 +1,113 @@
+# webhook.py - Webhook update server
+
+"""
+Receives Telegram updates as HTTP POSTs instead of long polling.
+An aiohttp app checks the secret token header, parses each update and puts
+it on a bounded queue; a fixed number of worker tasks feed the queue into
+Application.process_update. If the queue stays full, Telegram gets a 503
+and redelivers the update later. On shutdown the server stops accepting,
+queued and in-flight updates are drained, and the webhook stays registered
+so Telegram holds newer updates until the bot is back.
+"""
+
+import time
+import asyncio
+import logging
+
+from aiohttp import web
+from telegram import Update
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = 'X-Telegram-Bot-Api-Secret-Token'
+
+class WebhookServer:
+    """aiohttp endpoint plus a bounded queue of updates for a python-telegram-bot Application."""
+
+    def __init__(self, application, listen, port, path, secret_token="", workers=8, queue_size=100, enqueue_timeout=2.0):
+        self.application = application
+        self.listen = listen
+        self.port = port
+        self.path = path
+        self.secret_token = secret_token
+        self.workers = workers
+        self.enqueue_timeout = enqueue_timeout
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self._runner = None
+        self._tasks = []
+        self._accepting = False
+        self._stats = {'received': 0, 'rejected': 0, 'invalid': 0, 'processed': 0, 'failed': 0, 'in_flight': 0}
+
+    async def start(self):
+        """Start the worker tasks, then begin accepting POSTs."""
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        app = web.Application()
+        app.router.add_post(self.path, self._handle_update)
+        app.router.add_get('/healthz', self._handle_health)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.listen, self.port).start()
+        self._accepting = True
+        logger.info(f"Webhook server listening on {self.listen}:{self.port}{self.path} ({self.workers} workers)")
+
+    async def _handle_update(self, request):
+        if not self._accepting:
+            return web.Response(status=503, headers={'Retry-After': '5'})
+        if self.secret_token and request.headers.get(SECRET_HEADER) != self.secret_token:
+            logger.warning(f"Rejected webhook call with a bad secret token from {request.remote}")
+            return web.Response(status=403)
+        try:
+            update = Update.de_json(await request.json(), self.application.bot)
+        except Exception as e:
+            self._stats['invalid'] += 1
+            logger.warning(f"Invalid webhook payload: {e}")
+            return web.Response(status=400)
+        try:
+            await asyncio.wait_for(self.queue.put(update), timeout=self.enqueue_timeout)
+        except asyncio.TimeoutError:
+            # Telegram retries non-2xx deliveries, so a full queue pushes back instead of dropping
+            self._stats['rejected'] += 1
+            logger.warning(f"Update queue full ({self.queue.qsize()}), asking Telegram to retry")
+            return web.Response(status=503, headers={'Retry-After': '1'})
+        self._stats['received'] += 1
+        return web.Response(status=200)
+
+    async def _handle_health(self, request):
+        return web.json_response(self.stats())
+
+    async def _worker(self):
+        while True:
+            update = await self.queue.get()
+            self._stats['in_flight'] += 1
+            try:
+                await self.application.process_update(update)
+                self._stats['processed'] += 1
+            except Exception as e:
+                self._stats['failed'] += 1
+                logger.error(f"Failed to process update {getattr(update, 'update_id', '?')}: {e}", exc_info=True)
+            finally:
+                self._stats['in_flight'] -= 1
+                self.queue.task_done()
+
+    async def drain(self, timeout):
+        """Stop accepting, finish queued and in-flight updates (up to `timeout` s), then close."""
+        self._accepting = False
+        started = time.monotonic()
+        logger.info(f"Draining webhook queue ({self.queue.qsize()} queued, {self._stats['in_flight']} in flight)...")
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout=timeout)
+            logger.info(f"Webhook queue drained in {time.monotonic() - started:.1f}s.")
+        except asyncio.TimeoutError:
+            logger.warning(f"Drain timed out with {self.queue.qsize()} updates still queued.")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+        logger.info("Webhook server stopped.")
+
+    def stats(self):
+        """Snapshot of delivery counters and current queue depth."""
+        return dict(self._stats, queued=self.queue.qsize(), queue_size=self.queue.maxsize, accepting=self._accepting)
@@ -0,0 +1,159 @@
+# workers.py - Process pools for CPU-bound work
+
+"""
+Offloads CPU-heavy work from the event loop to pools of worker processes:
+one for HTML parsing and image work, and a separate one for OCR so slow
+screenshots never hold up product parsing. OCR workers load the Tesseract
+model once at startup and keep it for their lifetime. Each pool's
+semaphore bounds how many jobs may be queued or running at once, so bursts
+apply backpressure to callers instead of piling up. A pool whose worker died
+(BrokenProcessPool) is discarded and re-created on the next job; since the
+bot is multi-threaded by then, replacement workers are started through a
+forkserver rather than forked from the running process.
+"""
+
+import time
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import ocr
+from config import CPU_POOL, OCR_POOL
+
+logger = logging.getLogger(__name__)
+
+def _noop():
+    return None
+
+class WorkerPool:
+    """ProcessPoolExecutor with a bounded submission queue and usage counters."""
+
+    def __init__(self, name, processes, max_pending, initializer=None):
+        self.name = name
+        self.processes = processes
+        self.max_pending = max_pending
+        self.initializer = initializer
+        self._pool = None
+        self._slots = None
+        self.restarts = 0
+        self._stats = {
+            'waiting': 0, 'in_flight': 0, 'submitted': 0, 'completed': 0, 'failed': 0,
+            'busy_time': 0.0, 'wait_time': 0.0
+        }
+
+    def get_pool(self):
+        """Return the process pool, creating it on first use."""
+        if self._pool is None:
+            # fork: workers inherit already-imported modules, so functions defined
+            # in the bot's __main__ module can be submitted without re-importing it.
+            # A restart happens while other threads may hold locks, which a forked
+            # child would inherit still locked; the forkserver is single-threaded.
+            method = 'forkserver' if self.restarts else 'fork'
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.processes,
+                mp_context=multiprocessing.get_context(method),
+                initializer=self.initializer
+            )
+            logger.info(f"{self.name} worker pool started with {self.processes} processes ({method}).")
+        return self._pool
+
+    def start(self):
+        """Fork all workers up front, before the bot starts any threads."""
+        pool = self.get_pool()
+        for future in [pool.submit(_noop) for _ in range(self.processes)]:
+            future.result()
+
+    def _get_slots(self):
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_pending)
+        return self._slots
+
+    async def run(self, func, *args):
+        """Run `func(*args)` in the pool, waiting for a free slot first."""
+        slots = self._get_slots()
+        stats = self._stats
+        stats['waiting'] += 1
+        queued = time.perf_counter()
+        try:
+            await slots.acquire()
+        finally:
+            stats['waiting'] -= 1
+        stats['submitted'] += 1
+        stats['in_flight'] += 1
+        started = time.perf_counter()
+        stats['wait_time'] += started - queued
+        pool = self.get_pool()
+        try:
+            try:
+                future = pool.submit(func, *args)
+            except BrokenProcessPool:
+                # A worker died while the pool was idle; this job never ran, so a fresh pool can take it
+                self._discard(pool)
+                pool = self.get_pool()
+                future = pool.submit(func, *args)
+            result = await asyncio.wrap_future(future)
+        except BrokenProcessPool:
+            stats['failed'] += 1
+            self._discard(pool)
+            raise
+        except Exception:
+            stats['failed'] += 1
+            raise
+        finally:
+            stats['in_flight'] -= 1
+            stats['busy_time'] += time.perf_counter() - started
+            slots.release()
+        stats['completed'] += 1
+        return result
+
+    def _discard(self, pool):
+        """Drop a broken pool so the next job forks a fresh one."""
+        if self._pool is pool:
+            logger.warning(f"{self.name} worker pool broken (a worker died); restarting it on the next job.")
+            pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+            self.restarts += 1
+
+    def stats(self):
+        """Snapshot of counters, current queue depth and mean wait/run latency."""
+        finished = self._stats['completed'] + self._stats['failed']
+        return dict(
+            self._stats,
+            processes=self.processes,
+            restarts=self.restarts,
+            max_pending=self.max_pending,
+            avg_wait_ms=self._stats['wait_time'] / self._stats['submitted'] * 1000 if self._stats['submitted'] else 0.0,
+            avg_run_ms=self._stats['busy_time'] / finished * 1000 if finished else 0.0
+        )
+
+    def shutdown(self):
+        """Stop the worker processes (call on shutdown)."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            logger.info(f"{self.name} worker pool stopped.")
+        self._pool = None
+        self._slots = None
+
+cpu_pool = WorkerPool("CPU", CPU_POOL['processes'], CPU_POOL['max_pending'])
+# Each OCR process loads the language model once and reuses it for every image
+ocr_pool = WorkerPool("OCR", OCR_POOL['processes'], OCR_POOL['max_pending'], initializer=ocr.warm_up)
+
+def start():
+    """Fork every pool's workers up front, before the bot starts any threads."""
+    cpu_pool.start()
+    ocr_pool.start()
+
+async def run_cpu(func, *args):
+    """Run `func(*args)` in the CPU pool (parsing, image work)."""
+    return await cpu_pool.run(func, *args)
+
+async def run_ocr(func, *args):
+    """Run `func(*args)` in the OCR pool."""
+    return await ocr_pool.run(func, *args)
+
+def shutdown():
+    """Stop all worker processes (call on shutdown)."""
+    cpu_pool.shutdown()
+    ocr_pool.shutdown()